@@ -0,0 +1,214 @@
+"""Suggests which study views should be tables, and which tables could be views
+
+Views are cheap to create, but get recomputed by every query that reads them. Tables
+cost a write, but are only computed once. Which is better depends on how many things
+read them, so we look at the reads recorded in the query stats of past builds (from
+every study in the schema, since studies read each other's tables) to find:
+
+- views read by enough tables that computing them once would be cheaper
+- tables only read by a single table, which could skip their write by being a view
+"""
+
+import collections
+import dataclasses
+import re
+
+import rich
+import rich.table
+
+from cumulus_library import base_utils, enums, study_manifest
+
+# How many readers a view needs before we suggest making it a table
+HOT_VIEW_READERS = 3
+
+CREATE_VIEW_REGEX = re.compile(
+    r"\bCREATE\s+(?:OR\s+REPLACE\s+)?VIEW\s+(?P<name>[\w.\"`]+)(?=\s+AS\b)", re.IGNORECASE
+)
+# Tables created with IF NOT EXISTS are usually placeholders, which we leave alone
+CREATE_TABLE_REGEX = re.compile(r"\bCREATE\s+TABLE\s+(?P<name>[\w.\"`]+)(?=\s+AS\b)", re.IGNORECASE)
+
+
+def _normalize_name(name: str) -> str:
+    """Strips quotes and any schema from a table name, and lowercases it"""
+    return name.replace('"', "").replace("`", "").split(".")[-1].lower()
+
+
+@dataclasses.dataclass(kw_only=True)
+class Advice:
+    """A suggestion to change how a study table or view is materialized
+
+    :keyword name: the name of the table or view
+    :keyword current: how it's built now, TABLE or VIEW
+    :keyword suggested: how it should be built, TABLE or VIEW
+    :keyword readers: the tables and views that read it
+    :keyword build_time: the average seconds spent creating it
+    :keyword reader_time: the average seconds spent creating its readers
+    """
+
+    name: str
+    current: str
+    suggested: str
+    readers: list[str]
+    build_time: float
+    reader_time: float
+
+
+def _get_stats_tables(config: base_utils.StudyConfig, schema: str) -> list[str]:
+    """Lists the query stats tables (of any study) that record what queries read"""
+    suffix = f"__{enums.ProtectedTables.QUERY_STATS.value}"
+    return [
+        name
+        for name, _ in config.db.list_tables(schema)
+        if name.endswith(suffix)
+        and "reads" in {col for col, _ in config.db.get_column_types(schema, name)}
+    ]
+
+
+def get_advice(
+    config: base_utils.StudyConfig, manifest: study_manifest.StudyManifest
+) -> list[Advice]:
+    """Works out which of a study's tables and views should switch materialization
+
+    This needs the study's tables and views to exist, and at least one build with
+    query stats recorded.
+
+    :param config: a StudyConfig object
+    :param manifest: a StudyManifest object
+    :returns: the suggested changes, ordered by name
+    """
+    schema = base_utils.get_schema(config, manifest)
+    prefix = manifest.get_schema_aware_prefix_with_seperator()
+    study_name = manifest.get_study_prefix()
+    existing = {
+        _normalize_name(name): view_or_table
+        for name, view_or_table in config.db.list_tables(schema)
+    }
+    cursor = config.db.cursor()
+
+    build_times = collections.defaultdict(list)
+    other_writes = set()
+    readers = collections.defaultdict(set)
+    for stats_table in _get_stats_tables(config, schema):
+        rows = cursor.execute(
+            "SELECT study_name, table_name, statement, wall_time, reads "  # noqa: S608
+            f'FROM "{schema}"."{stats_table}" WHERE table_name IS NOT NULL'
+        ).fetchall()
+        for row_study, table_name, statement, wall_time, reads in rows:
+            table_name = _normalize_name(table_name)
+            if statement != "CREATE":
+                if row_study == study_name and statement != "DROP":
+                    # Something inserts into (or updates) this, so it has to be a table
+                    other_writes.add(table_name)
+                continue
+            if row_study == study_name:
+                build_times[table_name].append(wall_time or 0)
+            for read in (reads or "").split(","):
+                read = _normalize_name(read)
+                if read != table_name and table_name in existing:
+                    readers[read].add(table_name)
+
+    def avg_time(name: str) -> float:
+        times = build_times.get(name) or [0]
+        return sum(times) / len(times)
+
+    exports = {_normalize_name(export.name) for export in manifest.get_export_table_list() or []}
+    candidates = {
+        name: view_or_table
+        for name, view_or_table in existing.items()
+        if name.startswith(prefix)
+        and name in build_times
+        and name not in other_writes
+        and not any(
+            f"__{word.value}_" in name or name.endswith(f"__{word.value}")
+            for word in enums.ProtectedTableKeywords
+        )
+    }
+    hot_views = {
+        name
+        for name, view_or_table in candidates.items()
+        if view_or_table == "VIEW" and len(readers[name]) >= HOT_VIEW_READERS
+    }
+    advice = [
+        Advice(
+            name=name,
+            current="VIEW",
+            suggested="TABLE",
+            readers=sorted(readers[name]),
+            build_time=avg_time(name),
+            reader_time=sum(avg_time(reader) for reader in readers[name]),
+        )
+        for name in hot_views
+    ]
+    for name, view_or_table in candidates.items():
+        if (
+            view_or_table != "TABLE"
+            or len(readers[name]) != 1
+            or name in exports
+            # Views can't be bucketed/partitioned/etc
+            or manifest.get_table_layout(name)
+        ):
+            continue
+        (reader,) = readers[name]
+        # If the reader is a view, making this a view too would just push the work
+        # onto everything that reads that view
+        if existing.get(reader) == "VIEW" and reader not in hot_views:
+            continue
+        advice.append(
+            Advice(
+                name=name,
+                current="TABLE",
+                suggested="VIEW",
+                readers=[reader],
+                build_time=avg_time(name),
+                reader_time=avg_time(reader),
+            )
+        )
+    return sorted(advice, key=lambda item: item.name)
+
+
+def apply_advice(query: str, materialize: dict[str, str]) -> str:
+    """Rewrites a CREATE TABLE/VIEW ... AS query to build its target as suggested
+
+    :param query: the query to rewrite
+    :param materialize: a dict of {name: TABLE or VIEW}, like from get_advice()
+    :returns: the rewritten query (or the original, if it isn't in materialize)
+    """
+    if not materialize:
+        return query
+    for regex, current in ((CREATE_VIEW_REGEX, "VIEW"), (CREATE_TABLE_REGEX, "TABLE")):
+        if match := regex.search(query):
+            suggested = materialize.get(_normalize_name(match["name"]))
+            if suggested and suggested != current:
+                create = f"CREATE {suggested} {match['name']}"
+                return f"{query[: match.start()]}{create}{query[match.end() :]}"
+            return query
+    return query
+
+
+def print_advice(advice: list[Advice], *, applied: bool = False) -> None:
+    """Prints a table of materialization suggestions
+
+    :param advice: the suggestions from get_advice()
+    :keyword applied: if True, describes them as changes made to this build
+    """
+    console = rich.get_console()
+    if not advice:
+        console.print("No changes to study tables or views are suggested.")
+        return
+    table = rich.table.Table(
+        title="Materialization changes applied" if applied else "Suggested materialization"
+    )
+    table.add_column("Name", style="green")
+    table.add_column("Change", style="cyan")
+    table.add_column("Readers", justify="right")
+    table.add_column("Build time (s)", justify="right")
+    table.add_column("Reader time (s)", justify="right")
+    for item in advice:
+        table.add_row(
+            item.name,
+            f"{item.current} -> {item.suggested}",
+            str(len(item.readers)),
+            f"{item.build_time:.1f}",
+            f"{item.reader_time:.1f}",
+        )
+    console.print(table)
@@ -1,7 +1,9 @@
 """Handles the creation of new tables"""
 
 import contextlib
+import dataclasses
 import datetime
+import hashlib
 import importlib.util
 import inspect
 import pathlib
@@ -9,6 +11,7 @@ import re
 import sys
 import tomllib
 import zipfile
+from concurrent import futures
 
 import rich
 import sqlglot
@@ -25,6 +28,7 @@ from cumulus_library import (
     note_utils,
     study_manifest,
 )
+from cumulus_library.actions import advisor, linter
 from cumulus_library.builders import (
     counts_builder,
     file_upload_builder,
@@ -33,8 +37,15 @@ from cumulus_library.builders import (
     psm_builder,
     valueset_builder,
 )
+from cumulus_library.databases import scheduler
 from cumulus_library.template_sql import base_templates
 
+# The start of a create table as query, up to the table name
+CTAS_REGEX = re.compile(
+    r"\bCREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?(?P<name>[\w.\"`]+)(?=\s+AS\b)",
+    re.IGNORECASE,
+)
+
 ######### public functions #########
 
 
@@ -49,6 +60,11 @@ def build_study(
     data_path: pathlib.Path | None = None,
     notes: note_utils.NoteSource | None = None,
     nlp_config: note_utils.NlpConfig | None = None,
+    incremental: bool = False,
+    resume: bool = False,
+    prebuilt: set[str] | None = None,
+    materialize: dict[str, str] | None = None,
+    lint: bool = False,
 ) -> None:
     """Creates tables in the schema by iterating through the stages in the specified build type
 
@@ -61,6 +77,15 @@ def build_study(
     :keyword data_path: If prepare is true, the path to write rendered data to
     :keyword notes: Source to read notes from (for NLP)
     :keyword nlp_config: NLP config options from command line
+    :keyword incremental: If true, only rebuild tables whose queries or inputs changed
+        since the last build (the study should not have been cleaned beforehand)
+    :keyword resume: If true, skip any table already built by an interrupted build
+        (unless its queries changed since), including tables from python builders
+    :keyword prebuilt: names of tables that already hold their final contents (like
+        tables merged from a sharded build), whose queries should be skipped
+    :keyword materialize: a dict of {name: TABLE or VIEW} to build those tables or views
+        as, rather than as their queries say (see advisor.get_advice())
+    :keyword lint: If true, prints warnings about slow query patterns once the build is done
     """
     if prepare:
         _check_if_preparable(manifest.get_study_prefix())
@@ -78,6 +103,24 @@ def build_study(
             f"Available stages: {', '.join(manifest.get_stages())}"
         )
 
+    # Parsed queries are cached per build, so start from a clean slate
+    base_utils.clear_parsed_queries()
+    build_state = _BuildState(
+        incremental=(incremental or resume) and not prepare,
+        resume=resume and not prepare,
+        prebuilt={name.lower() for name in prebuilt or ()},
+        materialize={name.lower(): kind for name, kind in (materialize or {}).items()},
+        lint_warnings=[] if lint else None,
+    )
+    if build_state.incremental:
+        build_state.prior = _get_prior_fingerprints(config, manifest)
+    # With dependency scheduling, back to back parallel actions share one scheduler,
+    # which we drain before any serial action (and at the end of the stage)
+    use_scheduler = manifest.get_dependency_scheduling() and not prepare
+    # Builders that yield queries as they go can have them run right away, but we need
+    # all of a file's queries up front to tell which ones an incremental build can skip
+    stream = use_scheduler and not build_state.incremental and not build_state.prebuilt
+    query_scheduler = None
     for action in stage:
         if not action.get("type", "").startswith("build:"):
             continue
@@ -86,13 +129,39 @@ def build_study(
             parallel = True
         else:
             parallel = False
+        if query_scheduler and not parallel:
+            _drain_scheduler(query_scheduler)
+            query_scheduler = None
         queries = []
         explicit_serial_queries = []
+        prepared_builders = {}
+        if parallel:
+            prepared_builders = _prepare_builders(
+                config,
+                manifest,
+                [f for f in action["files"] if f.endswith(".py") and f in file_list],
+                db_parser=db_parser,
+                stream=stream,
+            )
         for file in action["files"]:
             nlp_prefix_allowed = False
             if file not in file_list:
                 continue
-            if file.endswith(".py"):
+            # Queries from this file that still need to be checked for errors
+            file_queries = []
+            if stream and _streams_queries(prepared_builders.get(file)):
+                if query_scheduler is None:
+                    query_scheduler = _get_scheduler(config)
+                _stream_builder_queries(
+                    config,
+                    manifest,
+                    query_scheduler,
+                    prepared_builders[file],
+                    filename=file,
+                    db_parser=db_parser,
+                    build_state=build_state,
+                )
+            elif file.endswith(".py"):
                 b_queries, parallel_allowed = _run_builder(
                     config=config,
                     manifest=manifest,
@@ -102,9 +171,12 @@ def build_study(
                     prepare=prepare,
                     parallel=parallel,
                     query_count=query_count,
+                    build_state=build_state,
+                    prepared_builder=prepared_builders.get(file),
                 )
+                _lint_queries(config, build_state, b_queries, file)
                 if parallel_allowed:
-                    queries += b_queries
+                    file_queries = b_queries
                 else:
                     # If you're running in explicit serial mode, you can skip the parallel
                     # collector.
@@ -123,11 +195,14 @@ def build_study(
                     prepare=prepare,
                     parallel=parallel,
                     query_count=query_count,
+                    build_state=build_state,
                 )
+                _lint_queries(config, build_state, w_queries, file)
                 if parallel_allowed:
-                    queries = queries + w_queries
+                    file_queries = w_queries
             elif file.endswith(".sql"):
-                queries = queries + _run_raw_queries(
+                # Raw queries are checked for errors as they're loaded
+                raw_queries = _run_raw_queries(
                     config=config,
                     manifest=manifest,
                     label=action.get("label"),
@@ -136,27 +211,56 @@ def build_study(
                     prepare=prepare,
                     parallel=parallel,
                     query_count=query_count,
+                    build_state=build_state,
                 )
+                _lint_queries(config, build_state, raw_queries, file)
+                queries = queries + raw_queries
             else:
                 raise errors.StudyManifestParsingError(f"Unexpected filetype in manifest: {file}")
-            for query in queries:
+            for query in file_queries:
                 _check_query_for_errors(config, manifest, query, file, nlp_prefix_allowed)
+            queries = queries + file_queries
         if parallel:
             query_count += len(queries)
             if query_count > 0:
-                queries = _update_build_source_table(config, manifest, queries)
+                setup_queries, queries = _get_build_source_queries(
+                    config, manifest, queries, build_state=build_state, skip_unchanged=True
+                )
+                if use_scheduler:
+                    # The scheduler will order these by the tables they touch
+                    queries = setup_queries + queries
+                    if query_scheduler is None:
+                        query_scheduler = _get_scheduler(config)
+                    _schedule_queries(config, query_scheduler, queries, action.get("label", ""))
+                    continue
                 with base_utils.get_progress_bar() as progress_bar:
                     task = progress_bar.add_task(
                         f"Building {action.get('label', '')} tables...",
-                        total=len(queries),
+                        total=len(setup_queries) + len(queries),
                         visible=not config.verbose,
                     )
+                    # parallel_execute() runs everything at once, so we need to finish
+                    # any bookkeeping and table drops before starting.
+                    cursor = config.db.cursor()
+                    for query in setup_queries:
+                        with base_utils.query_console_output(
+                            config.verbose, query, progress_bar, task
+                        ):
+                            config.db.execute_with_stats(cursor, query)
                     config.db.parallel_execute(
                         queries=queries,
                         verbose=config.verbose,
                         progress_bar=progress_bar,
                         task=task,
+                        result_policy=databases.ResultPolicy.DISCARD,
                     )
+    if query_scheduler:
+        _drain_scheduler(query_scheduler)
+    if not prepare:
+        log_utils.log_query_stats(config=config, manifest=manifest)
+    if build_state.lint_warnings is not None:
+        linter.print_warnings(build_state.lint_warnings)
+    base_utils.clear_parsed_queries()
     if prepare:
         with zipfile.ZipFile(
             f"{data_path}/{manifest.get_study_prefix()}.zip", "w", zipfile.ZIP_DEFLATED
@@ -216,6 +320,45 @@ def build_matching_files(
     )
 
 
+def get_study_queries(
+    config: base_utils.StudyConfig,
+    manifest: study_manifest.StudyManifest,
+    *,
+    db_parser: databases.DatabaseParser = None,
+) -> dict[str, list[str]]:
+    """Gets the queries of every stage of a study, without running them
+
+    Table builders are asked to prepare their queries, so ones that inspect the
+    database need it to be available. Workflows other than counts can't produce their
+    queries without running, so are skipped.
+
+    :param config: a StudyConfig object
+    :param manifest: a StudyManifest object
+    :keyword db_parser: a parser for the target database
+    :returns: a dict of {filename: queries}
+    """
+    study_queries = {}
+    for file in manifest.get_file_list("all"):
+        path = pathlib.Path(f"{manifest._study_path}/{file}")
+        if file.endswith(".sql"):
+            study_queries[file] = [
+                base_utils.update_query_if_schema_specified(query, manifest)
+                for query in base_utils.parse_sql(base_utils.load_text(path))
+            ]
+        elif file.endswith(".py"):
+            table_builder = _load_builder(manifest, file)
+            table_builder.prepare_queries(config=config, manifest=manifest, parser=db_parser)
+            study_queries[file] = table_builder.queries
+        elif file.endswith(".toml") or file.endswith(".workflow"):
+            with open(path, "rb") as f:
+                if tomllib.load(f)["config_type"] != "counts":
+                    continue
+            table_builder = counts_builder.CountsBuilder(manifest=manifest, toml_config_path=path)
+            table_builder.prepare_queries(config=config, manifest=manifest)
+            study_queries[file] = table_builder.queries
+    return study_queries
+
+
 def run_protected_table_builder(
     config: base_utils.StudyConfig,
     manifest: study_manifest.StudyManifest,
@@ -230,31 +373,335 @@ def run_protected_table_builder(
         config=config,
         manifest=manifest,
     )
+    _migrate_protected_tables(config, manifest)
 
 
 ######### private helper functions #########
 
+# Columns added to protected tables after they were first released, which tables
+# created by older versions need to have added
+PROTECTED_TABLE_MIGRATIONS = {
+    enums.ProtectedTables.BUILD_SOURCE: "fingerprint",
+}
+
+
+def _migrate_protected_tables(
+    config: base_utils.StudyConfig,
+    manifest: study_manifest.StudyManifest,
+) -> None:
+    """Adds newer (string) columns to protected tables from before those columns existed"""
+    schema = base_utils.get_schema(config, manifest)
+    cursor = config.db.cursor()
+    for table, column in PROTECTED_TABLE_MIGRATIONS.items():
+        table_name = f"{manifest.get_schema_aware_prefix_with_seperator()}{table.value}"
+        cols = [col[0] for col in config.db.get_column_types(schema, table_name)]
+        if not cols or column in cols:
+            continue
+        if isinstance(config.db, databases.AthenaDatabaseBackend):
+            cursor.execute(f"ALTER TABLE {schema}.{table_name} ADD COLUMNS({column} string)")
+        else:
+            cursor.execute(f"ALTER TABLE {schema}.{table_name} ADD COLUMN {column} varchar")
+        config.db.forget_catalog([(schema, table_name)])
+
+
+@dataclasses.dataclass
+class _BuildState:
+    """Table fingerprints gathered over the course of a single build
+
+    :param incremental: if True, tables whose fingerprint hasn't changed since the
+        last build are not rebuilt
+    :param prior: {table name: (type, fingerprint)} recorded by the last build of this
+        stage, for tables that still exist
+    :param current: {table name: fingerprint} for tables seen so far in this build,
+        keyed by the names from base_utils.get_query_dependencies()
+    :param resume: if True, builders that execute their own queries also skip
+        unchanged tables, so that an interrupted build can pick up where it stopped
+    :param prebuilt: names of tables that are already built, whose queries are
+        always skipped
+    :param materialize: {name: TABLE or VIEW} for tables and views to build as the
+        other type than their queries say
+    :param lint_warnings: slow query patterns found so far, if we're looking for them
+    """
+
+    incremental: bool = False
+    prior: dict[str, tuple[str, str]] = dataclasses.field(default_factory=dict)
+    current: dict[str, str] = dataclasses.field(default_factory=dict)
+    resume: bool = False
+    prebuilt: set[str] = dataclasses.field(default_factory=set)
+    materialize: dict[str, str] = dataclasses.field(default_factory=dict)
+    lint_warnings: list[linter.LintWarning] | None = None
+
+
+def _get_prior_fingerprints(
+    config: base_utils.StudyConfig,
+    manifest: study_manifest.StudyManifest,
+) -> dict[str, tuple[str, str]]:
+    """Gets the type and fingerprint of tables recorded by the last build of this stage
+
+    Tables that have since been removed from the database are skipped, so that they
+    will be rebuilt.
+    """
+    schema = base_utils.get_schema(config, manifest)
+    cursor = config.db.cursor()
+    query = base_templates.get_select_from_single_query(
+        schema=schema,
+        table_name=(
+            f"{manifest.get_schema_aware_prefix_with_seperator()}"
+            f"{enums.ProtectedTables.BUILD_SOURCE.value}"
+        ),
+        columns=["name", "type", "fingerprint"],
+        where_clauses=[[f"stage = '{config.stage}'", "fingerprint IS NOT NULL"]],
+    )
+    recorded = cursor.execute(query).fetchall()
+    existing = {name for name, _ in config.db.list_tables(schema)}
+    return {
+        name: (view_or_table, fingerprint)
+        for name, view_or_table, fingerprint in recorded
+        if name.split(".")[-1] in existing
+    }
+
+
+def _update_fingerprints(
+    config: base_utils.StudyConfig, queries: list[str], build_state: _BuildState
+) -> None:
+    """Fingerprints every table written by a list of queries
+
+    A table's fingerprint covers the normalized text of each query writing to it, and
+    the fingerprints of each table those queries read from, so a change to a query
+    also changes the fingerprint of everything downstream of it. Tables from outside
+    the build (like raw FHIR resources) contribute only their names.
+    """
+    writers = {}
+    for query in queries:
+        writes, reads = base_utils.get_query_dependencies(config, query)
+        for name in writes or ():
+            texts, upstream = writers.setdefault(name, ([], set()))
+            texts.append(base_utils.normalize_query(config, query))
+            upstream.update(reads)
+    for name, (texts, upstream) in writers.items():
+        fingerprint = hashlib.sha256()
+        for text in texts:
+            fingerprint.update(text.encode())
+        for upstream_name in sorted(upstream):
+            upstream_fingerprint = build_state.current.get(upstream_name, "")
+            fingerprint.update(f"{upstream_name}:{upstream_fingerprint}".encode())
+        build_state.current[name] = fingerprint.hexdigest()
+
 
 def _update_build_source_table(
     config: base_utils.StudyConfig,
     manifest: study_manifest.StudyManifest,
     queries: list[str],
+    *,
+    build_state: _BuildState | None = None,
+    skip_unchanged: bool = False,
 ) -> list[str]:
-    table_names = base_utils.get_viewtable_names_from_create_queries(config, queries)
+    """Adds build source bookkeeping to a list of queries, to be executed serially
+
+    See _get_build_source_queries() for details.
+
+    :returns: the queries to execute, in order
+    """
+    setup_queries, queries = _get_build_source_queries(
+        config, manifest, queries, build_state=build_state, skip_unchanged=skip_unchanged
+    )
+    return setup_queries + queries
+
+
+def _get_build_source_queries(
+    config: base_utils.StudyConfig,
+    manifest: study_manifest.StudyManifest,
+    queries: list[str],
+    *,
+    build_state: _BuildState | None = None,
+    skip_unchanged: bool = False,
+) -> tuple[list[str], list[str]]:
+    """Records the tables created by a list of queries in the build source table
+
+    In incremental builds, this also drops tables that are about to be rebuilt, and,
+    if skip_unchanged is set, removes the queries for tables whose fingerprint
+    matches the last build. (Builders that execute their own queries may depend on
+    all of them running, so those tables are only skipped when resuming a build.)
+    Queries for prebuilt tables are always removed. Tables and views are also
+    switched to any materialization the build was asked for, and tables are given
+    any physical layout the manifest asks for (see _apply_table_layout()).
+
+    Rows are recorded before their tables are built, and prior fingerprints are
+    only used for tables that exist, so a table is considered built once both its
+    row and the table itself are present.
+
+    :param config: a StudyConfig object
+    :param manifest: a StudyManifest object
+    :param queries: the queries about to be executed
+    :keyword build_state: fingerprints gathered so far in this build
+    :keyword skip_unchanged: if true, remove queries for unchanged tables
+    :returns: a tuple of (setup queries, which must run first, and the queries to execute)
+    """
+    build_state = build_state or _BuildState()
+    queries = [
+        _apply_table_layout(manifest, advisor.apply_advice(query, build_state.materialize))
+        for query in queries
+    ]
+    _update_fingerprints(config, queries, build_state)
+    rows = []
+    drops = []
+    unchanged = set()
+    for query in queries:
+        for name, view_or_table in base_utils.get_viewtable_names_from_create_queries(
+            config, [query]
+        ):
+            writes, _ = base_utils.get_query_dependencies(config, query)
+            fingerprint = build_state.current.get(next(iter(writes))) if writes else None
+            rows.append([config.stage, name, view_or_table, fingerprint])
+            if writes and writes <= build_state.prebuilt:
+                continue
+            if not build_state.incremental or name not in build_state.prior:
+                continue
+            prior_type, prior_fingerprint = build_state.prior[name]
+            if skip_unchanged and fingerprint == prior_fingerprint:
+                unchanged.update(writes)
+            else:
+                drops.append(base_templates.get_drop_view_table(name, prior_type))
+    skipped = unchanged | build_state.prebuilt
+    if skipped:
+        queries = [
+            query
+            for query in queries
+            if not (writes := base_utils.get_query_dependencies(config, query)[0])
+            or not writes <= skipped
+        ]
     # it's possible to get a list of queries that contains no CREATE statements
-    if len(table_names) > 0:
-        # Otherwise, let's add new tables to the study build source tables.
-        prefix = manifest.get_schema_aware_prefix_with_seperator()
-        queries.insert(
-            0,
-            base_templates.get_insert_into_query(
+    if len(rows) == 0:
+        return [], queries
+    # Otherwise, let's add new tables to the study build source tables.
+    prefix = manifest.get_schema_aware_prefix_with_seperator()
+    build_source = f"{prefix}{enums.ProtectedTables.BUILD_SOURCE.value}"
+    source_queries = []
+    if build_state.incremental:
+        # Since incremental builds skip cleaning, we replace any existing rows
+        names = ", ".join(f"'{row[1]}'" for row in rows)
+        source_queries.append(
+            base_templates.get_delete_from_table_query(
                 schema=config.schema,
-                table_name=(f"{prefix}{enums.ProtectedTables.BUILD_SOURCE.value}"),
-                table_cols=const.BUILD_SOURCE_COLS,
-                dataset=[[config.stage, t[0], t[1]] for t in table_names],
-            ),
+                table_name=build_source,
+                where_clauses=[[f"stage = '{config.stage}'", f"name IN ({names})"]],
+            )
+        )
+    source_queries.append(
+        base_templates.get_insert_into_query(
+            schema=config.schema,
+            table_name=build_source,
+            table_cols=const.BUILD_SOURCE_COLS,
+            dataset=rows,
         )
-    return queries
+    )
+    return source_queries + drops, queries
+
+
+def _apply_table_layout(manifest: study_manifest.StudyManifest, query: str) -> str:
+    """Adds the manifest's layout options for a table (like bucketing) to its CTAS query
+
+    This only changes anything on Athena. Queries that already set their table
+    properties are left alone.
+    """
+    if not (match := CTAS_REGEX.search(query)):
+        return query
+    name = match["name"].replace('"', "").replace("`", "").split(".")[-1]
+    properties = base_templates.get_table_properties(manifest.get_table_layout(name))
+    if not properties:
+        return query
+    return f"{query[: match.end()]} {properties}{query[match.end() :]}"
+
+
+def _get_scheduler(config: base_utils.StudyConfig) -> scheduler.QueryScheduler:
+    return scheduler.QueryScheduler(
+        config.db,
+        verbose=config.verbose,
+        progress_bar=base_utils.get_progress_bar(),
+        result_policy=databases.ResultPolicy.DISCARD,
+    )
+
+
+def _schedule_queries(
+    config: base_utils.StudyConfig,
+    query_scheduler: scheduler.QueryScheduler,
+    queries: list[str],
+    label: str,
+) -> None:
+    """Hands the queries of one parallel action to the scheduler, with their dependencies"""
+    task = query_scheduler.progress_bar.add_task(
+        f"Building {label} tables...",
+        total=len(queries),
+        visible=not config.verbose,
+    )
+    for query in queries:
+        writes, reads = base_utils.get_query_dependencies(config, query)
+        query_scheduler.submit(query, writes=writes, reads=reads, task=task)
+
+
+def _streams_queries(table_builder: BaseTableBuilder | None) -> bool:
+    """Checks if a builder yields its queries as it goes, via iter_queries()"""
+    return (
+        table_builder is not None
+        and table_builder.parallel_allowed
+        and type(table_builder).iter_queries is not BaseTableBuilder.iter_queries
+    )
+
+
+def _stream_builder_queries(
+    config: base_utils.StudyConfig,
+    manifest: study_manifest.StudyManifest,
+    query_scheduler: scheduler.QueryScheduler,
+    table_builder: BaseTableBuilder,
+    *,
+    filename: str,
+    db_parser: databases.DatabaseParser = None,
+    build_state: _BuildState | None = None,
+) -> None:
+    """Hands each query from a builder's iter_queries() to the scheduler as it's yielded
+
+    This lets the database get started while the builder is still working out its
+    later queries. Build source bookkeeping waits until the builder is done.
+    """
+    task = query_scheduler.progress_bar.add_task(
+        f"Building tables from {filename}...",
+        total=0,
+        visible=not config.verbose,
+    )
+    queries = []
+    for query in table_builder.iter_queries(config=config, manifest=manifest, parser=db_parser):
+        if build_state:
+            query = advisor.apply_advice(query, build_state.materialize)
+        query = _apply_table_layout(manifest, query)
+        _check_query_for_errors(config, manifest, query, filename)
+        queries.append(query)
+        query_scheduler.progress_bar.update(task, total=len(queries))
+        writes, reads = base_utils.get_query_dependencies(config, query)
+        query_scheduler.submit(query, writes=writes, reads=reads, task=task)
+    table_builder.queries = queries
+    _lint_queries(config, build_state, queries, filename)
+    setup_queries, _ = _get_build_source_queries(config, manifest, queries, build_state=build_state)
+    query_scheduler.progress_bar.update(task, total=len(queries) + len(setup_queries))
+    for query in setup_queries:
+        writes, reads = base_utils.get_query_dependencies(config, query)
+        query_scheduler.submit(query, writes=writes, reads=reads, task=task)
+
+
+def _lint_queries(
+    config: base_utils.StudyConfig,
+    build_state: _BuildState | None,
+    queries: list[str],
+    filename: str,
+) -> None:
+    if build_state and build_state.lint_warnings is not None:
+        build_state.lint_warnings += linter.lint_queries(config, queries, filename)
+
+
+def _drain_scheduler(query_scheduler: scheduler.QueryScheduler) -> None:
+    # The progress bar is only displayed while we wait, since builders being prepared
+    # in the meantime may want to show progress bars of their own.
+    with query_scheduler.progress_bar:
+        query_scheduler.wait()
 
 
 def _check_if_preparable(prefix):
@@ -292,7 +739,7 @@ def _execute_build_queries(
         _check_query_for_errors(config, manifest, query, filename)
         try:
             with base_utils.query_console_output(config.verbose, query, progress, task):
-                cursor.execute(query)
+                config.db.execute_with_stats(cursor, query)
 
         except Exception as e:  # pragma: no cover
             _query_error(
@@ -324,7 +771,7 @@ def _render_output(
         if is_toml:
             name = "config"
         else:
-            name = str(sqlglot.parse_one(output, dialect=config.db.db_type).find(sqlglot.exp.Table))
+            name = base_utils.parse_query(config, output).table
         new_filename = f"{config.stage}.{filename.rsplit('.', 1)[0]}.{index:02d}.{name}.{suffix}"
         file_path = data_path / f"{manifest.get_study_prefix()}/{new_filename}"
 
@@ -358,6 +805,8 @@ def _run_builder(
     parallel: bool = False,
     data_path: pathlib.Path,
     query_count: int | None = None,
+    build_state: _BuildState | None = None,
+    prepared_builder: BaseTableBuilder | None = None,
 ) -> tuple[list[str], bool]:
     """Loads a table builder from a file.
 
@@ -371,9 +820,72 @@ def _run_builder(
     :keyword parallel: If true, will execute queries in parallel
     :keyword data_path: If prepare is true, the path to write rendered data to
     :keyword query_count: if prepare is true, the number of queries already rendered
+    :keyword build_state: table fingerprints gathered so far in this build
+    :keyword prepared_builder: a builder for this file whose queries have already been
+        prepared (see _prepare_builders())
     :returns: a list of queries, a boolean indicating if parallel runs are allowed
     """
+    if prepared_builder:
+        table_builder = prepared_builder
+    else:
+        table_builder = _load_builder(manifest, filename)
+    parallel_allowed = parallel and table_builder.parallel_allowed
+    if write_reference_sql:
+        prefix = manifest.get_study_prefix()
+        table_builder.prepare_queries(config=config, manifest=manifest, parser=db_parser)
+        for query_pos in range(len(table_builder.queries)):
+            if "s3://" in table_builder.queries[query_pos]:
+                table_builder.queries[query_pos] = re.sub(
+                    f"s3://(.+){prefix}",
+                    f"s3://bucket/db_path/{prefix}",
+                    table_builder.queries[query_pos],
+                )
+        table_builder.comment_queries(doc_str=doc_str)
+        new_filename = pathlib.Path(f"{filename}").stem + ".sql"
+        table_builder.write_queries(
+            path=pathlib.Path(f"{manifest._study_path}/reference_sql/" + new_filename)
+        )
+    elif prepare:
+        if not prepared_builder:
+            table_builder.prepare_queries(
+                config=config,
+                manifest=manifest,
+                parser=db_parser,
+            )
+        _render_output(
+            config,
+            manifest,
+            table_builder.queries,
+            data_path,
+            filename,
+            query_count,
+        )
 
+    else:
+        if not prepared_builder:
+            table_builder.prepare_queries(
+                config=config,
+                manifest=manifest,
+                parser=db_parser,
+            )
+        if not parallel_allowed and not write_reference_sql:
+            table_builder.queries = _update_build_source_table(
+                config,
+                manifest,
+                table_builder.queries,
+                build_state=build_state,
+                skip_unchanged=bool(build_state and build_state.resume),
+            )
+            table_builder.execute_queries(
+                config=config,
+                manifest=manifest,
+                parser=db_parser,
+            )
+    return table_builder.queries, parallel_allowed
+
+
+def _load_builder(manifest: study_manifest.StudyManifest, filename: str) -> BaseTableBuilder:
+    """Loads and initializes the table builder defined in a file"""
     # Since we have to support arbitrary user-defined python files here, we
     # jump through some importlib hoops to import the module directly from
     # a source file defined in the manifest.
@@ -407,64 +919,67 @@ def _run_builder(
         filter(lambda x: x.__name__ != "CountsBuilder", table_builder_subclasses)
     )
 
-    # We'll get the subclass, initialize it, run the executor code, and then
-    # remove it so it doesn't interfere with the next python module to
-    # execute, since the subclass would otherwise hang around.
+    # We'll get the subclass, initialize it, and then remove the module so it
+    # doesn't interfere with the next python module to load, since the
+    # subclass would otherwise hang around.
     table_builder_class = table_builder_subclasses[0]
     table_builder = table_builder_class(manifest=manifest)
-    parallel_allowed = parallel and table_builder.parallel_allowed
-    if write_reference_sql:
-        prefix = manifest.get_study_prefix()
-        table_builder.prepare_queries(config=config, manifest=manifest, parser=db_parser)
-        for query_pos in range(len(table_builder.queries)):
-            if "s3://" in table_builder.queries[query_pos]:
-                table_builder.queries[query_pos] = re.sub(
-                    f"s3://(.+){prefix}",
-                    f"s3://bucket/db_path/{prefix}",
-                    table_builder.queries[query_pos],
-                )
-        table_builder.comment_queries(doc_str=doc_str)
-        new_filename = pathlib.Path(f"{filename}").stem + ".sql"
-        table_builder.write_queries(
-            path=pathlib.Path(f"{manifest._study_path}/reference_sql/" + new_filename)
-        )
-    elif prepare:
-        table_builder.prepare_queries(
-            config=config,
-            manifest=manifest,
-            parser=db_parser,
-        )
-        _render_output(
-            config,
-            manifest,
-            table_builder.queries,
-            data_path,
-            filename,
-            query_count,
-        )
+    del sys.modules[table_builder_module.__name__]
+    return table_builder
 
-    else:
-        table_builder.prepare_queries(
-            config=config,
-            manifest=manifest,
-            parser=db_parser,
-        )
-        if not parallel_allowed and not write_reference_sql:
-            table_builder.queries = _update_build_source_table(
-                config, manifest, table_builder.queries
-            )
-            table_builder.execute_queries(
+
+def _prepare_builders(
+    config: base_utils.StudyConfig,
+    manifest: study_manifest.StudyManifest,
+    filenames: list[str],
+    *,
+    db_parser: databases.DatabaseParser = None,
+    stream: bool = False,
+) -> dict[str, BaseTableBuilder]:
+    """Prepares the queries of the table builders in a parallel action concurrently
+
+    Builders often query the database while preparing (to check which fields are
+    populated, for example), and on a remote database those round trips add up,
+    so we run them all at once rather than one file at a time. Loading modules
+    isn't thread safe, so that part still happens serially.
+
+    Builders that don't allow parallel execution are skipped, since they run their
+    queries as they're visited.
+
+    :param config: a StudyConfig object
+    :param manifest: a StudyManifest object
+    :param filenames: the builder files in the action
+    :keyword db_parser: an object implementing DatabaseParser for the target database
+    :keyword stream: if true, builders that yield their queries as they go are
+        returned without being prepared, so that their queries can be streamed
+    :returns: a dict of filenames to builders (see `stream` for which are prepared)
+    """
+    builders = {}
+    for filename in filenames:
+        table_builder = _load_builder(manifest, filename)
+        if table_builder.parallel_allowed:
+            builders[filename] = table_builder
+    to_prepare = [
+        table_builder
+        for table_builder in builders.values()
+        if not (stream and _streams_queries(table_builder))
+    ]
+    if not to_prepare:
+        return builders
+    with futures.ThreadPoolExecutor(max_workers=config.db.max_concurrent) as executor:
+        prepares = [
+            executor.submit(
+                table_builder.prepare_queries,
                 config=config,
                 manifest=manifest,
                 parser=db_parser,
             )
-    # After running the executor code, we'll remove
-    # it so it doesn't interfere with the next python module to
-    # execute, since the subclass would otherwise hang around.
-    del sys.modules[table_builder_module.__name__]
-    del table_builder_module
-
-    return table_builder.queries, parallel_allowed
+            for table_builder in to_prepare
+        ]
+    # Surface any errors in manifest order
+    for prepare in prepares:
+        prepare.result()
+    return builders
 
 
 def _run_raw_queries(
@@ -477,6 +992,7 @@ def _run_raw_queries(
     prepare: bool,
     parallel: bool = False,
     query_count: int,
+    build_state: _BuildState | None = None,
 ) -> list[str]:
     """Creates tables in the schema by iterating through the sql_config.file_names
 
@@ -487,6 +1003,7 @@ def _run_raw_queries(
     :keyword data_path: If prepare is true, the path to write rendered data to
     :keyword parallel: If true, executes queries in parallel
     :keyword query_count: the number of queries currently processed
+    :keyword build_state: table fingerprints gathered so far in this build
     :returns: a list of queries
     """
     raw_queries = []
@@ -513,7 +1030,9 @@ def _run_raw_queries(
         )
         return cleaned_queries
     if not parallel:
-        cleaned_queries = _update_build_source_table(config, manifest, cleaned_queries)
+        cleaned_queries = _update_build_source_table(
+            config, manifest, cleaned_queries, build_state=build_state, skip_unchanged=True
+        )
         # We'll explicitly create a cursor since recreating cursors for each
         # table in a study is slightly slower for some databases
         cursor = config.db.cursor()
@@ -552,6 +1071,7 @@ def _run_workflow(
     notes: note_utils.NoteSource | None = None,
     nlp_config: note_utils.NlpConfig | None = None,
     parallel: bool = False,
+    build_state: _BuildState | None = None,
 ) -> tuple[list[str], bool, bool]:
     """Loads workflow config from toml definitions and executes workflow
 
@@ -565,6 +1085,7 @@ def _run_workflow(
     :keyword query_count: if prepare is true, the number of queries already rendered
     :keyword stage_name: the stage in the build currently being processed
     :keyword parallel; If true, execute queries in parallel if workflow allows
+    :keyword build_state: table fingerprints gathered so far in this build
     :returns: a list of queries, a bool flag for parallel being allowed, a bool flag
         for allowing use of the `nlp_` table prefix
     """
@@ -648,7 +1169,13 @@ def _run_workflow(
         table_suffix=safe_timestamp,
     )
     if not parallel or not builder.parallel_allowed:
-        builder.queries = _update_build_source_table(config, manifest, builder.queries)
+        builder.queries = _update_build_source_table(
+            config,
+            manifest,
+            builder.queries,
+            build_state=build_state,
+            skip_unchanged=bool(build_state and build_state.resume),
+        )
         builder.execute_queries(
             config=config,
             manifest=manifest,
@@ -687,8 +1214,7 @@ def log_ref_summary(
     summary_table = f"{prefix}{enums.ProtectedTables.REF_SUMMARY.value}"
 
     # We'll set this up early in indeterminate mode while we wait for the
-    # information_schema.tables query to run, since this can take a while
-    # in athena
+    # catalog lookups to run, since this can take a while in athena
     with base_utils.get_progress_bar() as progress_bar:
         task = progress_bar.add_task(
             "Generating summary statistics...",
@@ -696,38 +1222,16 @@ def log_ref_summary(
             visible=not config.verbose,
         )
 
-        # In Athena, if we try to do a like/regex type lookup on table name while
-        # looking for columns in an info schema query, we end up scanning the whole database.
-        # It ends up being much faster to get a list of tables and do a filter on the table
-        # being in the list instead, which bypasses the global search
-
-        study_tables_query = base_templates.get_select_from_single_query(
-            schema="information_schema",
-            table_name="tables",
-            columns=["table_name"],
-            where_clauses=[
-                [f"table_schema = '{config.schema}'", f"REGEXP_LIKE(table_name, '^({prefix}(.*))')"]
-            ],
-        )
-        study_tables = config.db.cursor().execute(study_tables_query).fetchall()
+        study_tables = [name for name, _ in config.db.list_tables(config.schema, prefix)]
         # Let's remove all the plumbing level tables from this list
         for reserved_slug in ["_dn_", "__etl_", "__nlp_", "__lib_"]:
-            study_tables = [x for x in study_tables if reserved_slug not in x[0]]
-        study_tables = f"""('{"', '".join([x[0] for x in study_tables])}')"""
-        ref_cols_query = base_templates.get_select_from_single_query(
-            schema="information_schema",
-            table_name="columns",
-            columns=["table_name", "column_name"],
-            where_clauses=[
-                [
-                    f"table_schema = '{config.schema}'",
-                    f"table_name in {study_tables}",
-                    "REGEXP_LIKE(column_name, '((.*)_ref)$')",
-                ]
-            ],
-        )
-
-        ref_cols = config.db.cursor().execute(ref_cols_query).fetchall()
+            study_tables = [x for x in study_tables if reserved_slug not in x]
+        ref_cols = [
+            (table, column)
+            for table in study_tables
+            for column, _ in config.db.get_column_types(config.schema, table)
+            if column.endswith("_ref")
+        ]
 
         prior_results_query = base_templates.get_select_from_single_query(
             schema=config.schema,
@@ -764,15 +1268,15 @@ def log_ref_summary(
             verbose=config.verbose,
             progress_bar=progress_bar,
             task=task,
+            result_policy=databases.ResultPolicy.FETCH,
+            max_rows=1,
         )
         new_rows = []
         event_time = str(datetime.datetime.utcnow())
         deltas = False
         for res in parallel_results:
             formatted_table = (
-                str(sqlglot.parse_one(res.query, dialect=config.db.db_type).find(sqlglot.exp.Table))
-                .split(".")[1]
-                .replace('"', "")
+                base_utils.parse_query(config, res.query).table.split(".")[1].replace('"', "")
             )
             prior_raw = prior_results.get(formatted_table, {}).get(res.columns[0], None)
 
@@ -820,6 +1324,7 @@ def _query_error(
     rich.print("--------", file=sys.stderr)
     rich.print(query, file=sys.stderr)
     rich.print("--------", file=sys.stderr)
+    log_utils.log_query_stats(config=config, manifest=manifest)
     log_utils.log_transaction(config=config, manifest=manifest, status=enums.LogStatuses.ERROR)
     rich.print(exit_message)
 
@@ -838,9 +1343,9 @@ def _check_query_for_errors(
     filename: str,
     nlp_prefix_allowed: bool = False,
 ):
-    try:
-        table = str(sqlglot.parse_one(query, dialect=config.db.db_type).find(sqlglot.exp.Table))
-    except sqlglot.errors.ParseError:
+    parsed = base_utils.parse_query(config, query)
+    table = parsed.table
+    if parsed.expression is None:
         _query_error(
             config,
             manifest,
@@ -866,9 +1371,7 @@ def _check_query_for_errors(
         protected_keywords.remove(enums.ProtectedTableKeywords.NLP)
     if any(
         f"{manifest.get_study_prefix()}__{word.value}_" in table for word in protected_keywords
-    ) and isinstance(
-        sqlglot.parse_one(query, dialect=config.db.db_type), sqlglot.expressions.Create
-    ):
+    ) and isinstance(parsed.expression, sqlglot.expressions.Create):
         _query_error(
             config,
             manifest,
@@ -1,11 +1,12 @@
 import pathlib
 
-import pandas
+import pyarrow
+import pyarrow.compute
+import pyarrow.parquet
 import rich
 from rich.progress import track
 
 from cumulus_library import base_utils, study_manifest
-from cumulus_library.template_sql import base_templates
 
 # Database exporting functions
 
@@ -24,6 +25,38 @@ def reset_counts_exports(
             file.unlink()
 
 
+def _sort_export(parquet_path: pathlib.Path, chunksize: int) -> None:
+    """Sorts an exported parquet file in place, and writes a csv copy of it
+
+    Rows are sorted by every column, descending, with nulls first.
+    """
+    table = pyarrow.parquet.read_table(parquet_path)
+    # We used to round-trip these through pandas, which reads integer columns that have
+    # nulls as floats. Do the same here, so that our output doesn't change.
+    for index, field in enumerate(table.schema):
+        if pyarrow.types.is_integer(field.type) and table.column(index).null_count:
+            table = table.set_column(index, field.name, table.column(index).cast(pyarrow.float64()))
+
+    # Older pyarrows don't allow per-column null placement, so we sort on whether each
+    # column is null before sorting on the column itself.
+    sort_table = table
+    sort_keys = []
+    for index, name in enumerate(table.column_names):
+        null_col = f"__is_null_{index}"
+        sort_table = sort_table.append_column(
+            null_col, pyarrow.compute.is_null(table.column(index), nan_is_null=True)
+        )
+        sort_keys += [(null_col, "descending"), (name, "descending")]
+    table = table.take(pyarrow.compute.sort_indices(sort_table, sort_keys=sort_keys))
+
+    pyarrow.parquet.write_table(table, parquet_path)
+    csv_path = parquet_path.with_suffix(".csv")
+    for index, batch in enumerate(table.to_batches(max_chunksize=chunksize)):
+        batch.to_pandas().to_csv(
+            csv_path, index=False, header=index == 0, mode="w" if index == 0 else "a"
+        )
+
+
 def export_study(
     config: base_utils.StudyConfig,
     manifest: study_manifest.StudyManifest,
@@ -47,12 +80,11 @@ def export_study(
     else:
         prefix = f"{manifest.get_study_prefix()}__"
     if archive:
-        table_query = base_templates.get_show_tables(config.schema, prefix)
-        result = config.db.cursor().execute(table_query).fetchall()
+        result = config.db.list_tables(config.schema, prefix)
         table_list = manifest.get_export_table_list(config.stage)
-        for row in result:
-            if row[0] not in table_list:
-                table_list.append(study_manifest.ManifestExport(name=row[0], export_type="archive"))
+        for name, table_type in result:
+            if table_type == "TABLE" and name not in table_list:
+                table_list.append(study_manifest.ManifestExport(name=name, export_type="archive"))
     else:
         table_list = manifest.get_export_table_list(config.stage)
     path = pathlib.Path(f"{data_path}/{manifest.get_study_prefix()}/")
@@ -65,17 +97,7 @@ def export_study(
         table.name = base_utils.update_query_if_schema_specified(table.name, manifest)
         file_name = f"{table.name}.{table.export_type}.parquet"
         if config.db.export_table_as_parquet(table.name, file_name, path):
-            parquet_path = path / file_name
-
-            df = pandas.read_parquet(parquet_path)
-            df = df.sort_values(
-                by=list(df.columns), ascending=False, ignore_index=True, na_position="first"
-            )
-            df.to_parquet(parquet_path)
-            df.to_csv(
-                (parquet_path).with_suffix(".csv"),
-                index=False,
-            )
+            _sort_export(path / file_name, chunksize)
         else:
             skipped_tables.append(table.name)
 
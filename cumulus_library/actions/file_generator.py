@@ -5,7 +5,6 @@ import pytablewriter
 
 from cumulus_library import base_utils, databases, study_manifest
 from cumulus_library.actions import builder
-from cumulus_library.template_sql import base_templates
 
 
 def run_generate_sql(
@@ -55,16 +54,20 @@ def run_generate_markdown(
     :param manifest: a StudyManifest object
     """
 
-    cursor = config.db.cursor()
-    query = base_templates.get_show_tables(
-        schema_name=config.schema, prefix=f"{manifest.get_study_prefix()}__"
-    )
-    tables = [x[0] for x in cursor.execute(query).fetchall()]
-    query = base_templates.get_column_datatype_query(
-        schema_name=config.schema, table_names=tables, include_table_names=True
-    )
+    tables = [
+        name
+        for name, table_type in config.db.list_tables(
+            config.schema, prefix=f"{manifest.get_study_prefix()}__"
+        )
+        if table_type == "TABLE"
+    ]
     study_df = pandas.DataFrame(
-        cursor.execute(query).fetchall(), columns=["Column", "Type", "Table"]
+        [
+            (column, column_type, table)
+            for table in tables
+            for column, column_type in config.db.get_column_types(config.schema, table)
+        ],
+        columns=["Column", "Type", "Table"],
     )
     with open(
         manifest._study_path / f"{manifest.get_study_prefix()}_generated.md",
@@ -1,5 +1,4 @@
 import pathlib
-import tempfile
 import zipfile
 
 import pyarrow.parquet
@@ -10,30 +9,19 @@ from cumulus_library.template_sql import base_templates
 
 
 def _create_table_from_parquet(
-    archive: zipfile.ZipFile, file: str, study_name: str, config: base_utils.StudyConfig
+    parquet_path: pathlib.Path, s3_path: str | None, config: base_utils.StudyConfig
 ):
-    try:
-        parquet_path = pathlib.Path(archive.extract(file), path=tempfile.TemporaryFile())
-        table_types = pyarrow.parquet.read_schema(parquet_path)
-        remote_types = config.db.col_parquet_types_from_pyarrow(table_types)
-        s3_path = config.db.upload_file(
-            file=parquet_path,
-            study=study_name,
-            topic=parquet_path.stem,
-            force_upload=True,
-            remote_filename=parquet_path.name,
-        )
-        query = base_templates.get_ctas_from_parquet_query(
-            schema_name=config.schema,
-            table_name=parquet_path.stem.replace(".", "_"),
-            local_location=f"{parquet_path.parent}",
-            remote_location=s3_path,
-            table_cols=table_types.names,
-            remote_table_cols_types=remote_types,
-        )
-        config.db.cursor().execute(query)
-    finally:
-        parquet_path.unlink()
+    table_types = pyarrow.parquet.read_schema(parquet_path)
+    remote_types = config.db.col_parquet_types_from_pyarrow(table_types)
+    query = base_templates.get_ctas_from_parquet_query(
+        schema_name=config.schema,
+        table_name=parquet_path.stem.replace(".", "_"),
+        local_location=f"{parquet_path.parent}",
+        remote_location=s3_path,
+        table_cols=table_types.names,
+        remote_table_cols_types=remote_types,
+    )
+    config.db.cursor().execute(query)
 
 
 def import_archive(config: base_utils.StudyConfig, *, archive_path: pathlib.Path):
@@ -72,6 +60,26 @@ def import_archive(config: base_utils.StudyConfig, *, archive_path: pathlib.Path
             total=len(files),
             visible=not config.verbose,
         )
-        for file in files:
-            _create_table_from_parquet(archive, file, study_name, config)
-            progress.advance(task)
+        parquet_paths = []
+        try:
+            for file in files:
+                parquet_paths.append(pathlib.Path(archive.extract(file)))
+            # Uploads are independent of each other, so we send them all at once
+            s3_paths = config.db.upload_files(
+                [
+                    {
+                        "file": parquet_path,
+                        "study": study_name,
+                        "topic": parquet_path.stem,
+                        "force_upload": True,
+                        "remote_filename": parquet_path.name,
+                    }
+                    for parquet_path in parquet_paths
+                ]
+            )
+            for parquet_path, s3_path in zip(parquet_paths, s3_paths, strict=True):
+                _create_table_from_parquet(parquet_path, s3_path, config)
+                progress.advance(task)
+        finally:
+            for parquet_path in parquet_paths:
+                parquet_path.unlink()
@@ -0,0 +1,224 @@
+"""Looks for query patterns that are slow (or expensive) to run at scale
+
+These checks are about performance, not correctness - the queries they flag will
+still run, but usually scan or produce far more data than they need to. That's easy
+to miss on a small test dataset, and expensive to find out about on Athena.
+
+Source tables are assumed to be the unprefixed FHIR resource tables from the ETL
+(i.e. names without a double underscore), which are wide and nested.
+"""
+
+import collections
+import dataclasses
+from collections.abc import Iterator
+
+import rich
+import rich.table
+import sqlglot
+
+from cumulus_library import base_utils
+
+# How many columns a CUBE can group by before we warn (it builds 2^n groupings)
+MAX_CUBE_COLUMNS = 6
+# How many leading wildcard matches a query can have before we warn. A few are often
+# unavoidable, but templates that loop over keyword lists can generate hundreds.
+MAX_WILDCARD_MATCHES = 5
+
+
+@dataclasses.dataclass(kw_only=True)
+class LintWarning:
+    """A possible performance problem found in a query
+
+    :keyword filename: the study file the query came from
+    :keyword table: the table the query creates (or first references)
+    :keyword rule: a short name for the kind of problem
+    :keyword message: a description of the problem and how to avoid it
+    """
+
+    filename: str
+    table: str
+    rule: str
+    message: str
+
+
+def _is_source_table(table: sqlglot.exp.Table, ctes: set[str]) -> bool:
+    name = table.name.lower()
+    return bool(name) and "__" not in name and (table.db or name not in ctes)
+
+
+def _check_select_star(
+    expression: sqlglot.exp.Expression, ctes: set[str]
+) -> Iterator[tuple[str, str]]:
+    for select in expression.find_all(sqlglot.exp.Select):
+        if not any(
+            isinstance(col, sqlglot.exp.Star) or isinstance(col.this, sqlglot.exp.Star)
+            for col in select.expressions
+        ):
+            continue
+        relations = [select.args.get("from_")] + [join for join in select.args.get("joins") or []]
+        sources = sorted(
+            {
+                rel.this.name.lower()
+                for rel in relations
+                if rel
+                and isinstance(rel.this, sqlglot.exp.Table)
+                and _is_source_table(rel.this, ctes)
+            }
+        )
+        if sources:
+            yield (
+                "select-star",
+                f"SELECT * reads every column of {', '.join(sources)}. "
+                "Select only the columns you need.",
+            )
+
+
+def _check_joins(expression: sqlglot.exp.Expression) -> Iterator[tuple[str, str]]:
+    for join in expression.find_all(sqlglot.exp.Join):
+        constrained = join.args.get("on") or join.args.get("using")
+        if isinstance(join.this, sqlglot.exp.Unnest):
+            # Unnesting a column of the joined table is the usual way to expand arrays,
+            # but unnesting something that doesn't depend on the row repeats every row
+            if not any(join.this.find_all(sqlglot.exp.Column)):
+                yield (
+                    "unconstrained-unnest",
+                    f"UNNEST of {join.this.expressions[0].sql()[:40]} doesn't depend on the "
+                    "rows it's joined to, so repeats every row for each of its values.",
+                )
+        elif join.kind == "CROSS" or (
+            # Comma joins are usually constrained by the WHERE clause instead
+            not join.kind
+            and not join.side
+            and not constrained
+            and not join.parent.args.get("where")
+        ):
+            yield (
+                "cross-join",
+                f"Cross join with {join.this.sql()[:40]} pairs every row with every row. "
+                "Join on a condition instead.",
+            )
+
+
+def _check_not_in(expression: sqlglot.exp.Expression) -> Iterator[tuple[str, str]]:
+    for not_expr in expression.find_all(sqlglot.exp.Not):
+        if isinstance(not_expr.this, sqlglot.exp.In) and not_expr.this.args.get("query"):
+            yield (
+                "not-in-subquery",
+                "NOT IN (subquery) can't be run as an anti-join, since it must also handle "
+                "NULLs. Use NOT EXISTS or a LEFT JOIN ... WHERE ... IS NULL instead.",
+            )
+
+
+def _check_wildcards(expression: sqlglot.exp.Expression) -> Iterator[tuple[str, str]]:
+    count = 0
+    for match in expression.find_all(sqlglot.exp.Like, sqlglot.exp.ILike, sqlglot.exp.RegexpLike):
+        pattern = match.expression
+        if not isinstance(pattern, sqlglot.exp.Literal) or not pattern.is_string:
+            continue
+        if isinstance(match, sqlglot.exp.RegexpLike):
+            # Our like()/ilike() macros render as anchored regexes
+            leading = not pattern.this.startswith("^") or pattern.this.startswith(
+                ("^.*", "^(?i:.*")
+            )
+        else:
+            leading = pattern.this.startswith("%")
+        count += leading
+    if count > MAX_WILDCARD_MATCHES:
+        yield (
+            "leading-wildcard",
+            f"{count} pattern matches start with a wildcard, so each one has to scan "
+            "every value. Consider matching against a table of keywords, or a single regex.",
+        )
+
+
+def _check_cte_scans(
+    expression: sqlglot.exp.Expression, ctes: set[str]
+) -> Iterator[tuple[str, str]]:
+    for with_expr in expression.find_all(sqlglot.exp.With):
+        readers = collections.defaultdict(list)
+        for cte in with_expr.expressions:
+            tables = {
+                table.name.lower()
+                for table in cte.this.find_all(sqlglot.exp.Table)
+                if _is_source_table(table, ctes)
+            }
+            for table in tables:
+                readers[table].append(cte.alias_or_name)
+        for table, names in sorted(readers.items()):
+            if len(names) > 1:
+                yield (
+                    "repeated-scan",
+                    f"{table} is scanned separately by CTEs {', '.join(names)}. "
+                    "Consider reading it once, in a single CTE they all share.",
+                )
+
+
+def _check_cubes(expression: sqlglot.exp.Expression) -> Iterator[tuple[str, str]]:
+    for cube in expression.find_all(sqlglot.exp.Cube):
+        if len(cube.expressions) > MAX_CUBE_COLUMNS:
+            yield (
+                "wide-cube",
+                f"CUBE over {len(cube.expressions)} columns builds "
+                f"{2 ** len(cube.expressions)} groupings. Consider splitting it into "
+                f"several counts over at most {MAX_CUBE_COLUMNS} columns.",
+            )
+
+
+def lint_query(config: base_utils.StudyConfig, query: str, filename: str) -> list[LintWarning]:
+    """Checks a single query for slow patterns
+
+    :param config: a StudyConfig object
+    :param query: the text of a single query
+    :param filename: the study file the query came from
+    :returns: a list of warnings (which is empty if the query can't be parsed)
+    """
+    parsed = base_utils.parse_query(config, query)
+    expression = parsed.expression
+    if expression is None:
+        return []
+    ctes = {cte.alias_or_name.lower() for cte in expression.find_all(sqlglot.exp.CTE)}
+    found = [
+        *_check_select_star(expression, ctes),
+        *_check_joins(expression),
+        *_check_not_in(expression),
+        *_check_wildcards(expression),
+        *_check_cte_scans(expression, ctes),
+        *_check_cubes(expression),
+    ]
+    # The same problem can show up more than once in a query (i.e. in a union)
+    return [
+        LintWarning(filename=filename, table=parsed.table, rule=rule, message=message)
+        for rule, message in dict.fromkeys(found)
+    ]
+
+
+def lint_queries(
+    config: base_utils.StudyConfig, queries: list[str], filename: str
+) -> list[LintWarning]:
+    """Checks a list of queries for slow patterns
+
+    :param config: a StudyConfig object
+    :param queries: the queries to check
+    :param filename: the study file the queries came from
+    :returns: a list of warnings
+    """
+    return [warning for query in queries for warning in lint_query(config, query, filename)]
+
+
+def print_warnings(warnings: list[LintWarning]) -> None:
+    """Prints a table of lint warnings
+
+    :param warnings: the warnings from lint_queries()
+    """
+    console = rich.get_console()
+    if not warnings:
+        console.print("No slow query patterns found.")
+        return
+    table = rich.table.Table(title="Possible slow queries")
+    table.add_column("File", style="green")
+    table.add_column("Table", style="cyan")
+    table.add_column("Rule")
+    table.add_column("Problem")
+    for warning in warnings:
+        table.add_row(warning.filename, warning.table, warning.rule, warning.message)
+    console.print(table)
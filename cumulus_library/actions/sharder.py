@@ -0,0 +1,197 @@
+"""Splits a DuckDB build across processes, each working on a slice of the patients
+
+Many study tables hold a row per FHIR resource, and a patient's resources only get
+joined with each other (or with shared resources like Locations). So we can split the
+NDJSON input by patient, build the study on each slice in its own process, and stitch
+those per-resource tables back together. We can't tell which tables are like that by
+looking at them (a table might rank a patient's rows against everyone else's, say), so
+a study lists them in its manifest's shard_safe_tables option. Every other table gets
+rebuilt from the merged tables afterwards.
+"""
+
+import contextlib
+import hashlib
+import json
+import multiprocessing
+import os
+import pathlib
+import shutil
+from concurrent import futures
+
+import cumulus_fhir_support
+
+from cumulus_library import base_utils, study_manifest
+
+# Resources that aren't about any one patient, which every shard gets a copy of
+SHARED_RESOURCES = frozenset(
+    {"Device", "Location", "Medication", "Organization", "Practitioner", "PractitionerRole"}
+)
+
+# Fields that can point a resource at its patient
+PATIENT_FIELDS = ("subject", "patient", "beneficiary")
+
+
+def get_patient_id(resource: dict) -> str | None:
+    """Returns the ID of the patient a resource belongs to, if any"""
+    if resource.get("resourceType") == "Patient":
+        return resource.get("id")
+    for field in PATIENT_FIELDS:
+        reference = resource.get(field)
+        if isinstance(reference, dict):
+            reference = reference.get("reference") or ""
+            if reference.startswith("Patient/"):
+                return reference.removeprefix("Patient/")
+    return None
+
+
+def get_shard(patient_id: str, shards: int) -> int:
+    """Returns which shard a patient's resources go in"""
+    digest = hashlib.sha256(patient_id.encode(), usedforsecurity=False).digest()
+    return int.from_bytes(digest[:8], "big") % shards
+
+
+def _partition_file(
+    path: str, resource_type: str | None, relative: pathlib.Path, shard_dirs: list[pathlib.Path]
+) -> None:
+    outputs = [shard_dir / relative for shard_dir in shard_dirs]
+    for output in outputs:
+        output.parent.mkdir(parents=True, exist_ok=True)
+    if resource_type is None:
+        # Not FHIR (like ETL metadata), so every shard gets the whole thing
+        for output in outputs:
+            shutil.copyfile(path, output)
+        return
+    with contextlib.ExitStack() as stack:
+        files = [stack.enter_context(open(output, "w", encoding="utf8")) for output in outputs]
+        for resource in cumulus_fhir_support.read_multiline_json(path):
+            line = json.dumps(resource) + "\n"
+            if (patient_id := get_patient_id(resource)) is not None:
+                files[get_shard(patient_id, len(files))].write(line)
+            elif resource.get("resourceType") in SHARED_RESOURCES:
+                for file in files:
+                    file.write(line)
+            else:
+                # A resource that should have a patient, but doesn't. As long as it
+                # only lands in one shard, it'll make it into the merged tables once.
+                # (Shard-safe tables can only join a resource to its own patient's
+                # resources, so this one has nothing else to be joined with.)
+                files[0].write(line)
+
+
+def partition_ndjson(
+    source_dir: str | pathlib.Path, dest_dir: pathlib.Path, shards: int
+) -> list[pathlib.Path]:
+    """Splits a folder of NDJSON into a folder per shard, by patient
+
+    Each shard folder mirrors the layout of the source folder. Resources that
+    belong to a patient go in that patient's shard, and shared resources (like
+    Locations and Practitioners) go in all of them.
+
+    :param source_dir: the folder of NDJSON to split
+    :param dest_dir: where to create the shard folders
+    :param shards: the number of shards to split into
+    :returns: the shard folders
+    """
+    source_dir = pathlib.Path(source_dir)
+    shard_dirs = [dest_dir / f"shard_{index}" for index in range(shards)]
+    for shard_dir in shard_dirs:
+        shard_dir.mkdir(parents=True, exist_ok=True)
+    files = cumulus_fhir_support.list_multiline_json_in_dir(source_dir, recursive=True)
+    # Parsing JSON is CPU bound, so we split each file in its own process
+    with futures.ProcessPoolExecutor(
+        max_workers=shards, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        splits = [
+            executor.submit(
+                _partition_file,
+                path,
+                resource_type,
+                pathlib.Path(os.path.relpath(path, source_dir)).with_suffix(".ndjson"),
+                shard_dirs,
+            )
+            for path, resource_type in files.items()
+        ]
+    for split in splits:
+        split.result()
+    return shard_dirs
+
+
+def _get_tables(cursor, catalog: str, schema: str) -> set[str]:
+    """Lists the tables (not views) in a shard"""
+    rows = cursor.execute(
+        "SELECT table_name FROM information_schema.tables "
+        "WHERE table_catalog = ? AND table_schema = ? AND table_type = 'BASE TABLE'",
+        [catalog, schema],
+    ).fetchall()
+    return {name.lower() for (name,) in rows}
+
+
+def _get_columns(cursor, source: str) -> list[tuple]:
+    return cursor.execute(f"DESCRIBE {source}").fetchall()
+
+
+def _is_same_everywhere(cursor, sources: list[str]) -> bool:
+    """Checks if a table has the same rows in every shard (i.e. it's from shared data)"""
+    count = cursor.execute(f"SELECT count(*) FROM {sources[0]}").fetchone()[0]  # noqa: S608
+    for source in sources[1:]:
+        if cursor.execute(f"SELECT count(*) FROM {source}").fetchone()[0] != count:  # noqa: S608
+            return False
+        diff = cursor.execute(
+            f"SELECT count(*) FROM (SELECT * FROM {sources[0]} EXCEPT ALL "  # noqa: S608
+            f"SELECT * FROM {source})"
+        ).fetchone()[0]
+        if diff:
+            return False
+    return True
+
+
+def merge_shards(
+    config: base_utils.StudyConfig,
+    manifest: study_manifest.StudyManifest,
+    shard_dbs: list[pathlib.Path],
+) -> set[str]:
+    """Copies the shard-safe study tables built in each shard into the main database
+
+    Only the tables listed in the manifest's shard_safe_tables are combined across
+    shards. If every shard has the same rows (because the table only reads shared
+    resources), a single copy is kept. Everything else (like counts, or anything that
+    compares one patient's data with another's) is left for the main build to make
+    from the merged tables.
+
+    Some builders pick a table's columns based on which fields the data has, so a
+    shard can end up with a different layout than the others. Those tables are also
+    left for the main build, since it sees all the data.
+
+    :param config: a StudyConfig object, for the main database
+    :param manifest: a StudyManifest object
+    :param shard_dbs: the DuckDB files of each shard
+    :returns: the names of the merged tables
+    """
+    schema = base_utils.get_schema(config, manifest)
+    shard_safe = manifest.get_shard_safe_tables()
+    if not shard_safe:
+        return set()
+    cursor = config.db.cursor()
+    catalogs = [f"shard_{index}" for index in range(len(shard_dbs))]
+    for catalog, shard_db in zip(catalogs, shard_dbs, strict=True):
+        cursor.execute(f"ATTACH '{shard_db}' AS {catalog} (READ_ONLY)")
+    try:
+        found = [_get_tables(cursor, catalog, schema) for catalog in catalogs]
+        merged = set()
+        for table in sorted(shard_safe.intersection(*found)):
+            sources = [f'{catalog}."{schema}"."{table}"' for catalog in catalogs]
+            columns = _get_columns(cursor, sources[0])
+            if any(_get_columns(cursor, source) != columns for source in sources[1:]):
+                continue
+            if _is_same_everywhere(cursor, sources):
+                select = f"SELECT * FROM {sources[0]}"  # noqa: S608
+            else:
+                selects = [f"SELECT * FROM {source}" for source in sources]  # noqa: S608
+                select = " UNION ALL ".join(selects)
+            cursor.execute(f'CREATE OR REPLACE TABLE "{schema}"."{table}" AS {select}')
+            merged.add(table)
+    finally:
+        for catalog in catalogs:
+            cursor.execute(f"DETACH {catalog}")
+    config.db.forget_catalog()
+    return merged
@@ -2,6 +2,7 @@
 
 import dataclasses
 import datetime
+import hashlib
 import json
 import pathlib
 import shutil
@@ -95,6 +96,70 @@ def parse_sql(sql_text: str) -> list[str]:
     return final_commands
 
 
+@dataclasses.dataclass(frozen=True)
+class ParsedQuery:
+    """A query parsed by sqlglot, along with the details we look up most often
+
+    :param expression: the parsed query, or None if it isn't valid SQL
+    :param table: the first table name found in the query (as rendered by sqlglot)
+    :param kind: for CREATE statements, the kind of object created (i.e. TABLE, VIEW)
+    """
+
+    expression: sqlglot.exp.Expression | None
+    table: str = ""
+    kind: str | None = None
+
+
+# Parsing is a noticeable chunk of build time for studies with lots of generated
+# queries, and several places inspect the same query, so we keep parsed queries
+# around for the duration of a build. Keys are a hash of the dialect and query text.
+_parsed_queries: dict[str, ParsedQuery] = {}
+
+
+def parse_query(config: StudyConfig, query: str) -> ParsedQuery:
+    """Parses a query in the dialect of the configured database, reusing prior results
+
+    The returned expression is shared with other callers, so don't modify it.
+
+    :param config: a StudyConfig object
+    :param query: the text of a single query
+    :returns: a ParsedQuery object
+    """
+    key = hashlib.sha256(f"{config.db.db_type}:{query}".encode()).hexdigest()
+    if parsed := _parsed_queries.get(key):
+        return parsed
+    try:
+        expression = sqlglot.parse_one(query, dialect=config.db.db_type)
+    except sqlglot.errors.ParseError:
+        parsed = ParsedQuery(expression=None)
+    else:
+        parsed = ParsedQuery(
+            expression=expression,
+            table=str(expression.find(sqlglot.exp.Table)),
+            kind=expression.kind if isinstance(expression, sqlglot.exp.Create) else None,
+        )
+    _parsed_queries[key] = parsed
+    return parsed
+
+
+def normalize_query(config: StudyConfig, query: str) -> str:
+    """Renders a query without comments or formatting differences, for comparisons
+
+    :param config: a StudyConfig object
+    :param query: the text of a single query
+    :returns: the normalized query (or the stripped original, if it isn't valid SQL)
+    """
+    parsed = parse_query(config, query)
+    if parsed.expression is None:
+        return query.strip()
+    return parsed.expression.sql(dialect=config.db.db_type, comments=False)
+
+
+def clear_parsed_queries() -> None:
+    """Empties the cache used by parse_query()"""
+    _parsed_queries.clear()
+
+
 @contextmanager
 def query_console_output(
     verbose: bool, query: str, progress_bar: progress.Progress, task: progress.Task
@@ -207,21 +272,64 @@ def get_viewtable_names_from_create_queries(
     """
     artifacts = []
     for query in queries:
-        try:
-            parser = sqlglot.parse_one(query, dialect=config.db.db_type)
-        except sqlglot.errors.ParseError:  # pragma: no cover
-            # We've got a comment as a query, which we can disregard
-            continue
-        if not isinstance(parser, sqlglot.expressions.Create):
+        parsed = parse_query(config, query)
+        # We'll skip things that aren't creates, including unparsable queries
+        # (i.e. we've got a comment as a query)
+        if parsed.kind is None:
             continue
-        table_name = str(parser.find(sqlglot.exp.Table))
+        table_name = parsed.table
         # if the schema is part of the name, we'll trim it and quotes
         if f'"{config.schema}"' in table_name or f"`{config.schema}`" in table_name:
             table_name = table_name.split(".", 1)[1].replace('"', "").replace("`", "")
-        artifacts.append((table_name, parser.kind))
+        artifacts.append((table_name, parsed.kind))
     return artifacts
 
 
+def get_query_dependencies(config: StudyConfig, query: str) -> tuple[set[str] | None, set[str]]:
+    """Parses a query and extracts the names of the tables/views it writes and reads
+
+    Names are lower cased, and are only prefixed with a schema if it differs from the
+    schema in the config. If the query can't be parsed, or isn't a statement that
+    targets a table or view, the set of written names will be None.
+
+    :param config: a StudyConfig object
+    :param query: a generated query
+    :returns a tuple of (written names, read names)
+    """
+
+    def _get_name(table: sqlglot.exp.Table) -> str:
+        name = table.name.lower()
+        if table.db and table.db.lower() != config.schema.lower():
+            name = f"{table.db.lower()}.{name}"
+        return name
+
+    parsed = parse_query(config, query).expression
+    if parsed is None:
+        return None, set()
+    if isinstance(parsed, sqlglot.exp.Create | sqlglot.exp.Drop):
+        if parsed.kind not in ("TABLE", "VIEW"):
+            return None, set()
+    elif not isinstance(
+        parsed, sqlglot.exp.Insert | sqlglot.exp.Delete | sqlglot.exp.Update | sqlglot.exp.Select
+    ):
+        return None, set()
+    target = None
+    if isinstance(parsed, sqlglot.exp.Drop):
+        target = parsed.find(sqlglot.exp.Table)
+    elif not isinstance(parsed, sqlglot.exp.Select) and parsed.this is not None:
+        target = parsed.this.find(sqlglot.exp.Table)
+    ctes = {cte.alias_or_name.lower() for cte in parsed.find_all(sqlglot.exp.CTE)}
+    reads = set()
+    for table in parsed.find_all(sqlglot.exp.Table):
+        if table is target or not table.name:
+            continue
+        if not table.db and table.name.lower() in ctes:
+            continue
+        reads.add(_get_name(table))
+    writes = {_get_name(target)} if target is not None else set()
+    return writes, reads - writes
+
+
 def pyarrow_types_from_hive_types(field_types: list[str]):
     new_types = []
     for field in field_types:
@@ -4,6 +4,7 @@ import abc
 import pathlib
 import sys
 import typing
+from collections.abc import Iterator
 
 from cumulus_library import base_utils, study_manifest
 
@@ -44,6 +45,28 @@ class BaseTableBuilder(abc.ABC):
         """
         raise NotImplementedError  # pragma: no cover
 
+    def iter_queries(
+        self,
+        config: base_utils.StudyConfig,
+        manifest: study_manifest.StudyManifest,
+        *args,
+        **kwargs,
+    ) -> Iterator[str]:
+        """Yields sql statements to execute, as they become ready
+
+        By default, this just yields the queries from prepare_queries. Builders that
+        spend a while working out their queries (probing tables, downloading or
+        uploading files) can override this to yield each query as soon as it's
+        known, so that builds using dependency scheduling can start running it
+        while the rest are prepared. If you override this, prepare_queries should
+        still populate self.queries, usually by consuming this generator.
+
+        :param config: A study configuration object
+        :param manifest: A study manifest object
+        """
+        self.prepare_queries(*args, config=config, manifest=manifest, **kwargs)
+        yield from self.queries
+
     @typing.final
     def execute_queries(
         self,
@@ -65,7 +88,7 @@ class BaseTableBuilder(abc.ABC):
         viewtables = base_utils.get_viewtable_names_from_create_queries(config, self.queries)
         if config.drop_table:
             for name, view_or_table in viewtables:
-                cursor.execute(f"DROP {view_or_table} IF EXISTS {name}")
+                config.db.execute_with_stats(cursor, f"DROP {view_or_table} IF EXISTS {name}")
 
         with base_utils.get_progress_bar(disable=config.verbose) as progress:
             task = progress.add_task(
@@ -77,7 +100,7 @@ class BaseTableBuilder(abc.ABC):
                 try:
                     query = base_utils.update_query_if_schema_specified(query, manifest)
                     with base_utils.query_console_output(config.verbose, query, progress, task):
-                        cursor.execute(query)
+                        config.db.execute_with_stats(cursor, query)
                 except Exception as e:  # pragma: no cover
                     sys.exit(f"An error occurred executing this query:\n----\n{query}\n----\n{e}")
 
@@ -174,6 +174,8 @@ class FileUploadBuilder(BaseTableBuilder):
                 "Uploading static files...",
                 total=len(self._workflow_config["tables"]),
             )
+            uploads = []
+            pending_queries = []
             for task_name in self._workflow_config["tables"]:
                 table = self._workflow_config["tables"][task_name]
 
@@ -236,22 +238,35 @@ class FileUploadBuilder(BaseTableBuilder):
                     arrow_table = arrow_table.cast(schema)
                     parquet_path.parent.mkdir(parents=True, exist_ok=True)
                     pyarrow.parquet.write_table(arrow_table, parquet_path)
-                    remote_path = config.db.upload_file(
-                        file=parquet_path,
-                        study=manifest.get_study_prefix(),
-                        topic=table_name,
-                        force_upload=table["always_upload"] or config.force_upload,
+                    uploads.append(
+                        {
+                            "file": parquet_path,
+                            "study": manifest.get_study_prefix(),
+                            "topic": table_name,
+                            "force_upload": table["always_upload"] or config.force_upload,
+                        }
                     )
                     if not generated_query or table["create_mode"] == "multiple":
-                        self.queries.append(
-                            base_templates.get_ctas_from_parquet_query(
-                                schema_name=config.schema,
-                                table_name=f"{manifest.get_study_prefix()}__{table_name}",
-                                local_location=local_location,
-                                remote_location=remote_path,
-                                table_cols=df.columns,
-                                remote_table_cols_types=table["col_types"],
-                            )
+                        pending_queries.append(
+                            {
+                                "schema_name": config.schema,
+                                "table_name": f"{manifest.get_study_prefix()}__{table_name}",
+                                "local_location": local_location,
+                                "table_cols": df.columns,
+                                "remote_table_cols_types": table["col_types"],
+                                "upload": len(uploads) - 1,
+                            }
                         )
                         generated_query = True
                 progress.advance(task)
+
+            # Now that all the files are ready, we can send them up together, and create
+            # tables pointing at wherever they landed
+            remote_paths = config.db.upload_files(uploads)
+            for query_args in pending_queries:
+                remote_path = remote_paths[query_args.pop("upload")]
+                self.queries.append(
+                    base_templates.get_ctas_from_parquet_query(
+                        remote_location=remote_path, **query_args
+                    )
+                )
@@ -189,7 +189,6 @@ class NlpBuilder(cumulus_library.BaseTableBuilder):
 
     def _run_nlp(self, config: cumulus_library.StudyConfig) -> None:
         # Gather note filters together
-        cursor = config.db.cursor()
         select_by_tables = {
             task.select_by_table for task in self._tables_to_build.values() if task.select_by_table
         }
@@ -214,7 +213,9 @@ class NlpBuilder(cumulus_library.BaseTableBuilder):
                     "Pass --etl-phi-dir and try again."
                 )
 
-        table_refs = {table: note_utils.get_table_refs(cursor, table) for table in select_by_tables}
+        table_refs = {
+            table: note_utils.get_table_refs(config.db, table) for table in select_by_tables
+        }
         note_filters = [
             self._make_note_filter(table_refs, task) for task in self._tables_to_build.values()
         ]
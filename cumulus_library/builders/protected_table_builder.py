@@ -37,6 +37,7 @@ class ProtectedTableBuilder(BaseTableBuilder):
         statistics = f"{prefix}{enums.ProtectedTables.STATISTICS.value}"
         build_source = f"{prefix}{enums.ProtectedTables.BUILD_SOURCE.value}"
         ref_summary = f"{prefix}{enums.ProtectedTables.REF_SUMMARY.value}"
+        query_stats = f"{prefix}{enums.ProtectedTables.QUERY_STATS.value}"
 
         self.queries.append(
             base_templates.get_ctas_empty_query(
@@ -54,6 +55,14 @@ class ProtectedTableBuilder(BaseTableBuilder):
                 const.REF_SUMMARY_COLS_TYPES,
             )
         )
+        self.queries.append(
+            base_templates.get_ctas_empty_query(
+                db_schema,
+                query_stats,
+                const.QUERY_STATS_COLS,
+                const.QUERY_STATS_COLS_TYPES,
+            )
+        )
         self.queries.append(
             base_templates.get_ctas_crud_query(
                 schema_name=db_schema,
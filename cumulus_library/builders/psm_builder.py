@@ -93,7 +93,7 @@ class PsmBuilder(BaseTableBuilder):
 
     def _get_sampled_ids(
         self,
-        cursor: databases.DatabaseCursor,
+        db: databases.DatabaseBackend,
         schema: str,
         query: str,
         sample_size: int,
@@ -104,7 +104,7 @@ class PsmBuilder(BaseTableBuilder):
 
         To use this, it is assumed you have already identified a cohort of positively
         IDed patients as a manual process.
-        :param cursor: A valid DatabaseCusror:
+        :param db: A valid DatabaseBackend
         :param schema: the schema/database name where the data exists
         :param query: a query generated from the psm_dsitinct_ids template
         :param sample_size: the number of records to include in the random sample.
@@ -112,7 +112,7 @@ class PsmBuilder(BaseTableBuilder):
         :param dependent_variable: the name to use for your filtering column
         :param is_positive: defines the value to be used for your filtering column
         """
-        df = cursor.execute(query).as_pandas()
+        df = db.execute_as_arrow(query).to_pandas()
         df = df.sort_values(by=[self.config.primary_ref])
         df = (
             df.sample(n=sample_size, random_state=self.config.seed)
@@ -125,14 +125,14 @@ class PsmBuilder(BaseTableBuilder):
         return df
 
     def _create_covariate_table(
-        self, cursor: databases.DatabaseCursor, schema: str, table_suffix: str
+        self, db: databases.DatabaseBackend, schema: str, table_suffix: str
     ):
         """Creates a covariate table from the loaded toml config"""
         # checks for primary & link ref being the same
         source_refs = list({self.config.primary_ref, self.config.count_ref} - {None})
         pos_query = psm_templates.get_distinct_ids(source_refs, self.config.pos_source_table)
         pos = self._get_sampled_ids(
-            cursor,
+            db,
             schema,
             pos_query,
             self.config.pos_sample_size,
@@ -146,7 +146,7 @@ class PsmBuilder(BaseTableBuilder):
             filter_table=self.config.pos_source_table,
         )
         neg = self._get_sampled_ids(
-            cursor,
+            db,
             schema,
             neg_query,
             self.config.neg_sample_size,
@@ -177,17 +177,19 @@ class PsmBuilder(BaseTableBuilder):
 
     def generate_psm_analysis(
         self,
-        cursor: databases.DatabaseCursor,
+        db: databases.DatabaseBackend,
         manifest: StudyManifest,
         schema: str,
         table_suffix: str,
     ):
         """Runs PSM statistics on generated tables"""
         stats_table = f"{self.config.target_table}_{table_suffix}"
-        cursor.execute(base_templates.get_alias_table_query(stats_table, self.config.target_table))
-        df = cursor.execute(
+        db.cursor().execute(
+            base_templates.get_alias_table_query(stats_table, self.config.target_table)
+        )
+        df = db.execute_as_arrow(
             base_templates.get_select_all_query(self.config.target_table)
-        ).as_pandas()
+        ).to_pandas()
         symptoms_dict = self._get_symptoms_dict(self.config.classification_json)
         for dependent_variable, codes in symptoms_dict.items():
             df[dependent_variable] = df["code"].apply(lambda x: 1 if x in codes else 0)
@@ -272,7 +274,7 @@ class PsmBuilder(BaseTableBuilder):
         table_suffix: str,
         **kwargs,
     ):
-        self._create_covariate_table(config.db.cursor(), config.schema, table_suffix)
+        self._create_covariate_table(config.db, config.schema, table_suffix)
 
     def post_execution(
         self,
@@ -282,4 +284,4 @@ class PsmBuilder(BaseTableBuilder):
         table_suffix: str | None = None,
         **kwargs,
     ):
-        self.generate_psm_analysis(config.db.cursor(), manifest, config.schema, table_suffix)
+        self.generate_psm_analysis(config.db, manifest, config.schema, table_suffix)
@@ -1,11 +1,15 @@
 #!/usr/bin/env python3
 """Utility for building/retrieving data views in AWS Athena"""
 
+import contextlib
 import copy
 import importlib.util
+import multiprocessing
 import os
 import pathlib
+import shutil
 import sys
+from concurrent import futures
 
 import cumulus_fhir_support as cfs
 import requests
@@ -23,11 +27,14 @@ from cumulus_library import (
     study_manifest,
 )
 from cumulus_library.actions import (
+    advisor,
     builder,
     cleaner,
     exporter,
     file_generator,
     importer,
+    linter,
+    sharder,
     uploader,
 )
 
@@ -61,6 +68,7 @@ class StudyRunner:
         options: dict[str, str],
         prefix: bool = False,
         skip_validation: bool = False,
+        delete_data: bool = False,
     ) -> None:
         """Removes study table/views from Athena.
 
@@ -72,6 +80,7 @@ class StudyRunner:
         :param study_dict: The dictionary of available study target
         :param options: The dictionary of study-specific options
         :keyword prefix: If True, does a search by string prefix in place of study name
+        :keyword delete_data: If True, also deletes the files behind removed tables
         """
         if prefix:
             manifest = study_manifest.StudyManifest(options=options)
@@ -80,10 +89,13 @@ class StudyRunner:
                 manifest=manifest,
                 prefix=target,
                 skip_validation=skip_validation,
+                delete_data=delete_data,
             )
         else:
             manifest = study_manifest.StudyManifest(study_dict[target], options=options)
-            cleaner.clean_study(config=self.get_config(manifest), manifest=manifest)
+            cleaner.clean_study(
+                config=self.get_config(manifest), manifest=manifest, delete_data=delete_data
+            )
 
     def clean_and_build_study(
         self,
@@ -95,6 +107,12 @@ class StudyRunner:
         data_path: pathlib.Path | None = None,
         notes: note_utils.NoteSource | None = None,
         nlp_config: note_utils.NlpConfig | None = None,
+        incremental: bool = False,
+        resume: bool = False,
+        shard_dbs: list[pathlib.Path] | None = None,
+        advise: bool = False,
+        apply_advice: bool = False,
+        lint: bool = False,
     ) -> None:
         """Recreates study views/tables
 
@@ -105,29 +123,50 @@ class StudyRunner:
         :keyword data_path: If prepare is true, the path to write rendered data to
         :keyword notes: Source to read notes from (for NLP)
         :keyword nlp_config: NLP config options from command line
+        :keyword incremental: If true, skip cleaning and only rebuild changed tables
+        :keyword resume: If true, skip cleaning and tables already built by an
+            interrupted build
+        :keyword shard_dbs: DuckDB files holding the study built on slices of the
+            patients, to merge in rather than building those tables from scratch
+        :keyword advise: If true, report suggested materialization changes afterwards
+        :keyword apply_advice: If true, build with the materialization changes suggested
+            by the query stats of earlier builds
+        :keyword lint: If true, warn about query patterns that are likely to be slow
         """
         manifest = study_manifest.StudyManifest(target, self.data_path, options=options)
+        prebuilt = None
+        materialize = None
         try:
             if not prepare:
                 builder.run_protected_table_builder(
                     config=self.get_config(manifest), manifest=manifest
                 )
-                if not continue_from:
+                if apply_advice:
+                    # This needs the tables from the last build, so comes before cleaning
+                    advice = advisor.get_advice(self.get_config(manifest), manifest)
+                    advisor.print_advice(advice, applied=True)
+                    materialize = {item.name: item.suggested for item in advice}
+                if not continue_from and not resume:
                     log_utils.log_transaction(
                         config=self.get_config(manifest),
                         manifest=manifest,
                         status=enums.LogStatuses.STARTED,
                     )
-                    cleaner.clean_study(
-                        config=self.get_config(manifest),
-                        manifest=manifest,
-                    )
+                    if not incremental:
+                        cleaner.clean_study(
+                            config=self.get_config(manifest),
+                            manifest=manifest,
+                        )
                 else:
                     log_utils.log_transaction(
                         config=self.get_config(manifest),
                         manifest=manifest,
                         status=enums.LogStatuses.RESUMED,
                     )
+                if shard_dbs:
+                    prebuilt = sharder.merge_shards(
+                        config=self.get_config(manifest), manifest=manifest, shard_dbs=shard_dbs
+                    )
 
             builder.build_study(
                 config=self.get_config(manifest),
@@ -137,7 +176,14 @@ class StudyRunner:
                 notes=notes,
                 nlp_config=nlp_config,
                 prepare=prepare,
+                incremental=incremental,
+                resume=resume,
+                prebuilt=prebuilt,
+                materialize=materialize,
+                lint=lint,
             )
+            if advise and not prepare:
+                advisor.print_advice(advisor.get_advice(self.get_config(manifest), manifest))
             if not prepare:
                 log_utils.log_transaction(
                     config=self.get_config(manifest),
@@ -151,6 +197,7 @@ class StudyRunner:
             raise e  # pragma: no cover
         except Exception as e:
             if not prepare:
+                log_utils.log_query_stats(config=self.get_config(manifest), manifest=manifest)
                 log_utils.log_transaction(
                     config=self.get_config(manifest),
                     manifest=manifest,
@@ -231,6 +278,28 @@ class StudyRunner:
         manifest = study_manifest.StudyManifest(target, options=options)
         file_generator.run_generate_sql(config=self.get_config(manifest), manifest=manifest)
 
+    def lint_study(
+        self,
+        target: pathlib.Path,
+        *,
+        options: dict[str, str],
+    ) -> None:
+        """Checks study sql for patterns that are likely to be slow
+
+        :param target: A path to the study directory
+        :param options: The dictionary of study-specific options
+        """
+        manifest = study_manifest.StudyManifest(target, options=options)
+        config = self.get_config(manifest)
+        study_queries = builder.get_study_queries(config=config, manifest=manifest)
+        linter.print_warnings(
+            [
+                warning
+                for filename, queries in study_queries.items()
+                for warning in linter.lint_queries(config, queries, filename)
+            ]
+        )
+
     def generate_study_markdown(
         self,
         target: pathlib.Path,
@@ -295,6 +364,53 @@ def get_studies_by_manifest_path(path: pathlib.Path) -> dict[str, pathlib.Path]:
     return manifest_paths
 
 
+def _run_shard(args: dict) -> None:
+    """Builds a study on one slice of the patients (run in its own process)"""
+    with open(f"{args['database']}.log", "w", encoding="utf8") as log:
+        with contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+            run_cli(args)
+
+
+def build_shards(args: dict) -> list[pathlib.Path]:
+    """Splits the NDJSON input by patient, and builds the study on each slice
+
+    :param args: the CLI arguments of the main build
+    :returns: the DuckDB files of each shard, in the order of the shards
+    """
+    console = rich.get_console()
+    shards = args["shards"]
+    work_dir = pathlib.Path(f"{args['database']}.shards")
+    shutil.rmtree(work_dir, ignore_errors=True)
+    console.print(f"[italic] Splitting patients into {shards} shards...")
+    shard_dirs = sharder.partition_ndjson(args["load_ndjson_dir"], work_dir, shards)
+    shard_args = [
+        {
+            **args,
+            "database": str(work_dir / f"{shard_dir.name}.db"),
+            "load_ndjson_dir": str(shard_dir),
+            "shards": None,
+            # So each shard only sizes DuckDB to its share of the machine
+            "duckdb_processes": shards,
+            "verbose": False,
+            "advise": False,
+            "apply_advice": False,
+        }
+        for shard_dir in shard_dirs
+    ]
+    console.print(f"[italic] Building {shards} shards...")
+    with futures.ProcessPoolExecutor(
+        max_workers=shards, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        builds = [executor.submit(_run_shard, shard) for shard in shard_args]
+    for build, shard in zip(builds, shard_args, strict=True):
+        if (exc := build.exception()) is not None:
+            sys.exit(
+                f"Building shard {shard['database']} failed: {exc!r}\n"
+                f"See {shard['database']}.log for details."
+            )
+    return [pathlib.Path(shard["database"]) for shard in shard_args]
+
+
 def run_cli(args: dict):
     """Controls which library tasks are run based on CLI arguments"""
     console = rich.get_console()
@@ -351,6 +467,7 @@ def run_cli(args: dict):
                     study_dict=study_dict,
                     prefix=args["prefix"],
                     skip_validation=args["skip_validation"],
+                    delete_data=args["delete_data"],
                     options=args["options"],
                 )
             elif args["action"] == "build":
@@ -367,6 +484,18 @@ def run_cli(args: dict):
                         nlp_config=nlp_config,
                     )
                 else:
+                    shard_dbs = None
+                    if args.get("shards"):
+                        manifest = study_manifest.StudyManifest(
+                            study_dict[target], options=args["options"]
+                        )
+                        if manifest.get_shard_safe_tables():
+                            shard_dbs = build_shards(args)
+                        else:
+                            console.print(
+                                f"[italic] {target} doesn't list any shard_safe_tables, "
+                                "so it will be built without shards."
+                            )
                     runner.clean_and_build_study(
                         study_dict[target],
                         continue_from=args["continue_from"],
@@ -375,7 +504,15 @@ def run_cli(args: dict):
                         data_path=args["data_path"],
                         notes=notes,
                         nlp_config=nlp_config,
+                        incremental=args["incremental"],
+                        resume=args["resume"],
+                        shard_dbs=shard_dbs,
+                        advise=args["advise"],
+                        apply_advice=args["apply_advice"],
+                        lint=args["lint"],
                     )
+                    if shard_dbs:
+                        shutil.rmtree(f"{args['database']}.shards")
 
             elif args["action"] == "export":
                 if args["archive"]:
@@ -408,6 +545,9 @@ def run_cli(args: dict):
             elif args["action"] == "generate-sql":
                 runner.generate_study_sql(study_dict[args["target"]], options=args["options"])
 
+            elif args["action"] == "lint":
+                runner.lint_study(study_dict[args["target"]], options=args["options"])
+
             elif args["action"] == "generate-md":
                 runner.generate_study_markdown(study_dict[args["target"]])
         finally:
@@ -463,6 +603,9 @@ def main(cli_args=None):
         ("schema_name", "CUMULUS_LIBRARY_SCHEMA_NAME"),
         ("database", "CUMULUS_LIBRARY_DATABASE"),
         ("max_concurrent", "CUMULUS_LIBRARY_MAX_CONCURRENT"),
+        ("duckdb_threads", "CUMULUS_LIBRARY_DUCKDB_THREADS"),
+        ("duckdb_memory_limit", "CUMULUS_LIBRARY_DUCKDB_MEMORY_LIMIT"),
+        ("duckdb_temp_dir", "CUMULUS_LIBRARY_DUCKDB_TEMP_DIR"),
         ("note_dir", "CUMULUS_LIBRARY_NOTE_DIR"),
         ("study_dir", "CUMULUS_LIBRARY_STUDY_DIR"),
         ("umls_key", "UMLS_API_KEY"),
@@ -517,6 +660,22 @@ def main(cli_args=None):
     if args.get("select_by_table") is not None and args.get("nlp_subtasks") is None:
         sys.exit("--select-by-table can only be used together with --nlp-subtask.")
 
+    if args.get("shards") is not None:
+        if args["shards"] < 1:
+            sys.exit("--shards must be at least 1.")
+        if args.get("db_type") != "duckdb" or not args.get("load_ndjson_dir"):
+            sys.exit("--shards can only be used with --db-type duckdb and --load-ndjson-dir.")
+        if args.get("database") in {None, ":memory:"}:
+            sys.exit("--shards needs a --database file to build into.")
+        if any(
+            args.get(arg)
+            for arg in ("builder", "continue_from", "incremental", "prepare", "resume")
+        ):
+            sys.exit(
+                "--shards can't be used with --builder, --continue, --incremental, "
+                "--prepare or --resume."
+            )
+
     if len(read_env_vars) > 0:
         table = rich.table.Table(title="Values read from environment variables")
         table.add_column("Environment Variable", style="green")
@@ -20,6 +20,30 @@ def add_aws_config(parser: argparse.ArgumentParser) -> None:
     )
 
 
+def add_duckdb_config(parser: argparse.ArgumentParser) -> None:
+    """Adds arguments related to DuckDB resource usage to a subparser"""
+    duck = parser.add_argument_group("DuckDB config")
+    duck.add_argument(
+        "--duckdb-threads",
+        type=int,
+        help="Number of threads DuckDB may use (default: one per available core)",
+        metavar="N",
+    )
+    duck.add_argument(
+        "--duckdb-memory-limit",
+        help="Memory DuckDB may use, like 8GB (default: 75%% of available memory)",
+        metavar="SIZE",
+    )
+    duck.add_argument(
+        "--duckdb-temp-dir",
+        help=(
+            "Where DuckDB spills data that doesn't fit in memory "
+            "(default: next to the database file)"
+        ),
+        metavar="DIR",
+    )
+
+
 def add_custom_option(parser: argparse.ArgumentParser) -> None:
     parser.add_argument(
         "-o",
@@ -82,8 +106,11 @@ def add_db_config(parser: argparse.ArgumentParser, input_mode: bool = False) ->
         "--max-concurrent",
         help=(
             "Specifies the upper limit of queries allowed to run in parallel. "
-            "The default is database dependent, but will be 20 in most cases. "
-            "If you run into memory issues with larger studies, you can dial this back."
+            "The default is database dependent. DuckDB runs a few queries at a time "
+            "based on your core count, since each query already uses several cores. "
+            "If you run into memory issues with larger studies, you can dial this back. "
+            "Athena adjusts its concurrency to what your workgroup can handle, and "
+            "only needs this if you want to cap it."
         ),
         type=int,
     )
@@ -93,9 +120,18 @@ def add_db_config(parser: argparse.ArgumentParser, input_mode: bool = False) ->
             help="Load ndjson files from this folder",
             metavar="DIR",
         )
+        group.add_argument(
+            "--ndjson-snapshot",
+            action="store_true",
+            help=(
+                "Copy the files from --load-ndjson-dir into the database, rather than "
+                "reading them for each query. Faster for large folders."
+            ),
+        )
 
     # Backend-specific config:
     add_aws_config(parser)
+    add_duckdb_config(parser)
 
 
 def add_study_dir_argument(parser: argparse.ArgumentParser) -> None:
@@ -325,6 +361,15 @@ AWS Athena, the following order of preference is used to select credentials:
         dest="stats_clean",
     )
 
+    clean.add_argument(
+        "--delete-data",
+        action="store_true",
+        help=(
+            "Also delete the S3 files behind the removed tables. "
+            "Athena otherwise leaves them in place."
+        ),
+    )
+
     # Database building
 
     build = actions.add_parser(
@@ -349,6 +394,50 @@ AWS Athena, the following order of preference is used to select credentials:
         dest="continue_from",
         help=argparse.SUPPRESS,
     )
+    build.add_argument(
+        "--incremental",
+        action="store_true",
+        help=(
+            "Skip cleaning, and only rebuild tables whose queries (or upstream tables) "
+            "changed since the last build. Do a full build after loading new data"
+        ),
+    )
+    build.add_argument(
+        "--resume",
+        action="store_true",
+        help=(
+            "Pick up an interrupted build where it stopped, skipping tables it already "
+            "built (unless their queries have changed since)"
+        ),
+    )
+    build.add_argument(
+        "--advise",
+        action="store_true",
+        help=(
+            "After building, suggest which views should be tables (because many "
+            "things read them) and which tables could be views (because only one "
+            "thing reads them), based on the query stats of builds so far"
+        ),
+    )
+    build.add_argument(
+        "--apply-advice",
+        action="store_true",
+        help="Build tables and views the way the last build's --advise would suggest",
+    )
+    build.add_argument(
+        "--lint",
+        action="store_true",
+        help="Warn about query patterns that are likely to be slow (see the lint action)",
+    )
+    build.add_argument(
+        "--shards",
+        type=int,
+        help=(
+            "Split patients across N processes, each building its own slice of the "
+            "study before they are merged (DuckDB only, needs --load-ndjson-dir)"
+        ),
+        metavar="N",
+    )
     build.add_argument(
         "--force-upload",
         action="store_true",
@@ -448,6 +537,16 @@ AWS Athena, the following order of preference is used to select credentials:
     add_target_argument(sql)
     add_study_dir_argument(sql)
 
+    # Check a study's queries for slow patterns
+
+    lint = actions.add_parser(
+        "lint", help="Checks a study's queries for patterns that are likely to be slow"
+    )
+    add_custom_option(lint)
+    add_db_config(lint, input_mode=True)
+    add_target_argument(lint)
+    add_study_dir_argument(lint)
+
     # Generate markdown tables for documentation
 
     markdown = actions.add_parser(
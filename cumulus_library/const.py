@@ -29,9 +29,41 @@ STATISTICS_COLS_TYPES = [
     "varchar",
     "timestamp",
 ]
-BUILD_SOURCE_COLS = ["stage", "name", "type"]
-BUILD_SOURCE_COLS_ATHENA_TYPE = ["string", "string", "string"]
-BUILD_SOURCE_COLS_SQL_TYPE = ["varchar", "varchar", "varchar"]
+# fingerprint is a hash of the queries that built a table, and of the fingerprints of
+# the tables those queries read from, which incremental builds use to find stale tables
+BUILD_SOURCE_COLS = ["stage", "name", "type", "fingerprint"]
+BUILD_SOURCE_COLS_ATHENA_TYPE = ["string", "string", "string", "string"]
+BUILD_SOURCE_COLS_SQL_TYPE = ["varchar", "varchar", "varchar", "varchar"]
 
 REF_SUMMARY_COLS = ["table_name", "ref_type", "ref_count", "delta_percent", "event_time"]
 REF_SUMMARY_COLS_TYPES = ["varchar", "varchar", "integer", "double", "timestamp"]
+
+# Times are in seconds, and data_scanned is in bytes. engine_time and data_scanned are
+# only available from databases that report them (i.e. Athena). reads is a comma
+# separated list of the tables & views the query read from
+QUERY_STATS_COLS = [
+    "study_name",
+    "stage",
+    "table_name",
+    "statement",
+    "wall_time",
+    "queue_wait",
+    "engine_time",
+    "row_count",
+    "data_scanned",
+    "event_time",
+    "reads",
+]
+QUERY_STATS_COLS_TYPES = [
+    "varchar",
+    "varchar",
+    "varchar",
+    "varchar",
+    "double",
+    "double",
+    "double",
+    "bigint",
+    "bigint",
+    "timestamp",
+    "varchar",
+]
@@ -1,4 +1,10 @@
 from .athena import AthenaDatabaseBackend, AthenaParser
-from .base import DatabaseBackend, DatabaseCursor, DatabaseParser
+from .base import (
+    DatabaseBackend,
+    DatabaseCursor,
+    DatabaseParser,
+    ResultPolicy,
+    get_catalog_changes,
+)
 from .duckdb import DuckDatabaseBackend, DuckDbParser
 from .utils import SQL_NAME_CHARS, create_db_backend, get_ndjson_files, read_ndjson_dir
@@ -9,18 +9,32 @@ import collections
 import hashlib
 import os
 import pathlib
+import threading
+import time
 from concurrent import futures
 
-import awswrangler
 import boto3
+import boto3.s3.transfer
 import botocore
+import botocore.config
 import pandas
 import pyarrow
+import pyarrow.csv
+import pyarrow.dataset
+import pyarrow.fs
+import pyarrow.parquet
 import pyathena
 import requests
+import rich
+from pyathena.arrow.converter import DefaultArrowTypeConverter
+from pyathena.arrow.cursor import ArrowCursor as AthenaArrowCursor
 from pyathena.async_cursor import AsyncCursor as AthenaAsyncCursor
 from pyathena.common import BaseCursor as AthenaCursor
+from pyathena.cursor import Cursor as AthenaDefaultCursor
+from pyathena.model import AthenaQueryExecution
 from pyathena.pandas.cursor import PandasCursor as AthenaPandasCursor
+from pyathena.result_set import AthenaResultSet
+from pyathena.util import RetryConfig, retry_api_call
 from rich import progress
 
 from cumulus_library import base_utils, errors
@@ -28,6 +42,349 @@ from cumulus_library.databases import base, utils
 
 AWS_ENV_VARS = ["AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY", "AWS_SESSION_TOKEN"]
 IID_BASE_URL = "http://169.254.169.254/latest"
+# If the user doesn't pick a max_concurrent, we start at the default and feel our way
+# up to this many queries in flight, as long as Athena keeps up with us.
+MAX_ADAPTIVE_CONCURRENCY = 100
+# Files bigger than this are uploaded to S3 in parts of this size, several at a time
+UPLOAD_PART_SIZE = 16 * 1024 * 1024
+UPLOAD_PART_CONCURRENCY = 8
+# How many files upload_files() sends at once
+UPLOAD_FILE_CONCURRENCY = 4
+
+
+class ConcurrencyController:
+    """Adjusts how many Athena queries we keep in flight, based on how Athena copes
+
+    This follows the usual additive increase/multiplicative decrease approach: the
+    limit goes up by one after each round of queries that didn't wait long in
+    Athena's queue, and is halved if queries start queueing or we get throttled.
+    Throttled submissions are retried after an exponentially growing delay.
+    """
+
+    def __init__(
+        self,
+        *,
+        start: int,
+        ceiling: int,
+        floor: int = 1,
+        target_queue_time: float = 2.0,
+        base_backoff: float = 1.0,
+        max_backoff: float = 60.0,
+    ):
+        """
+        :keyword start: the initial number of queries to allow in flight
+        :keyword ceiling: the most queries we'll ever allow in flight
+        :keyword floor: the fewest queries we'll ever allow in flight
+        :keyword target_queue_time: the seconds a query may spend queued in Athena
+            before we take it as a sign that we're running too many queries
+        :keyword base_backoff: the seconds to wait after the first throttled submission
+        :keyword max_backoff: the longest we'll wait between throttled submissions
+        """
+        self.ceiling = ceiling
+        self.floor = min(floor, ceiling)
+        self.limit = max(self.floor, min(start, ceiling))
+        self.target_queue_time = target_queue_time
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.in_flight = 0
+        self._backoff = 0.0
+        # We only adjust the limit once per round - that is, once the queries in
+        # flight when it last changed have finished, plus a full batch at the new
+        # limit - so that one congested round only halves it once
+        self._completed = 0
+        self._round = self.limit
+        self._condition = threading.Condition()
+
+    def acquire(self) -> None:
+        """Blocks until there's room for another query"""
+        with self._condition:
+            while self.in_flight >= self.limit:
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(
+        self, queue_time: float | None = None, *, failed: bool = False, throttled: bool = False
+    ) -> None:
+        """Frees a query's slot, adjusting the limit by how long it was queued
+
+        :param queue_time: the seconds the query spent queued in Athena, if known
+        :keyword failed: if True, the query failed or was cancelled. That doesn't tell
+            us whether Athena is keeping up, so the limit is left alone.
+        :keyword throttled: if True, the query failed because Athena throttled it,
+            so the limit is lowered
+        """
+        with self._condition:
+            self.in_flight -= 1
+            if throttled:
+                self._decrease()
+            elif not failed:
+                self._completed += 1
+                if self._completed >= self._round:
+                    if queue_time is not None and queue_time > self.target_queue_time:
+                        self._decrease()
+                    else:
+                        self._set_limit(min(self.ceiling, self.limit + 1))
+            self._condition.notify_all()
+
+    def started(self) -> None:
+        """Notes that a query was accepted, so we can stop backing off"""
+        with self._condition:
+            self._backoff = 0.0
+
+    def throttled(self) -> float:
+        """Notes that Athena throttled a submission
+
+        :returns: the seconds to wait before trying again
+        """
+        with self._condition:
+            self._decrease()
+            self._backoff = min(self.max_backoff, self._backoff * 2 or self.base_backoff)
+            return self._backoff
+
+    def _decrease(self) -> None:
+        self._set_limit(max(self.floor, self.limit // 2))
+
+    def _set_limit(self, limit: int) -> None:
+        self.limit = limit
+        self._completed = 0
+        self._round = self.in_flight + limit
+
+
+class QueryPoller:
+    """Checks on the status of many Athena queries at once
+
+    Rather than having a thread per query, each polling GetQueryExecution, this keeps
+    track of every query in flight and checks on them together with
+    BatchGetQueryExecution, which takes up to 50 query IDs per call. Its thread
+    only runs while there are queries to watch.
+    """
+
+    BATCH_SIZE = 50
+    # How many checks in a row Athena can fail to look up a query before we give up on it
+    MAX_UNPROCESSED_CHECKS = 10
+    FINISHED_STATES = (
+        AthenaQueryExecution.STATE_SUCCEEDED,
+        AthenaQueryExecution.STATE_FAILED,
+        AthenaQueryExecution.STATE_CANCELLED,
+    )
+
+    def __init__(
+        self, client, *, poll_interval: float = 1.0, retry_config: RetryConfig | None = None
+    ):
+        """
+        :param client: a boto3 Athena client
+        :keyword poll_interval: the seconds to wait between status checks
+        :keyword retry_config: how to retry throttled status checks
+        """
+        self.client = client
+        self.poll_interval = poll_interval
+        self.retry_config = retry_config or RetryConfig()
+        self._pending = {}
+        self._unprocessed = collections.Counter()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def watch(self, query_id: str) -> futures.Future:
+        """Starts watching a query
+
+        :param query_id: the ID of a query that has been started
+        :returns: a future that resolves to the query's AthenaQueryExecution once
+            it has finished (whether or not it succeeded)
+        """
+        future = futures.Future()
+        with self._lock:
+            self._pending[query_id] = future
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        return future
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.poll_interval)
+            with self._lock:
+                query_ids = list(self._pending)
+                if not query_ids:
+                    self._thread = None
+                    return
+            for start in range(0, len(query_ids), self.BATCH_SIZE):
+                self._poll(query_ids[start : start + self.BATCH_SIZE])
+
+    def _poll(self, query_ids: list[str]) -> None:
+        try:
+            response = retry_api_call(
+                self.client.batch_get_query_execution,
+                config=self.retry_config,
+                QueryExecutionIds=query_ids,
+            )
+        except Exception as e:
+            for query_id in query_ids:
+                self._pop(query_id).set_exception(pyathena.OperationalError(*e.args))
+            return
+        executions = response.get("QueryExecutions", [])
+        for execution in executions:
+            self._unprocessed.pop(execution["QueryExecutionId"], None)
+            if execution["Status"]["State"] in self.FINISHED_STATES:
+                self._pop(execution["QueryExecutionId"]).set_result(
+                    AthenaQueryExecution({"QueryExecution": execution})
+                )
+        # Any IDs Athena couldn't process this time (which it lists separately) are
+        # left pending, to be checked again on the next pass - but not forever
+        reasons = {
+            unprocessed["QueryExecutionId"]: unprocessed.get("ErrorMessage")
+            for unprocessed in response.get("UnprocessedQueryExecutionIds", [])
+        }
+        processed = {execution["QueryExecutionId"] for execution in executions}
+        for query_id in set(query_ids) - processed:
+            self._unprocessed[query_id] += 1
+            if self._unprocessed[query_id] >= self.MAX_UNPROCESSED_CHECKS:
+                self._pop(query_id).set_exception(
+                    pyathena.OperationalError(
+                        f"Could not check on query {query_id}: "
+                        f"{reasons.get(query_id) or 'Athena did not return its status'}"
+                    )
+                )
+
+    def _pop(self, query_id: str) -> futures.Future:
+        self._unprocessed.pop(query_id, None)
+        with self._lock:
+            return self._pending.pop(query_id)
+
+
+class BatchPolledCursor(AthenaDefaultCursor):
+    """A Cursor that waits on a shared QueryPoller, rather than polling on its own
+
+    After each query, it also passes the query to on_execute (if given), so that its
+    backend can tell which tables the query might have changed.
+    """
+
+    def __init__(
+        self,
+        *,
+        poller: QueryPoller,
+        on_execute: collections.abc.Callable[[str], None] | None = None,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self._poller = poller
+        self._on_execute = on_execute
+
+    def execute(self, operation: str, *args, **kwargs) -> "BatchPolledCursor":
+        try:
+            return super().execute(operation, *args, **kwargs)
+        finally:
+            # Even failed queries may have changed something
+            if self._on_execute:
+                self._on_execute(operation)
+
+    def _poll(self, query_id: str) -> AthenaQueryExecution:
+        polled = self._poller.watch(query_id)
+        try:
+            return polled.result()
+        except KeyboardInterrupt:
+            # Like pyathena's own polling, cancel the query if we're asked to
+            if not self._kill_on_interrupt:
+                raise
+            self._cancel(query_id)
+            return polled.result()
+
+
+class BatchPolledAsyncCursor(AthenaAsyncCursor):
+    """An AsyncCursor that leaves checking on its queries to a shared QueryPoller
+
+    Its workers are only used to fetch the results of finished queries.
+    """
+
+    def __init__(self, *, poller: QueryPoller, **kwargs):
+        super().__init__(**kwargs)
+        self._poller = poller
+
+    def execute(self, operation: str, parameters=None, **kwargs) -> tuple[str, futures.Future]:
+        query_id = self._execute(operation, parameters=parameters, **kwargs)
+        future = futures.Future()
+
+        def set_outcome(source: futures.Future) -> None:
+            if source.exception():
+                future.set_exception(source.exception())
+            else:
+                future.set_result(source.result())
+
+        def finished(polled: futures.Future) -> None:
+            if polled.exception():
+                set_outcome(polled)
+                return
+            self._executor.submit(self._get_result_set, polled.result()).add_done_callback(
+                set_outcome
+            )
+
+        self._poller.watch(query_id).add_done_callback(finished)
+        return query_id, future
+
+    def _get_result_set(self, query_execution: AthenaQueryExecution) -> AthenaResultSet:
+        return self._result_set_class(
+            connection=self._connection,
+            converter=self._converter,
+            query_execution=query_execution,
+            arraysize=self._arraysize,
+            retry_config=self._retry_config,
+        )
+
+
+def _glue_type_to_athena(glue_type: str) -> str:
+    """Converts a Glue (Hive-style) type to the form Athena's information_schema uses
+
+    For example, struct<code:string,codes:array<string>> becomes
+    row(code varchar, codes array(varchar)).
+    """
+    athena_type, _ = _parse_glue_type(glue_type.replace(" ", ""), 0)
+    return athena_type
+
+
+def _parse_glue_type(glue_type: str, pos: int) -> tuple[str, int]:
+    """Parses the type starting at pos, returning it and the position after it"""
+    start = pos
+    depth = 0
+    # Read up to the next delimiter, treating parens (like in decimal(10,2)) as opaque
+    while pos < len(glue_type) and (depth or glue_type[pos] not in "<>,:"):
+        depth += {"(": 1, ")": -1}.get(glue_type[pos], 0)
+        pos += 1
+    name = glue_type[start:pos].lower()
+    if pos >= len(glue_type) or glue_type[pos] != "<":
+        if name == "string" or name.startswith(("char(", "varchar(")):
+            return "varchar", pos
+        return {"int": "integer", "float": "real"}.get(name, name), pos
+
+    pos += 1  # skip <
+    members = []
+    while True:
+        field = None
+        if name == "struct":
+            colon = glue_type.index(":", pos)
+            field = glue_type[pos:colon].lower()
+            pos = colon + 1
+        member, pos = _parse_glue_type(glue_type, pos)
+        members.append(f"{field} {member}" if field else member)
+        pos += 1  # skip , or >
+        if glue_type[pos - 1] == ">":
+            break
+    return f"{'row' if name == 'struct' else name}({', '.join(members)})", pos
+
+
+def _is_not_found_error(error: botocore.exceptions.ClientError) -> bool:
+    return error.response.get("Error", {}).get("Code") == "EntityNotFoundException"
+
+
+def _is_throttling_error(error: Exception) -> bool:
+    return any(name in str(error) for name in ("TooManyRequestsException", "ThrottlingException"))
+
+
+def _hash_file(file: pathlib.Path) -> bytes:
+    """Returns the SHA256 digest of a file, without reading it all into memory"""
+    file_hash = hashlib.sha256(usedforsecurity=False)
+    with open(file, "rb") as f:
+        while chunk := f.read(UPLOAD_PART_SIZE):
+            file_hash.update(chunk)
+    return file_hash.digest()
 
 
 class AthenaDatabaseBackend(base.DatabaseBackend):
@@ -52,12 +409,37 @@ class AthenaDatabaseBackend(base.DatabaseBackend):
         self.schema_name = schema_name
         self.connection = None
         self.connect_kwargs = {}
+        self.poller = None
+        # AWS clients are shared by everything this backend does, since setting up a
+        # session and resolving its credentials is slow. See aws_client().
+        self._session = None
+        self._clients = {}
+        self._clients_lock = threading.RLock()
+        self._result_config = None
+        # A snapshot of the Glue catalog, kept for as long as this backend is around:
+        # {schema: {table: Glue table}}, listed in full the first time we look in a
+        # schema. Tables that queries have changed since then are tracked in
+        # {schema: {table names}}, and looked up again the next time they're needed.
+        # Worker threads forget tables as their queries finish, so both are guarded by
+        # _catalog_lock.
+        self._catalog = {}
+        self._stale_tables = {}
+        self._catalog_lock = threading.RLock()
+        self._known_schemas = set()
         self.max_concurrent = max_concurrent or 20
+        # A max_concurrent from the user is a hard limit, otherwise it's a starting point
+        self.concurrency = ConcurrencyController(
+            start=self.max_concurrent,
+            ceiling=max_concurrent or max(self.max_concurrent, MAX_ADAPTIVE_CONCURRENCY),
+        )
 
     def init_errors(self):  # pragma: no cover
         return ["COLUMN_NOT_FOUND", "TABLE_NOT_FOUND"]
 
     def connect(self):
+        with self._clients_lock:
+            self._session = None
+            self._clients = {}
         # the profile may not be required, provided the above three AWS env vars
         # are set. If both are present, the env vars take precedence
         if self.profile is not None:
@@ -103,14 +485,39 @@ class AthenaDatabaseBackend(base.DatabaseBackend):
             region_name=self.region,
             work_group=self.work_group,
             schema_name=self.schema_name,
+            config=self._client_config(),
             **self.connect_kwargs,
         )
 
     def cursor(self) -> AthenaCursor:
-        return self.connection.cursor()
+        # Anything might run DDL through a cursor (builders, third-party studies), so
+        # our cursors keep the catalog snapshot up to date as they go
+        return self.connection.cursor(
+            cursor=BatchPolledCursor, poller=self._get_poller(), on_execute=self._query_executed
+        )
+
+    def parallel_cursor(self) -> AthenaCursor:
+        # Worker threads all wait on the same poller, rather than each polling Athena
+        return self.cursor()
+
+    def _query_executed(self, query: str) -> None:
+        self.forget_catalog(base.get_catalog_changes([query], self.schema_name))
 
     def async_cursor(self) -> AthenaAsyncCursor:
-        return self.connection.cursor(cursor=AthenaAsyncCursor, max_workers=self.max_concurrent)
+        return self.connection.cursor(
+            cursor=BatchPolledAsyncCursor,
+            max_workers=self.max_concurrent,
+            poller=self._get_poller(),
+        )
+
+    def _get_poller(self) -> QueryPoller:
+        if self.poller is None:
+            self.poller = QueryPoller(
+                self.connection.client,
+                poll_interval=self.connection.poll_interval,
+                retry_config=self.connection.retry_config,
+            )
+        return self.poller
 
     def pandas_cursor(self) -> AthenaPandasCursor:
         return self.connection.cursor(cursor=AthenaPandasCursor)
@@ -121,9 +528,258 @@ class AthenaDatabaseBackend(base.DatabaseBackend):
         query = self.pandas_cursor().execute(sql, chunksize=chunksize)
         return query.as_pandas(), query.description
 
+    def execute_as_arrow(self, sql: str) -> pyarrow.Table:
+        return self.connection.cursor(cursor=AthenaArrowCursor).execute(sql).as_arrow()
+
+    def iter_record_batches(
+        self, sql: str, batch_size: int = 100000
+    ) -> collections.abc.Iterator[pyarrow.RecordBatch]:
+        # pyathena's ArrowCursor reads the whole result file into one table, so we read
+        # the same CSV file from S3 ourselves instead, a block at a time.
+        cursor = self.cursor()
+        cursor.execute(sql)
+        arrow_types = DefaultArrowTypeConverter().types
+        # Every column gets a type up front, since types guessed from the first block
+        # might not fit the blocks after it (and complex types come through as text)
+        schema = pyarrow.schema(
+            (col[0], arrow_types.get(col[1], pyarrow.string())) for col in cursor.description or []
+        )
+        location = cursor.output_location or ""
+        if not location.endswith(".csv"):
+            # Statements like DDL don't write a CSV file of results
+            yield pyarrow.RecordBatch.from_pylist([], schema=schema)
+            return
+        with self._s3_filesystem().open_input_stream(location.removeprefix("s3://")) as stream:
+            reader = pyarrow.csv.open_csv(
+                stream,
+                convert_options=pyarrow.csv.ConvertOptions(
+                    column_types=schema,
+                    quoted_strings_can_be_null=False,
+                    timestamp_parsers=[pyarrow.csv.ISO8601],
+                ),
+            )
+            empty = True
+            for block in reader:
+                for start in range(0, block.num_rows, batch_size):
+                    empty = False
+                    yield block.slice(start, batch_size)
+            if empty:
+                yield pyarrow.RecordBatch.from_pylist([], schema=reader.schema)
+
+    def get_query_stats(self, result: AthenaCursor | AthenaResultSet, query: str) -> dict:
+        stats = {}
+        if isinstance(result.engine_execution_time_in_millis, int):
+            stats["engine_time"] = result.engine_execution_time_in_millis / 1000
+        if isinstance(result.query_queue_time_in_millis, int):
+            stats["queue_wait"] = result.query_queue_time_in_millis / 1000
+        if isinstance(result.data_scanned_in_bytes, int):
+            stats["data_scanned"] = result.data_scanned_in_bytes
+        # Athena reports a row count for CTAS and INSERT queries, and -1 otherwise
+        if isinstance(result.rowcount, int) and result.rowcount >= 0:
+            stats["row_count"] = result.rowcount
+        return stats
+
+    def acquire_query_slot(self) -> None:
+        self.concurrency.acquire()
+
+    def release_query_slot(
+        self,
+        result: AthenaCursor | AthenaResultSet | None = None,
+        *,
+        error: BaseException | None = None,
+    ) -> None:
+        if error is not None:
+            self.concurrency.release(failed=True, throttled=_is_throttling_error(error))
+            return
+        queue_millis = result.query_queue_time_in_millis if result is not None else None
+        self.concurrency.release(queue_millis / 1000 if isinstance(queue_millis, int) else None)
+
+    def max_query_slots(self) -> int:
+        return self.concurrency.ceiling
+
     def parser(self) -> base.DatabaseParser:
         return AthenaParser()
 
+    def _client_config(self) -> botocore.config.Config:
+        # Leave room in each client's connection pool for every query we might have
+        # in flight (boto's default is 10)
+        return botocore.config.Config(max_pool_connections=max(10, self.concurrency.ceiling))
+
+    def session(self) -> boto3.Session:
+        """Returns the boto3 session shared by everything this backend does in AWS"""
+        with self._clients_lock:
+            if self._session is None:
+                if self.connection is not None:
+                    self._session = self.connection.session
+                else:
+                    self._session = boto3.Session(**self.connect_kwargs)
+            return self._session
+
+    def aws_client(self, service: str):
+        """Returns a boto3 client for an AWS service, shared by this whole backend
+
+        boto3 clients are thread-safe, so these can be used from worker threads.
+        """
+        if service == "athena" and self.connection is not None:
+            return self.connection.client
+        with self._clients_lock:
+            if service not in self._clients:
+                self._clients[service] = self.session().client(
+                    service, region_name=self.region, config=self._client_config()
+                )
+            return self._clients[service]
+
+    def glue_client(self):
+        return self.aws_client("glue")
+
+    def _s3_filesystem(self) -> pyarrow.fs.S3FileSystem:
+        """Returns a pyarrow filesystem for S3, using this backend's credentials"""
+        credentials = self.session().get_credentials()
+        if credentials is None:
+            return pyarrow.fs.S3FileSystem(region=self.region)
+        credentials = credentials.get_frozen_credentials()
+        return pyarrow.fs.S3FileSystem(
+            access_key=credentials.access_key,
+            secret_key=credentials.secret_key,
+            session_token=credentials.token,
+            region=self.region,
+        )
+
+    def _get_catalog(
+        self, schema_name: str, refresh: collections.abc.Iterable[str] = ()
+    ) -> dict[str, dict]:
+        """Gets a copy of a schema's snapshot, first looking up any stale tables in refresh"""
+        with self._catalog_lock:
+            if schema_name not in self._catalog:
+                tables = {}
+                try:
+                    paginator = self.glue_client().get_paginator("get_tables")
+                    for page in paginator.paginate(DatabaseName=schema_name):
+                        tables.update({table["Name"]: table for table in page["TableList"]})
+                except botocore.exceptions.ClientError as e:
+                    if not _is_not_found_error(e):
+                        raise
+                self._catalog[schema_name] = tables
+                self._stale_tables.pop(schema_name, None)
+            catalog = self._catalog[schema_name]
+            stale = self._stale_tables.get(schema_name, set())
+            for table_name in stale.intersection(refresh):
+                try:
+                    response = self.glue_client().get_table(
+                        DatabaseName=schema_name, Name=table_name
+                    )
+                    catalog[table_name] = response["Table"]
+                except botocore.exceptions.ClientError as e:
+                    if not _is_not_found_error(e):
+                        raise
+                    catalog.pop(table_name, None)
+                stale.discard(table_name)
+            return dict(catalog)
+
+    def _get_catalog_table(self, schema_name: str, table_name: str) -> dict | None:
+        return self._get_catalog(schema_name, refresh=[table_name]).get(table_name)
+
+    def list_tables(self, schema_name: str, prefix: str = "") -> list[tuple[str, str]]:
+        with self._catalog_lock:
+            stale = [
+                name for name in self._stale_tables.get(schema_name, ()) if name.startswith(prefix)
+            ]
+            catalog = self._get_catalog(schema_name, refresh=stale)
+        return [
+            (name, "VIEW" if table.get("TableType") == "VIRTUAL_VIEW" else "TABLE")
+            for name, table in catalog.items()
+            if name.startswith(prefix)
+        ]
+
+    def get_column_types(self, schema_name: str, table_name: str) -> list[tuple[str, str]]:
+        table = self._get_catalog_table(schema_name, table_name.lower())
+        if table is None:
+            return []
+        columns = table.get("StorageDescriptor", {}).get("Columns", []) + table.get(
+            "PartitionKeys", []
+        )
+        if not columns:
+            # Some table formats (like Delta Lake) don't always keep their schema in
+            # Glue, so we'll have to ask Athena
+            return super().get_column_types(schema_name, table_name)
+        return [(col["Name"].lower(), _glue_type_to_athena(col["Type"])) for col in columns]
+
+    def drop_tables(
+        self,
+        tables: list[tuple[str, str]],
+        *,
+        schema_name: str | None = None,
+        verbose: bool = False,
+        progress_bar: progress.Progress,
+        task: progress.TaskID,
+        delete_data: bool = False,
+    ) -> None:
+        """Drops tables and views by deleting them from the Glue catalog
+
+        Athena views live in Glue alongside tables, so both go the same way. This
+        takes one Glue call per 100 names, rather than an Athena query per name.
+        """
+        schema_name = schema_name or self.schema_name
+        names = [name for name, _ in tables]
+        locations = []
+        if delete_data:
+            for name in names:
+                table = self._get_catalog_table(schema_name, name) or {}
+                if location := table.get("StorageDescriptor", {}).get("Location"):
+                    locations.append(location)
+        failures = []
+        for start in range(0, len(names), 100):
+            batch = names[start : start + 100]
+            if verbose:
+                rich.print()
+                rich.print(f"Deleting from Glue database {schema_name}: {', '.join(batch)}")
+            response = self.glue_client().batch_delete_table(
+                DatabaseName=schema_name, TablesToDelete=batch
+            )
+            # Like DROP ... IF EXISTS, we don't mind if a table is already gone
+            failures += [
+                f"{error['TableName']}: {error['ErrorDetail'].get('ErrorMessage')}"
+                for error in response.get("Errors", [])
+                if error["ErrorDetail"].get("ErrorCode") != "EntityNotFoundException"
+            ]
+            if not verbose:
+                progress_bar.advance(task, len(batch))
+        if failures:
+            self.forget_catalog()
+            raise errors.AWSError("Could not drop some tables:\n" + "\n".join(failures))
+        # We know these are gone, so can skip looking them up again
+        with self._catalog_lock:
+            for name in names:
+                self._catalog.get(schema_name, {}).pop(name, None)
+                self._stale_tables.get(schema_name, set()).discard(name)
+        for location in locations:
+            self._delete_s3_prefix(location)
+
+    def _delete_s3_prefix(self, location: str) -> None:
+        bucket, _, key_prefix = location.removeprefix("s3://").partition("/")
+        if not key_prefix.strip("/"):
+            # We never want to empty a whole bucket
+            return
+        # Without the trailing slash, tables/abc would also match tables/abcd
+        key_prefix = key_prefix.rstrip("/") + "/"
+        s3_client = self.aws_client("s3")
+        paginator = s3_client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=bucket, Prefix=key_prefix):
+            if keys := [{"Key": obj["Key"]} for obj in page.get("Contents", [])]:
+                s3_client.delete_objects(Bucket=bucket, Delete={"Objects": keys, "Quiet": True})
+
+    def forget_catalog(
+        self, tables: collections.abc.Iterable[tuple[str, str]] | None = None
+    ) -> None:
+        with self._catalog_lock:
+            if tables is None:
+                self._catalog = {}
+                self._stale_tables = {}
+                return
+            for schema_name, table_name in tables:
+                if schema_name in self._catalog:
+                    self._stale_tables.setdefault(schema_name, set()).add(table_name)
+
     def operational_errors(self) -> tuple[type[Exception], ...]:
         return (pyathena.OperationalError,)
 
@@ -169,8 +825,11 @@ class AthenaDatabaseBackend(base.DatabaseBackend):
         return cols
 
     def _get_result_config(self) -> dict:
-        workgroup = self.connection._client.get_work_group(WorkGroup=self.work_group)
-        return workgroup["WorkGroup"]["Configuration"]["ResultConfiguration"]
+        # The workgroup won't change under us during a run, so we only look it up once
+        if self._result_config is None:
+            workgroup = self.connection._client.get_work_group(WorkGroup=self.work_group)
+            self._result_config = workgroup["WorkGroup"]["Configuration"]["ResultConfiguration"]
+        return self._result_config
 
     def _get_upload_subdir(self, study: str, topic: str) -> str:
         return f"cumulus_user_uploads/{self.schema_name}/{study}/{topic}"
@@ -215,43 +874,58 @@ class AthenaDatabaseBackend(base.DatabaseBackend):
         if not remote_filename:
             remote_filename = file.name
 
-        session = boto3.Session(profile_name=self.connection.profile_name)
-        s3_client = session.client("s3", region_name=self.region)
-
-        local_file_hash = hashlib.sha256(file.read_bytes(), usedforsecurity=False).digest()
-        if not force_upload:
-            res = s3_client.list_objects_v2(
-                Bucket=bucket,
-                Prefix=f"{s3_key}/{remote_filename}",
-            )
+        s3_client = self.aws_client("s3")
+        remote_key = f"{s3_key}/{remote_filename}"
 
-            if res["KeyCount"] > 0:
-                # Retrieve metadata about the remote file.
-                # ChecksumMode returns any checksum if it exists.
-                res = s3_client.head_object(
-                    Bucket=bucket, Key=f"{s3_key}/{remote_filename}", ChecksumMode="ENABLED"
-                )
+        local_file_hash = _hash_file(file)
+        if not force_upload and local_file_hash == self._get_remote_hash(
+            s3_client, bucket, remote_key
+        ):
+            return f"s3://{bucket}/{s3_key}"
 
-                # If the checksum exists and is equal to the local file's checksum, skip upload.
-                # Otherwise - overwrite if the files are different, or if the checksum doesn't
-                # exist. Metadata in S3 is immutable so the object needs to be overwritten.
-                if "ChecksumSHA256" in res:
-                    res_hash = base64.b64decode(res["ChecksumSHA256"])
-                    if res_hash == local_file_hash:
-                        return f"s3://{bucket}/{s3_key}"
-
-        with open(file, "rb") as b_file:
-            s3_client.put_object(
-                Bucket=bucket,
-                Key=f"{s3_key}/{remote_filename}",
-                Body=b_file,
-                ServerSideEncryption="aws:kms",
-                SSEKMSKeyId=kms_arn,
-                ChecksumAlgorithm="SHA256",
-                ChecksumSHA256=base64.b64encode(local_file_hash).decode("utf-8"),
-            )
+        # Multipart uploads don't get a whole-file checksum from S3, so we also keep our
+        # own hash in the object metadata for the comparison above.
+        extra_args = {
+            "ServerSideEncryption": "aws:kms",
+            "ChecksumAlgorithm": "SHA256",
+            "Metadata": {"sha256": base64.b64encode(local_file_hash).decode("utf-8")},
+        }
+        if kms_arn:
+            extra_args["SSEKMSKeyId"] = kms_arn
+        s3_client.upload_file(
+            str(file),
+            bucket,
+            remote_key,
+            ExtraArgs=extra_args,
+            Config=boto3.s3.transfer.TransferConfig(
+                multipart_threshold=UPLOAD_PART_SIZE,
+                multipart_chunksize=UPLOAD_PART_SIZE,
+                max_concurrency=UPLOAD_PART_CONCURRENCY,
+            ),
+        )
         return f"s3://{bucket}/{s3_key}"
 
+    def upload_files(self, uploads: list[dict]) -> list[str | None]:
+        with futures.ThreadPoolExecutor(max_workers=UPLOAD_FILE_CONCURRENCY) as executor:
+            return list(executor.map(lambda upload: self.upload_file(**upload), uploads))
+
+    def _get_remote_hash(self, s3_client, bucket: str, key: str) -> bytes | None:
+        """Returns the SHA256 digest of an uploaded file, if it exists and we know it"""
+        try:
+            res = s3_client.head_object(Bucket=bucket, Key=key, ChecksumMode="ENABLED")
+        except botocore.exceptions.ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+                return None
+            raise
+        if remote_hash := res.get("Metadata", {}).get("sha256"):
+            return base64.b64decode(remote_hash)
+        # Files uploaded in one piece by earlier versions only have S3's own checksum.
+        # (Multipart checksums look like "hash-partcount" and are not whole-file hashes.)
+        checksum = res.get("ChecksumSHA256")
+        if checksum and "-" not in checksum:
+            return base64.b64decode(checksum)
+        return None
+
     def _clean_bucket_path(self, client, bucket, res):
         for file in res["Contents"]:
             client.delete_object(Bucket=bucket, Key=file["Key"])
@@ -259,13 +933,8 @@ class AthenaDatabaseBackend(base.DatabaseBackend):
     def export_table_as_parquet(
         self, table_name: str, file_name: str, location: pathlib.Path, *args, **kwargs
     ) -> bool:
-        session = boto3.session.Session(
-            **self.connect_kwargs,
-        )
-        s3_client = session.client("s3", region_name=self.region)
-        workgroup = self.connection._client.get_work_group(WorkGroup=self.work_group)
-        wg_conf = workgroup["WorkGroup"]["Configuration"]["ResultConfiguration"]
-        s3_path = wg_conf["OutputLocation"]
+        s3_client = self.aws_client("s3")
+        s3_path = self._get_result_config()["OutputLocation"]
         bucket = "/".join(s3_path.split("/")[2:3])
         output_path = location / f"{file_name}"
         s3_path = f"s3://{bucket}/export/{file_name}"
@@ -279,14 +948,25 @@ class AthenaDatabaseBackend(base.DatabaseBackend):
             TO '{s3_path}'
             WITH (format='PARQUET', compression='SNAPPY')
             """)  # noqa: S608
-        # UNLOAD is not guaranteed to create a single file. AWS Wrangler's read_parquet
-        # allows us to ignore that wrinkle
-        try:
-            df = awswrangler.s3.read_parquet(s3_path, boto3_session=session)
-        except awswrangler.exceptions.NoFilesFound:
+        # UNLOAD is not guaranteed to create a single file, so we read whatever it wrote
+        # as one dataset, and copy that to our parquet file a batch at a time.
+        # (The exporter sorts the rows afterwards.)
+        filesystem = self._s3_filesystem()
+        files = [
+            info.path
+            for info in filesystem.get_file_info(
+                pyarrow.fs.FileSelector(
+                    s3_path.removeprefix("s3://"), allow_not_found=True, recursive=True
+                )
+            )
+            if info.type == pyarrow.fs.FileType.File
+        ]
+        if not files:
             return False
-        df = df.sort_values(by=list(df.columns), ascending=False, na_position="first")
-        df.to_parquet(output_path)
+        dataset = pyarrow.dataset.dataset(files, format="parquet", filesystem=filesystem)
+        with pyarrow.parquet.ParquetWriter(output_path, dataset.schema) as writer:
+            for batch in dataset.to_batches():
+                writer.write_batch(batch)
         res = s3_client.list_objects_v2(Bucket=bucket, Prefix=f"export/{file_name}")
         self._clean_bucket_path(s3_client, bucket, res)
         return True
@@ -297,37 +977,83 @@ class AthenaDatabaseBackend(base.DatabaseBackend):
         verbose: bool,
         progress_bar: progress.Progress,
         task: progress.Task,
+        *,
+        result_policy: base.ResultPolicy = base.ResultPolicy.DISCARD,
+        max_rows: int | None = None,
     ) -> list[base.ParallelResult]:
         def query_completed(f: futures.Future) -> None:  # pragma: no cover
             with base_utils.query_console_output(verbose, query, progress_bar, task):
                 pass
 
+        def release_slot(f: futures.Future) -> None:
+            if f.cancelled():
+                self.release_query_slot(error=futures.CancelledError())
+            elif f.exception():
+                self.release_query_slot(error=f.exception())
+            else:
+                self.release_query_slot(f.result())
+
         async_cursor = self.async_cursor()
         res = []
         for query in queries:
-            _, future = async_cursor.execute(query)
+            self.acquire_query_slot()
+            future = self._execute_with_backoff(async_cursor, query)
+            future.add_done_callback(release_slot)
             future.add_done_callback(query_completed)
             res.append((query, future))
-        utils.handle_concurrent_errors(res, self.db_type)
+        try:
+            utils.handle_concurrent_errors(res, self.db_type)
+        finally:
+            self.forget_catalog(base.get_catalog_changes(queries, self.schema_name))
         res_resolved = []
         for f in res:
             result_set = f[1].result()
+            # These queries run on Athena's side, so we go by its clock for wall time too
+            total_time = result_set.total_execution_time_in_millis
+            self.query_stats.append(
+                base.QueryStats(
+                    query=f[0],
+                    wall_time=total_time / 1000 if isinstance(total_time, int) else 0.0,
+                    **self.get_query_stats(result_set, f[0]),
+                )
+            )
             res_resolved.append(
                 base.ParallelResult(
                     query=f[0],
                     columns=[x[0] for x in result_set.description],
-                    rows=result_set.fetchmany(),
+                    rows=base.fetch_rows(result_set, result_policy, max_rows),
                 )
             )
         return res_resolved
 
+    def _execute_with_backoff(
+        self, async_cursor: AthenaAsyncCursor, query: str, max_attempts: int = 10
+    ) -> futures.Future:
+        """Starts a query, waiting and retrying for as long as Athena throttles us"""
+        for attempt in range(max_attempts):
+            try:
+                _, future = async_cursor.execute(query)
+                self.concurrency.started()
+                return future
+            except pyathena.DatabaseError as e:
+                if not _is_throttling_error(e) or attempt == max_attempts - 1:
+                    # Hand back a failed future, so this is reported with any other
+                    # failures once the batch is done
+                    future = futures.Future()
+                    future.set_exception(e)
+                    return future
+                time.sleep(self.concurrency.throttled())
+
     def create_schema(self, schema_name) -> None:
         """Creates a new schema object inside the database"""
-        glue_client = boto3.client("glue", region_name=self.region)
+        if schema_name in self._known_schemas:
+            return
+        glue_client = self.glue_client()
         try:
             glue_client.get_database(Name=schema_name)
         except botocore.exceptions.ClientError:
             glue_client.create_database(DatabaseInput={"Name": schema_name})
+        self._known_schemas.add(schema_name)
 
     def close(self) -> None:
         if self.connection is not None:  # pragma: no cover
@@ -11,7 +11,11 @@ wrapper method in one of DatabaseCursor or DatabaseBackend.
 import abc
 import collections
 import dataclasses
+import datetime
+import enum
 import pathlib
+import re
+import time
 from typing import Any, Protocol
 
 import pandas
@@ -19,11 +23,109 @@ import pyarrow
 from rich import progress
 
 
+class ResultPolicy(enum.Enum):
+    """How parallel_execute() should handle the rows each query returns"""
+
+    # Don't fetch any rows (for queries like CTAS, where we don't care about them)
+    DISCARD = "discard"
+    # Fetch every row (or the first max_rows rows) into ParallelResult.rows
+    FETCH = "fetch"
+    # Make ParallelResult.rows an iterator, which fetches rows as it is consumed
+    STREAM = "stream"
+
+
 @dataclasses.dataclass(kw_only=True)
 class ParallelResult:
     query: str
     columns: list[str]
-    rows: list[tuple]
+    rows: list[tuple] | collections.abc.Iterator[tuple]
+
+
+def fetch_rows(
+    cursor: "DatabaseCursor", result_policy: ResultPolicy, max_rows: int | None = None
+) -> list[tuple] | collections.abc.Iterator[tuple]:
+    """Gets the rows from an executed query, as asked for by a ResultPolicy
+
+    :param cursor: the cursor (or result set) of the executed query
+    :param result_policy: how to handle the rows
+    :param max_rows: for ResultPolicy.FETCH, the most rows to fetch
+    """
+    if result_policy == ResultPolicy.DISCARD:
+        return []
+    elif result_policy == ResultPolicy.STREAM:
+        return _stream_rows(cursor)
+    elif max_rows is not None:
+        return cursor.fetchmany(max_rows)
+    return cursor.fetchall()
+
+
+def _stream_rows(cursor: "DatabaseCursor", size: int = 1000) -> collections.abc.Iterator[tuple]:
+    while rows := cursor.fetchmany(size):
+        yield from rows
+
+
+# Queries that can't change which tables exist, or what columns they have
+_NO_CATALOG_CHANGE_REGEX = re.compile(
+    r"(?:SELECT|WITH|INSERT|UPDATE|DELETE|MERGE|SHOW|DESCRIBE|EXPLAIN|VALUES|UNLOAD)\b",
+    re.IGNORECASE,
+)
+# Queries that change a single table or view
+_CATALOG_CHANGE_REGEX = re.compile(
+    r"(?:CREATE\s+(?:OR\s+REPLACE\s+)?(?:EXTERNAL\s+)?(?:TABLE|VIEW)(?:\s+IF\s+NOT\s+EXISTS)?"
+    r"|DROP\s+(?:TABLE|VIEW)(?:\s+IF\s+EXISTS)?"
+    r"|ALTER\s+TABLE(?!.*\bRENAME\b))"
+    r"\s+(?P<name>[\w.\"`]+)",
+    re.IGNORECASE | re.DOTALL,
+)
+_LEADING_COMMENTS_REGEX = re.compile(r"(?:\s|--[^\n]*|/\*.*?\*/)*", re.DOTALL)
+
+
+def get_catalog_changes(
+    queries: collections.abc.Iterable[str], schema_name: str
+) -> set[tuple[str, str]] | None:
+    """Works out which tables and views some queries might have created, dropped or altered
+
+    :param queries: the queries that were run
+    :param schema_name: the schema that names without one are in
+    :returns: a set of (schema, name) tuples, or None if a query might have changed
+        the catalog in a way we can't tell (like creating a schema)
+    """
+    changes = set()
+    for query in queries:
+        query = query[_LEADING_COMMENTS_REGEX.match(query).end() :]
+        if _NO_CATALOG_CHANGE_REGEX.match(query):
+            continue
+        if not (match := _CATALOG_CHANGE_REGEX.match(query)):
+            return None
+        *schema, name = match["name"].replace('"', "").replace("`", "").lower().split(".")
+        changes.add((schema[-1] if schema else schema_name, name))
+    return changes
+
+
+@dataclasses.dataclass(kw_only=True)
+class QueryStats:
+    """Timing and cost details for a single executed query
+
+    Times are in seconds. Details a database can't report are left as None.
+
+    :keyword query: the executed query
+    :keyword wall_time: time spent executing, as seen by the library
+    :keyword queue_wait: time spent waiting for a worker or database slot before executing
+    :keyword engine_time: time the database engine reports spending on the query
+    :keyword row_count: rows written by the query
+    :keyword data_scanned: bytes the database engine reports reading
+    :keyword event_time: when the query finished
+    """
+
+    query: str
+    wall_time: float
+    queue_wait: float = 0.0
+    engine_time: float | None = None
+    row_count: int | None = None
+    data_scanned: int | None = None
+    event_time: datetime.datetime = dataclasses.field(
+        default_factory=lambda: datetime.datetime.now(datetime.UTC).replace(microsecond=0)
+    )
 
 
 class DatabaseCursor(Protocol):
@@ -131,6 +233,8 @@ class DatabaseBackend(abc.ABC):
         # technology
         self.db_type = None
         self.max_concurrent = max_concurrent
+        # Stats for executed queries, until they're written to a study's query stats table
+        self.query_stats: list[QueryStats] = []
 
     @abc.abstractmethod
     def init_errors(self) -> list:
@@ -144,6 +248,15 @@ class DatabaseBackend(abc.ABC):
     def cursor(self) -> DatabaseCursor:
         """Returns a connection to the backing database"""
 
+    def parallel_cursor(self) -> DatabaseCursor:
+        """Returns a new connection to the backing database, for use from a worker thread
+
+        By default, this is just a new cursor. Override this if your database shares a
+        single connection for cursor() calls, or needs per-cursor setup before it can
+        see every table a query may read.
+        """
+        return self.cursor()
+
     @abc.abstractmethod
     def pandas_cursor(self) -> DatabaseCursor:
         """Returns a connection to the backing database optimized for dataframes
@@ -158,10 +271,137 @@ class DatabaseBackend(abc.ABC):
     ) -> (pandas.DataFrame | collections.abc.Iterator[pandas.DataFrame], list[tuple]):
         """Returns a pandas.DataFrame version of the results from the provided SQL"""
 
+    def execute_as_arrow(self, sql: str) -> pyarrow.Table:
+        """Returns a pyarrow.Table version of the results from the provided SQL
+
+        By default, this builds a table from a vanilla cursor's rows. Override this if
+        your database can provide Arrow data directly.
+        """
+        cursor = self.cursor()
+        cursor.execute(sql)
+        names = [col[0] for col in cursor.description]
+        rows = cursor.fetchall()
+        columns = list(zip(*rows, strict=True)) if rows else [[] for _ in names]
+        return pyarrow.Table.from_arrays([pyarrow.array(col) for col in columns], names=names)
+
+    def iter_record_batches(
+        self, sql: str, batch_size: int = 100000
+    ) -> collections.abc.Iterator[pyarrow.RecordBatch]:
+        """Yields the results from the provided SQL as a series of pyarrow.RecordBatches
+
+        This is intended for results that might be too large to comfortably hold in
+        memory at once. By default, this just slices up execute_as_arrow(), so override
+        it if your database can stream Arrow data.
+
+        At least one batch (which may be empty) is always yielded, so that callers
+        can see the schema of the results.
+
+        :param sql: the query to run
+        :param batch_size: the most rows to put in a single batch
+        """
+        table = self.execute_as_arrow(sql)
+        yield from table.to_batches(max_chunksize=batch_size) or [
+            pyarrow.RecordBatch.from_pylist([], schema=table.schema)
+        ]
+
     @abc.abstractmethod
     def parser(self) -> DatabaseParser:
         """Returns parser object for interrogating DB schemas"""
 
+    def list_tables(self, schema_name: str, prefix: str = "") -> list[tuple[str, str]]:
+        """Lists the tables and views in a schema
+
+        By default, this queries information_schema. Override this if your database
+        has a faster way to look through its catalog.
+
+        :param schema_name: the schema to look in
+        :param prefix: if provided, only names starting with this are listed
+        :returns: a list of (name, type) tuples, where type is 'TABLE' or 'VIEW'
+        """
+        rows = (
+            self.cursor()
+            .execute(
+                "SELECT table_name, table_type FROM information_schema.tables "  # noqa: S608
+                f"WHERE table_schema = '{schema_name}'"
+            )
+            .fetchall()
+        )
+        return [
+            (name, "VIEW" if table_type == "VIEW" else "TABLE")
+            for name, table_type in rows
+            if name.startswith(prefix)
+        ]
+
+    def get_column_types(self, schema_name: str, table_name: str) -> list[tuple[str, str]]:
+        """Gets the columns of a table, along with their database-specific types
+
+        By default, this queries information_schema. Override this if your database
+        has a faster way to look through its catalog.
+
+        :param schema_name: the schema the table is in
+        :param table_name: the table to look at
+        :returns: a list of (column name, type) tuples, in the form expected by
+            DatabaseParser.validate_table_schema(). If the table doesn't exist, this
+            list is empty.
+        """
+        try:
+            return (
+                self.cursor()
+                .execute(
+                    "SELECT column_name, data_type FROM information_schema.columns "  # noqa: S608
+                    f"WHERE table_schema = '{schema_name}' "
+                    f"AND table_name = '{table_name.lower()}'"
+                )
+                .fetchall()
+            )
+        except self.operational_errors():
+            # A database backend might reasonably raise an exception in cases like
+            # the table not existing (Athena does this).
+            return []
+
+    def drop_tables(
+        self,
+        tables: list[tuple[str, str]],
+        *,
+        schema_name: str | None = None,
+        verbose: bool = False,
+        progress_bar: progress.Progress,
+        task: progress.TaskID,
+        delete_data: bool = False,
+    ) -> None:
+        """Drops a list of tables and views
+
+        By default, this runs a DROP statement for each through parallel_write().
+        Override this if your database has a faster way to drop tables in bulk.
+
+        :param tables: a list of (name, type) tuples, where type is 'TABLE' or 'VIEW'
+        :keyword schema_name: the schema the tables are in, if not the default schema
+        :keyword verbose: if True, print what is being dropped instead of advancing
+            the progress bar
+        :keyword progress_bar: a progress bar to advance as tables are dropped
+        :keyword task: the progress bar task to advance
+        :keyword delete_data: if True, also delete any files behind the tables, for
+            databases where dropping a table leaves its data in place
+        """
+        if schema_name and schema_name != self.schema_name:
+            tables = [
+                (f'"{schema_name}"."{name}"', view_or_table) for name, view_or_table in tables
+            ]
+        queries = [f"DROP {view_or_table} IF EXISTS {name};" for name, view_or_table in tables]
+        self.parallel_write(queries, verbose, progress_bar, task)
+
+    def forget_catalog(
+        self, tables: collections.abc.Iterable[tuple[str, str]] | None = None
+    ) -> None:
+        """Drops catalog lookups that list_tables() and friends have remembered
+
+        This is called whenever we run something that might change the catalog. By
+        default, nothing is remembered, so this does nothing.
+
+        :param tables: (schema, name) tuples of the tables and views that might have
+            changed (see get_catalog_changes()). If None, anything might have changed.
+        """
+
     def operational_errors(self) -> tuple[type[Exception], ...]:
         """Returns a tuple of operational exception classes
 
@@ -199,6 +439,13 @@ class DatabaseBackend(abc.ABC):
         have an API for file upload (i.e. cloud databases)"""
         return None
 
+    def upload_files(self, uploads: list[dict]) -> list[str | None]:
+        """Uploads several files, returning their remote paths in the same order
+
+        Each upload is a dict of upload_file() keyword arguments. Databases that can
+        upload files concurrently should override this."""
+        return [self.upload_file(**upload) for upload in uploads]
+
     def get_remote_path(self) -> str | None:
         """Fetches the remote path for file storage
 
@@ -225,6 +472,64 @@ class DatabaseBackend(abc.ABC):
         so we don't have to infer schema information. Only do schema inferring if your
         DB engine does not support parquet natively. If a table is empty, return None."""
 
+    def execute_with_stats(
+        self, cursor: DatabaseCursor, query: str, *, queued_at: float | None = None
+    ) -> Any:
+        """Executes a query on a cursor, recording a QueryStats entry for it
+
+        :param cursor: the cursor to execute the query with
+        :param query: the query to execute
+        :keyword queued_at: the time.monotonic() value when the query was queued, if
+            it had to wait for a worker
+        :returns: the result of cursor.execute()
+        """
+        started = time.monotonic()
+        result = cursor.execute(query)
+        self.forget_catalog(get_catalog_changes([query], self.schema_name))
+        stats = QueryStats(
+            query=query,
+            wall_time=time.monotonic() - started,
+            queue_wait=0.0 if queued_at is None else started - queued_at,
+        )
+        for key, value in self.get_query_stats(cursor, query).items():
+            setattr(stats, key, value)
+        self.query_stats.append(stats)
+        return result
+
+    def acquire_query_slot(self) -> None:
+        """Blocks until the database has room for another concurrent query
+
+        Code that runs queries concurrently (like the QueryScheduler) calls this before
+        starting each query, and release_query_slot() once it has finished. By default,
+        there is always room, since callers already keep to max_concurrent queries.
+        Override these if your database can tell when it is being given too much work.
+        """
+
+    def release_query_slot(self, result: Any = None, *, error: BaseException | None = None) -> None:
+        """Frees the slot a query took with acquire_query_slot()
+
+        :param result: the cursor (or result set) of the query, if it succeeded
+        :keyword error: the exception the query raised, if it failed
+        """
+
+    def max_query_slots(self) -> int:
+        """Returns the most queries acquire_query_slot() might ever allow at once"""
+        return self.max_concurrent
+
+    def get_query_stats(self, result: Any, query: str) -> dict:
+        """Returns any details the database reports about a query it just executed
+
+        :param result: the cursor (or result set) of the executed query
+        :param query: the executed query
+        :returns: a dict of QueryStats fields to values
+        """
+        return {}
+
+    def pop_query_stats(self) -> list[QueryStats]:
+        """Returns the stats for queries executed so far, clearing them"""
+        stats, self.query_stats = self.query_stats, []
+        return stats
+
     def parallel_write(self, *args, **kwargs) -> list[ParallelResult]:
         return self.parallel_execute(*args, **kwargs)
 
@@ -235,6 +540,9 @@ class DatabaseBackend(abc.ABC):
         verbose: bool,
         progress_bar: progress.Progress,
         task: progress.Task,
+        *,
+        result_policy: ResultPolicy = ResultPolicy.DISCARD,
+        max_rows: int | None = None,
     ) -> list[ParallelResult]:
         """Executes queries in parallel
 
@@ -243,6 +551,13 @@ class DatabaseBackend(abc.ABC):
         have base_utils.query_console_output run as a context manager that fires
         when the query is completed, or otherwise manually advance the progress
         bar task, so that the console UI renders progress appropriately.
+
+        Use fetch_rows() to fill in the rows of each ParallelResult, so that
+        result_policy is respected.
+
+        :keyword result_policy: how to handle the rows returned by each query. By
+            default they are discarded, so pass ResultPolicy.FETCH to read them.
+        :keyword max_rows: for ResultPolicy.FETCH, the most rows to fetch per query
         """
 
     @abc.abstractmethod
@@ -3,16 +3,21 @@
 See base.py for design rules of thumb.
 
 Since duckdb tends to be more malleable than a cloud-based database, if you
-need to paper over differences, it's best to use the connection.create_function
-pattern here to get sql flavors in alignment.
+need to paper over differences, it's best to add a SQL macro to _COMPAT_MACROS
+here to get sql flavors in alignment. Prefer these to python UDFs made with
+connection.create_function, which run row by row and can be slow on large tables.
 """
 
 import base64
 import collections
-import datetime
+import contextlib
+import dataclasses
 import json
+import os
 import pathlib
+import queue
 import re
+import threading
 import time
 from concurrent import futures
 
@@ -24,6 +29,165 @@ from rich import progress
 from cumulus_library import base_utils
 from cumulus_library.databases import base, utils
 
+# Matches queries that start (after any comments) with CREATE or INSERT
+_WRITE_QUERY = re.compile(r"^(\s|--[^\n]*)*(CREATE|INSERT)\b", re.IGNORECASE)
+
+# Athena functions that DuckDB lacks (or spells differently), as DuckDB macros
+_COMPAT_MACROS = (
+    # DuckDB's version is array_to_string -- seems there is no standard here.
+    # (but it returns NULL for empty lists, where Athena gives an empty string)
+    """
+    CREATE OR REPLACE TEMP MACRO array_join(value, delimiter) AS
+    CASE WHEN value IS NOT NULL THEN
+        coalesce(array_to_string(value, coalesce(nullif(delimiter, 'None'), '')), '')
+    END
+    """,
+    # DuckDB's version is regexp_matches.
+    """
+    CREATE OR REPLACE TEMP MACRO regexp_like(string, pattern) AS
+    regexp_matches(CAST(string AS VARCHAR), pattern)
+    """,
+    # Partial dates like 1970 or 1980-12 are allowed by the spec, but not by
+    # DuckDB's cast, so we fill in the missing pieces ourselves. And since casting
+    # straight to a TIMESTAMP drops any UTC offset, values that have one go through
+    # TIMESTAMPTZ to get converted to UTC.
+    #
+    # Note: DuckDB provides a timestamp aware column type, TIMESTAMP_TZ, but
+    # as of this writing on version 1.4.1, it is doing some casting to local
+    # offset time rather than timezone, which we're electing to not deal with,
+    # so we only use it in passing and hand back a plain (UTC) TIMESTAMP.
+    r"""
+    CREATE OR REPLACE TEMP MACRO from_iso8601_timestamp(value) AS
+    CASE
+        WHEN length(CAST(value AS VARCHAR)) < 10 THEN make_timestamp(
+            CAST(split_part(CAST(value AS VARCHAR), '-', 1) AS BIGINT),
+            CAST(coalesce(nullif(split_part(CAST(value AS VARCHAR), '-', 2), ''), '1') AS BIGINT),
+            1, 0, 0, 0
+        )
+        WHEN regexp_matches(CAST(value AS VARCHAR), '[T ][0-9:.,]+(Z|[+-][0-9:]+)$')
+            THEN timezone('UTC', CAST(value AS TIMESTAMPTZ))
+        ELSE CAST(value AS TIMESTAMP)
+    END
+    """,
+    # When trying to calculate an MD5 hash in Trino/Athena, the implementation
+    # expects to recieve a varbinary type, so if you're hashing a string,
+    # you would invoke it like `SELECT md5(to_utf8(string_col)) from table`.
+    #
+    # DuckDB's md5() function accepts a varchar instead, and does not have a
+    # to_utf() function or varbinary type, so we patch this with a macro that
+    # just provides back the original string. As a result, these functions
+    # have different signatures, but for cases like this where you're
+    # conforming an argument to another function, it provides appropriate
+    # function mocking
+    #
+    # NOTE: currently we do not have a use case beyond experimentation where
+    # using MD5 hashes provide a benefit. Until we do, it is not required to
+    # support this in other DatabaseBackend implementations.
+    """
+    CREATE OR REPLACE TEMP MACRO to_utf8(value) AS CAST(value AS VARCHAR)
+    """,
+)
+
+
+def _read_cgroup_limit(name: str) -> list[int] | None:
+    """Returns the numbers in a cgroup v2 limit file, if we're in a limited cgroup"""
+    try:
+        values = pathlib.Path("/sys/fs/cgroup", name).read_text().split()
+        return [int(value) for value in values]
+    except (OSError, ValueError):
+        # Missing, or "max" for no limit
+        return None
+
+
+def _available_cores() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        cores = len(os.sched_getaffinity(0))
+    else:  # pragma: no cover
+        cores = os.cpu_count() or 1
+    # Containers often get a CPU quota rather than a smaller set of CPUs
+    if quota := _read_cgroup_limit("cpu.max"):
+        cores = min(cores, max(1, quota[0] // quota[1]))
+    return cores
+
+
+def _available_memory() -> int | None:
+    """Returns the bytes of RAM we can use, if we can tell"""
+    try:
+        memory = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, OSError, ValueError):  # pragma: no cover
+        memory = None
+    # DuckDB sizes itself from physical RAM, which can be far more than a container gets
+    if limit := _read_cgroup_limit("memory.max"):
+        memory = min(memory or limit[0], limit[0])
+    return memory
+
+
+@dataclasses.dataclass
+class ResourceProfile:
+    """How much of the machine a DuckDB backend uses
+
+    This also holds how many queries we run at once from Python. That stays at the
+    long-standing default of 20 unless the user picks a number, even though each DuckDB
+    query already spreads itself across all of DuckDB's threads.
+    """
+
+    threads: int
+    max_concurrent: int
+    memory_limit: str | None = None
+    temp_directory: str | None = None
+    preserve_insertion_order: bool = False
+
+    @classmethod
+    def detect(
+        cls,
+        db_file: str,
+        *,
+        threads: int | str | None = None,
+        memory_limit: str | None = None,
+        temp_directory: str | None = None,
+        max_concurrent: int | str | None = None,
+        processes: int = 1,
+    ) -> "ResourceProfile":
+        """Sizes a profile for this machine, with any settings the user gave us
+
+        :param db_file: the database file (spilled data goes next to it)
+        :keyword threads: DuckDB threads (default: one per available core)
+        :keyword memory_limit: a DuckDB memory limit like "8GB" (default: 75% of RAM)
+        :keyword temp_directory: where DuckDB spills data that doesn't fit in memory
+        :keyword max_concurrent: queries to run at once (default: 20)
+        :keyword processes: how many DuckDB processes are sharing the machine, which
+            split the default threads and memory between them
+        """
+        threads = int(threads) if threads else max(1, _available_cores() // processes)
+        max_concurrent = int(max_concurrent) if max_concurrent else 20
+        if not memory_limit and (memory := _available_memory()):
+            # Leave some room for Python, which holds query results and arrow datasets
+            memory_limit = f"{memory * 3 // 4 // processes // 2**20}MB"
+        if not temp_directory:
+            if db_file == ":memory:":
+                # DuckDB won't spill at all for in-memory databases, unless we say where
+                temp_directory = str(base_utils.get_user_cache_dir() / "duckdb_spill")
+            else:
+                temp_directory = f"{db_file}.tmp"
+        return cls(
+            threads=threads,
+            max_concurrent=max_concurrent,
+            memory_limit=memory_limit,
+            temp_directory=temp_directory,
+        )
+
+    def as_config(self) -> dict:
+        """Returns the settings to hand to duckdb.connect()"""
+        config = {
+            "threads": self.threads,
+            "preserve_insertion_order": self.preserve_insertion_order,
+        }
+        if self.memory_limit:
+            config["memory_limit"] = self.memory_limit
+        if self.temp_directory:
+            config["temp_directory"] = self.temp_directory
+        return config
+
 
 class DuckDatabaseBackend(base.DatabaseBackend):
     """Database backend that uses local files via duckdb"""
@@ -34,13 +198,24 @@ class DuckDatabaseBackend(base.DatabaseBackend):
         schema_name: str | None = None,
         max_concurrent: int | None = None,
         pyarrow_cache_path: str | None = None,
+        resource_profile: ResourceProfile | None = None,
     ):
         super().__init__("main")
         self.db_type = "duckdb"
         self.db_file = db_file
         self.connection = None
-        self.max_concurrent = max_concurrent or 20
+        self.resource_profile = resource_profile or ResourceProfile.detect(
+            db_file, max_concurrent=max_concurrent
+        )
+        self.max_concurrent = self.resource_profile.max_concurrent
         self.pyarrow_cache_path = pyarrow_cache_path
+        # Worker threads get their own cursors, since connections aren't thread safe
+        self._thread_cursors = threading.local()
+        self._connection_lock = threading.Lock()
+        # Loaded pyarrow datasets, and idle worker cursors that already have them
+        # registered, so that parallel batches don't have to set these up every time
+        self._datasets = None
+        self._cursor_pool = queue.SimpleQueue()
 
     def init_errors(self):
         return ["Binder Error", "Catalog Error"]
@@ -51,13 +226,14 @@ class DuckDatabaseBackend(base.DatabaseBackend):
         # as configuration to duckdb.connect, are not supported.
         # https://duckdb.org/docs/sql/statements/set.html#syntax
         # This is where the connection config would be supplied when it is supported
-        self.connection = duckdb.connect(self.db_file)
+        #
+        # Our resource profile does go in here, though. Notably, it turns off
+        # preserve_insertion_order: order of the NDJSON that we load in doesn't matter
+        # for us, and ignoring it saves memory.
+        self.connection = duckdb.connect(self.db_file, config=self.resource_profile.as_config())
         # Aliasing Athena's as_pandas to duckDB's df cast
         duckdb.DuckDBPyConnection.as_pandas = duckdb.DuckDBPyConnection.df
 
-        # Ignore order of NDJSON that we load in. It saves memory and order doesn't matter for us.
-        self.connection.execute("SET preserve_insertion_order = false;")
-
         # Are we getting a cached copy of the pyarrow schema when the class was created?
         # Usually this means we're running unit tests and trying to save time
         if self.pyarrow_cache_path and pathlib.Path(self.pyarrow_cache_path).is_file():
@@ -66,52 +242,9 @@ class DuckDatabaseBackend(base.DatabaseBackend):
                 f"SELECT * FROM read_parquet('{self.pyarrow_cache_path}')"
             )
 
-        # Paper over some syntax differences between Athena and DuckDB
-        self.connection.create_function(
-            # DuckDB's version is array_to_string -- seems there is no standard here.
-            "array_join",
-            self._compat_array_join,
-            None,
-            duckdb.sqltypes.VARCHAR,
-        )
-        self.connection.create_function(
-            # DuckDB's version is regexp_matches.
-            "regexp_like",
-            self._compat_regexp_like,
-            None,
-            duckdb.sqltypes.BOOLEAN,
-        )
-        self.connection.create_function(
-            "from_iso8601_timestamp",
-            self._compat_from_iso8601_timestamp,
-            None,
-            # Note: DuckDB provides a timestamp aware column type, TIMESTAMP_TZ, but
-            # as of this writing on version 1.4.1, it is doing some casting to local
-            # offset time rather than timezone, which we're electing to not deal with
-            duckdb.sqltypes.TIMESTAMP,
-        )
-        self.connection.create_function(
-            # When trying to calculate an MD5 hash in Trino/Athena, the implementation
-            # expects to recieve a varbinary type, so if you're hashing a string,
-            # you would invoke it like `SELECT md5(to_utf8(string_col)) from table`.
-            #
-            # DuckDB's md5() function accepts a varchar instead, and does not have a
-            # to_utf() function or varbinary type, so we patch this with a UDF that
-            # just provides back the original string. As a result, these functions
-            # have different signatures, but for cases like this where you're
-            # conforming an argument to another function, it provides appropriate
-            # function mocking
-            #
-            # NOTE: currently we do not have a use case beyond experimentation where
-            # using MD5 hashes provide a benefit. Until we do, it is not required to
-            # support this in other DatabaseBackend implementations.
-            "to_utf8",
-            self._compat_to_utf8,
-            None,
-            duckdb.sqltypes.VARCHAR,
-        )
+        self._create_compat_macros(self.connection)
 
-    def insert_tables(self, tables: dict[dict[str, str]]) -> None:
+    def insert_tables(self, tables: dict[dict[str, str]], snapshot: bool = False) -> None:
         """Ingests all ndjson data from a folder tree.
 
         This function will write a cache of pyarrow datasets to the database.
@@ -121,7 +254,10 @@ class DuckDatabaseBackend(base.DatabaseBackend):
 
         The data loaded in this way is often from the output folder of Cumulus ETL
 
-        :param tables: A dict describing table info (generated by utils.get_ndjson_files())"""
+        :param tables: A dict describing table info (generated by utils.get_ndjson_files())
+        :param snapshot: if True, copy the data into native DuckDB tables, rather than
+            parsing the ndjson again for every query that reads it. Only tables whose
+            files have changed since the last snapshot are copied again."""
 
         self.connection.execute(
             "CREATE TABLE IF NOT EXISTS pyarrow_cache "
@@ -132,21 +268,37 @@ class DuckDatabaseBackend(base.DatabaseBackend):
 
         if not cache_valid:
             # Our cache is out of date, let's get fresh table datasets - this may take a bit,
-            # since read_ndjson_dir has to scan through all the files.
-            datasets = utils.read_ndjson_dir(None, tables)
+            # since read_ndjson_dir has to scan through any files it hasn't seen before.
+            shape_cache = self.get_shape_cache()
+            datasets = utils.read_ndjson_dir(None, tables, shape_cache=shape_cache)
+            self.cache_shapes(tables, shape_cache)
             self.connection.execute("DELETE FROM pyarrow_cache")
         else:
             # Our cache is still good. We'll pipe back in the pyarrow schemas we serialized
             # out to the database, and use that to create the dataset interfaces.
             datasets = self.get_cached_datasets()
+        # If we've got new datasets, let's stash information about the expected files
+        # and the schemas we found in the db for the next run.
+        if not cache_valid:
+            for name, dataset in datasets.items():
+                self.cache_dataset(name, dataset)
+
+        if snapshot:
+            self.snapshot_datasets(tables, datasets)
+            # Registered datasets would hide the snapshot tables, so leave them out
+            datasets = {}
+
+        self._datasets = datasets
+        # Any pooled cursors have the old datasets registered, so start over
+        self._close_pooled_cursors()
 
         for name, dataset in datasets.items():
             self.connection.register(f"{name}", dataset)
 
-            # If we've got new datasets, let's stash information about the expected files
-            # and the schemas we found in the db for the next run.
-            if not cache_valid:
-                self.cache_dataset(name, dataset)
+    @staticmethod
+    def _get_fragment_infos(fragments: list[str]) -> list[list]:
+        """Returns a fingerprint of a table's files, to compare against a cached copy"""
+        return [[fragment, pathlib.Path(fragment).lstat().st_mtime] for fragment in fragments]
 
     def is_cache_valid(self, tables) -> bool:
         """Checks if ndjson has been updated since the last time we cached it"""
@@ -162,15 +314,51 @@ class DuckDatabaseBackend(base.DatabaseBackend):
                 if cached_files is None:
                     return False  # there is no cache for this table, so don't try to load it
                 cached_files = json.loads(cached_files[0])
-
-                fragment_infos = []
-                for fragment in fragments:
-                    fragment_modtime = pathlib.Path(fragment).lstat().st_mtime
-                    fragment_infos.append([fragment, fragment_modtime])
-                if cached_files != fragment_infos:
+                if cached_files != self._get_fragment_infos(fragments):
                     return False
         return True
 
+    def snapshot_datasets(
+        self, tables: dict[dict[str, str]], datasets: dict[str, pyarrow.dataset.Dataset]
+    ) -> None:
+        """Copies ndjson datasets into native tables, if their files have changed
+
+        Like the pyarrow cache, this keeps track of the files (and their modification
+        times) that each snapshot table was made from, in the ndjson_snapshot table.
+
+        :param tables: A dict describing table info (generated by utils.get_ndjson_files())
+        :param datasets: the pyarrow datasets for those tables
+        """
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS ndjson_snapshot (table_name VARCHAR, file_array VARCHAR)"
+        )
+        snapshotted = dict(
+            self.connection.execute("SELECT table_name, file_array FROM ndjson_snapshot").fetchall()
+        )
+        for subtables in tables.values():
+            for name, fragments in subtables.items():
+                name = name.lower()
+                fragment_infos = json.dumps(self._get_fragment_infos(fragments))
+                if snapshotted.get(name) == fragment_infos:
+                    continue
+                self.connection.execute(
+                    f"DELETE FROM ndjson_snapshot WHERE table_name = '{name}'"  # noqa: S608
+                )
+                if name not in datasets:
+                    # (ETL tables with no files don't get a dataset at all)
+                    self.connection.execute(f'DROP TABLE IF EXISTS "{name}"')
+                    continue
+                self.connection.register("ndjson_snapshot_source", datasets[name])
+                self.connection.execute(
+                    f'CREATE OR REPLACE TABLE "{name}" AS '  # noqa: S608
+                    "SELECT * FROM ndjson_snapshot_source"
+                )
+                self.connection.unregister("ndjson_snapshot_source")
+                self.connection.execute(
+                    "INSERT INTO ndjson_snapshot "  # noqa: S608
+                    f"VALUES ('{name}', '{fragment_infos}')"
+                )
+
     def cache_dataset(self, name: str, dataset: pyarrow.dataset.Dataset):
         """serializes a pyarrow Dataset and stashes it in the cache table"""
         fragment_infos = []
@@ -185,6 +373,30 @@ class DuckDatabaseBackend(base.DatabaseBackend):
             f"VALUES ('{name}', '{json.dumps(fragment_infos)}', '{schema}')"
         )
 
+    def get_shape_cache(self) -> dict[str, dict]:
+        """Gets the per-file schema details saved by cache_shapes()"""
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS ndjson_shape_cache "
+            "(file_path VARCHAR, size BIGINT, mtime DOUBLE, shape VARCHAR)"
+        )
+        rows = self.connection.execute(
+            "SELECT file_path, size, mtime, shape FROM ndjson_shape_cache"
+        ).fetchall()
+        return {row[0]: {"size": row[1], "mtime": row[2], **json.loads(row[3])} for row in rows}
+
+    def cache_shapes(self, tables: dict[dict[str, str]], shape_cache: dict[str, dict]) -> None:
+        """Saves per-file schema details, for the files we were passed, for the next run"""
+        rows = []
+        for subtables in tables.values():
+            for fragments in subtables.values():
+                for fragment in fragments:
+                    if cached := shape_cache.get(fragment):
+                        shape = {"shape": cached["shape"], "contained": cached["contained"]}
+                        rows.append((fragment, cached["size"], cached["mtime"], json.dumps(shape)))
+        self.connection.execute("DELETE FROM ndjson_shape_cache")
+        if rows:
+            self.connection.executemany("INSERT INTO ndjson_shape_cache VALUES (?, ?, ?, ?)", rows)
+
     def get_cached_datasets(self):
         """Deserializes pyarrow datasets from a database cache"""
         datasets = {}
@@ -202,48 +414,40 @@ class DuckDatabaseBackend(base.DatabaseBackend):
         return datasets
 
     @staticmethod
-    def _compat_array_join(value: list[str | None], delimiter: str | None) -> str:
-        if delimiter is None or delimiter == "None":
-            # This is exercised locally on unit tests but is not in CI. Not sure why,
-            # and not sure it's worth debugging
-            delimiter = ""  # pragma: no cover
-        return delimiter.join(v for v in value if v is not None)
-
-    @staticmethod
-    def _compat_regexp_like(string: str | None, pattern: str | None) -> bool:
-        match = re.search(pattern, string)
-        return match is not None
-
-    @staticmethod
-    def _compat_to_utf8(value: str | None) -> datetime.date | None:
-        """See the create_function() call for to_utf8 for more background"""
-        # This is exercised locally on unit tests but is not in CI. Not sure why,
-        # and not sure it's worth debugging
-        return value  # pragma: no cover
-
-    @staticmethod
-    def _compat_from_iso8601_timestamp(
-        value: str,
-    ) -> datetime.datetime:
-        # handle partial dates like 1970 or 1980-12 (which spec allows)
-        if len(value) < 10:
-            pieces = value.split("-")
-            if len(pieces) == 1:
-                return datetime.datetime(int(pieces[0]), 1, 1, tzinfo=datetime.UTC)
-            else:
-                return datetime.datetime(int(pieces[0]), int(pieces[1]), 1, tzinfo=datetime.UTC)
+    def _create_compat_macros(con: duckdb.DuckDBPyConnection) -> None:
+        """Paper over some syntax differences between Athena and DuckDB
 
-        dt = datetime.datetime.fromisoformat(value)
-        if not dt.tzinfo:
-            return dt.replace(tzinfo=datetime.UTC)
-        return dt.astimezone(datetime.UTC)
+        Temporary macros are only visible to the connection that created them,
+        so this needs to be run against every cursor we hand out.
+        """
+        for macro in _COMPAT_MACROS:
+            con.execute(macro)
 
     def cursor(self) -> duckdb.DuckDBPyConnection:
-        return self.connection
+        if threading.current_thread() is threading.main_thread():
+            return self.connection
+        # Code running on a worker thread (like builders preparing their queries
+        # concurrently) can't share the main connection, so give each thread its own
+        if getattr(self._thread_cursors, "cursor", None) is None:
+            self._thread_cursors.cursor = self.parallel_cursor()
+        return self._thread_cursors.cursor
+
+    def parallel_cursor(self) -> duckdb.DuckDBPyConnection:
+        with self._connection_lock:
+            thread_con = self.connection.cursor()
+            if self._datasets is None:
+                self._datasets = self.get_cached_datasets()
+            datasets = self._datasets
+        self._create_compat_macros(thread_con)
+        # Since registrations are per cursor, we'll use our cache
+        # of pyarrow datasets again to re-initialize ndjson tables
+        for name, dataset in datasets.items():
+            thread_con.register(f"{name}", dataset)
+        return thread_con
 
     def pandas_cursor(self) -> duckdb.DuckDBPyConnection:
         # Since this is not provided, return the vanilla cursor
-        return self.connection
+        return self.cursor()
 
     def execute_as_pandas(
         self, sql: str, chunksize: int | None = None
@@ -252,11 +456,38 @@ class DuckDatabaseBackend(base.DatabaseBackend):
         # Pandas will normally cast nullable-int as a float type unless
         # we call this to convert to its nullable int column type.
         # PyAthena seems to do this correctly for us, but not DuckDB.
-        result = self.connection.execute(sql)
+        result = self.cursor().execute(sql)
         if chunksize:
             return iter([result.df().convert_dtypes()]), result.description
         return result.df().convert_dtypes(), result.description
 
+    def execute_as_arrow(self, sql: str) -> pyarrow.Table:
+        return self.cursor().execute(sql).fetch_arrow_table()
+
+    def iter_record_batches(
+        self, sql: str, batch_size: int = 100000
+    ) -> collections.abc.Iterator[pyarrow.RecordBatch]:
+        # The stream is only good until its cursor runs another query, so we use a
+        # worker cursor rather than the one callers get from cursor()
+        with self._pooled_cursor() as thread_con:
+            reader = thread_con.execute(sql).fetch_record_batch(batch_size)
+            empty = True
+            for batch in reader:
+                empty = False
+                yield batch
+            if empty:
+                yield pyarrow.RecordBatch.from_pylist([], schema=reader.schema)
+
+    def get_query_stats(self, result: duckdb.DuckDBPyConnection, query: str) -> dict:
+        # DuckDB doesn't report engine stats, but writes return their row count as a
+        # single 'Count' row, which nothing else reads
+        description = result.description or []
+        if [col[0] for col in description] == ["Count"] and _WRITE_QUERY.match(query):
+            # (CREATE ... IF NOT EXISTS won't return a row if the table is already there)
+            if row := result.fetchone():
+                return {"row_count": row[0]}
+        return {}
+
     def parser(self) -> base.DatabaseParser:
         return DuckDbParser()
 
@@ -281,17 +512,58 @@ class DuckDatabaseBackend(base.DatabaseBackend):
         self.connection.execute(query)
         return True
 
-    def _write_thread(self, query, verbose, progress_bar, task, query_console_output, datasets):
-        thread_con = self.connection.cursor()
-        # Since registrations are per cursor, we'll use our cache
-        # of pyarrow datasets again to re-initialize ndjson tables
-        for name, dataset in datasets.items():
-            thread_con.register(f"{name}", dataset)
-        with query_console_output(verbose, query, progress_bar, task):
-            res = thread_con.execute(query)
-            return base.ParallelResult(
-                query=query, columns=[x[0] for x in res.description], rows=res.fetchall()
-            )
+    @contextlib.contextmanager
+    def _pooled_cursor(self) -> collections.abc.Iterator[duckdb.DuckDBPyConnection]:
+        """Lends out an idle worker cursor, creating one if none are free"""
+        try:
+            thread_con = self._cursor_pool.get_nowait()
+        except queue.Empty:
+            thread_con = self.parallel_cursor()
+        try:
+            yield thread_con
+        finally:
+            self._cursor_pool.put(thread_con)
+
+    def _write_thread(
+        self,
+        query,
+        verbose,
+        progress_bar,
+        task,
+        query_console_output,
+        queued_at,
+        result_policy,
+        max_rows,
+    ):
+        try:
+            thread_con = self._cursor_pool.get_nowait()
+        except queue.Empty:
+            thread_con = self.parallel_cursor()
+        try:
+            with query_console_output(verbose, query, progress_bar, task):
+                res = self.execute_with_stats(thread_con, query, queued_at=queued_at)
+                columns = [x[0] for x in res.description]
+                if result_policy == base.ResultPolicy.STREAM:
+                    # The stream holds on to this cursor until it has been read to
+                    # the end (or closed), and hands it back to the pool after that
+                    rows = self._stream_and_release(thread_con, res)
+                    thread_con = None
+                else:
+                    # Fetching here (rather than on the calling thread) means the cursor
+                    # is done with this query before anyone else can pick it up
+                    rows = base.fetch_rows(res, result_policy, max_rows)
+                return base.ParallelResult(query=query, columns=columns, rows=rows)
+        finally:
+            if thread_con is not None:
+                self._cursor_pool.put(thread_con)
+
+    def _stream_and_release(
+        self, thread_con: duckdb.DuckDBPyConnection, res: duckdb.DuckDBPyConnection
+    ) -> collections.abc.Iterator[tuple]:
+        try:
+            yield from base.fetch_rows(res, base.ResultPolicy.STREAM)
+        finally:
+            self._cursor_pool.put(thread_con)
 
     def parallel_execute(
         self,
@@ -299,8 +571,10 @@ class DuckDatabaseBackend(base.DatabaseBackend):
         verbose: bool,
         progress_bar: progress.Progress,
         task: progress.Task,
+        *,
+        result_policy: base.ResultPolicy = base.ResultPolicy.DISCARD,
+        max_rows: int | None = None,
     ) -> list[base.ParallelResult]:
-        datasets = self.get_cached_datasets()
         with futures.ThreadPoolExecutor(max_workers=self.max_concurrent) as executor:
             res = []
             for query in queries:
@@ -314,16 +588,16 @@ class DuckDatabaseBackend(base.DatabaseBackend):
                             progress_bar,
                             task,
                             base_utils.query_console_output,
-                            datasets,
+                            time.monotonic(),
+                            result_policy,
+                            max_rows,
                         ),
                     )
                 )
             utils.handle_concurrent_errors(res, self.db_type)
-
-        # This is a temporary workaround for cases where duckdb is still doing :something:
-        # after the threads have resolved, where if you try to recreate a table it may throw
-        # an error, which is only affecting the --statistics flag ¯\_(ツ)_/¯
-        time.sleep(0.25)
+        # Leaving the executor block waits for every worker to finish. Unless we are
+        # streaming, each worker has also fetched its results, so the connection is
+        # idle by now. Streamed results keep their cursor until they are consumed.
         return [x[1].result() for x in res]
 
     def create_schema(self, schema_name):
@@ -334,7 +608,12 @@ class DuckDatabaseBackend(base.DatabaseBackend):
         if (schema_name,) not in schemas:
             self.connection.sql(f"CREATE SCHEMA {schema_name}")
 
+    def _close_pooled_cursors(self) -> None:
+        while not self._cursor_pool.empty():
+            self._cursor_pool.get_nowait().close()
+
     def close(self) -> None:
+        self._close_pooled_cursors()
         if self.connection is not None:
             self.connection.close()
 
@@ -0,0 +1,202 @@
+"""Dependency-aware concurrent execution of build queries
+
+The parallel_execute() method of a DatabaseBackend treats a batch of queries as a
+unit: nothing in the next batch can start until every query in the current batch has
+finished. The QueryScheduler instead lets callers hand it queries one at a time, along
+with the tables each query writes and reads, and starts each query as soon as the
+queries it depends on have finished, keeping as many queries in flight as the
+database allows (see DatabaseBackend.acquire_query_slot()).
+
+Dependencies are only ever drawn from a query to queries submitted before it, so
+callers should submit queries in the order they would have run serially.
+"""
+
+import dataclasses
+import queue
+import threading
+import time
+from concurrent import futures
+
+from rich import progress
+
+from cumulus_library import base_utils, errors
+from cumulus_library.databases import base, utils
+
+
+@dataclasses.dataclass(kw_only=True, eq=False)
+class _QueryNode:
+    query: str
+    writes: set[str]
+    reads: set[str]
+    task: progress.TaskID
+    future: futures.Future = dataclasses.field(default_factory=futures.Future)
+    pending: int = 0
+    dependents: list = dataclasses.field(default_factory=list)
+    skipped: bool = False
+    queued_at: float | None = None
+
+
+class QueryScheduler:
+    """Runs queries concurrently, starting each once the queries it depends on finish
+
+    A query depends on an earlier query if it reads or writes a table the earlier
+    query writes, or if it writes a table the earlier query reads. Queries whose
+    tables are unknown (pass None for writes) act as a barrier: they wait for
+    everything before them, and everything after them waits for them.
+    """
+
+    def __init__(
+        self,
+        db: base.DatabaseBackend,
+        *,
+        verbose: bool = False,
+        progress_bar: progress.Progress,
+        result_policy: base.ResultPolicy = base.ResultPolicy.DISCARD,
+        max_rows: int | None = None,
+    ):
+        if result_policy == base.ResultPolicy.STREAM:
+            # Cursors go back into the pool as soon as their query finishes
+            raise ValueError("QueryScheduler does not support streaming results")
+        self.db = db
+        self.result_policy = result_policy
+        self.max_rows = max_rows
+        self.verbose = verbose
+        self.progress_bar = progress_bar
+        # The database decides how many queries actually run at once (see
+        # acquire_query_slot()), so we keep enough workers around for its highest limit
+        workers = db.max_query_slots()
+        self._executor = futures.ThreadPoolExecutor(max_workers=workers)
+        self._lock = threading.Lock()
+        # Cursors are opened up front on the calling thread, since setting one up may
+        # touch the main connection, and then handed out to whichever worker needs one.
+        self._cursors = queue.SimpleQueue()
+        for _ in range(workers):
+            self._cursors.put(db.parallel_cursor())
+        self._nodes = []
+        self._last_writer = {}
+        self._readers = {}
+        self._barrier = None
+        self._since_barrier = []
+
+    def submit(
+        self,
+        query: str,
+        *,
+        writes: set[str] | None,
+        reads: set[str] | None = None,
+        task: progress.TaskID,
+    ) -> None:
+        """Adds a query to the schedule
+
+        :param query: the query to run
+        :keyword writes: names of tables/views this query creates or modifies, or None
+            if that is unknown (which makes this query a barrier)
+        :keyword reads: names of tables/views this query reads from
+        :keyword task: the progress bar task to advance when this query completes
+        """
+        node = _QueryNode(query=query, writes=set(writes or ()), reads=set(reads or ()), task=task)
+        with self._lock:
+            if writes is None:
+                deps = set(self._since_barrier)
+                if self._barrier:
+                    deps.add(self._barrier)
+                self._barrier = node
+                self._since_barrier = []
+                self._last_writer = {}
+                self._readers = {}
+            else:
+                deps = {self._barrier} if self._barrier else set()
+                for table in node.reads | node.writes:
+                    if writer := self._last_writer.get(table):
+                        deps.add(writer)
+                for table in node.writes:
+                    deps.update(self._readers.get(table, []))
+                for table in node.writes:
+                    self._last_writer[table] = node
+                    self._readers[table] = []
+                for table in node.reads:
+                    self._readers.setdefault(table, []).append(node)
+                self._since_barrier.append(node)
+            self._nodes.append(node)
+            deps.discard(node)
+            if any(dep.future.done() and dep.future.exception() for dep in deps):
+                node.skipped = True
+                node.future.set_exception(
+                    errors.CumulusLibraryError("Not run, because a query it depends on failed")
+                )
+                return
+            deps = [dep for dep in deps if not dep.future.done()]
+            node.pending = len(deps)
+            for dep in deps:
+                dep.dependents.append(node)
+        if node.pending == 0:
+            self._start(node)
+
+    def wait(self) -> list[base.ParallelResult]:
+        """Blocks until all submitted queries have run, exiting if any failed
+
+        :returns: a ParallelResult per query, in submission order
+        """
+        futures.wait([node.future for node in self._nodes])
+        self._executor.shutdown()
+        utils.handle_concurrent_errors(
+            [(node.query, node.future) for node in self._nodes if not node.skipped],
+            self.db.db_type,
+        )
+        return [node.future.result() for node in self._nodes]
+
+    def _start(self, node: _QueryNode) -> None:
+        node.queued_at = time.monotonic()
+        self._executor.submit(self._run, node)
+
+    def _run(self, node: _QueryNode) -> None:
+        cursor = self._cursors.get()
+        try:
+            self.db.acquire_query_slot()
+            try:
+                with base_utils.query_console_output(
+                    self.verbose, node.query, self.progress_bar, node.task
+                ):
+                    self.db.execute_with_stats(cursor, node.query, queued_at=node.queued_at)
+            except Exception as e:
+                self.db.release_query_slot(error=e)
+                raise
+            self.db.release_query_slot(cursor)
+            columns = [x[0] for x in (cursor.description or [])]
+            node.future.set_result(
+                base.ParallelResult(
+                    query=node.query,
+                    columns=columns,
+                    rows=base.fetch_rows(cursor, self.result_policy, self.max_rows)
+                    if columns
+                    else [],
+                )
+            )
+        except Exception as e:
+            node.future.set_exception(e)
+        finally:
+            self._cursors.put(cursor)
+        self._release_dependents(node)
+
+    def _release_dependents(self, node: _QueryNode) -> None:
+        failed = node.future.exception() is not None
+        ready = []
+        with self._lock:
+            for dependent in node.dependents:
+                if failed and not dependent.future.done():
+                    dependent.skipped = True
+                    dependent.future.set_exception(
+                        errors.CumulusLibraryError(
+                            "Not run, because a query it depends on failed:\n" + node.query
+                        )
+                    )
+                    ready.append(dependent)
+                    continue
+                dependent.pending -= 1
+                if dependent.pending == 0 and not dependent.future.done():
+                    ready.append(dependent)
+        for dependent in ready:
+            if dependent.skipped:
+                self._release_dependents(dependent)
+            else:
+                self._start(dependent)
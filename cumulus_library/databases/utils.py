@@ -1,3 +1,4 @@
+import os
 import pathlib
 import string
 import sys
@@ -25,6 +26,81 @@ def _rows_from_files(files: list[str]) -> Iterable[dict]:
         yield from cumulus_fhir_support.read_multiline_json(file)
 
 
+def _merge_shape(total_shape: dict, item) -> None:
+    """Merges the dictionary keys found in item (descending into lists) into total_shape
+
+    This is the same notion of "shape" that cumulus_fhir_support uses for its schemas:
+    a tree of fields like {"id": {}, "code": {"text": {}}}, where empty dictionaries
+    mean no further children.
+    """
+    if isinstance(item, list):
+        for value in item:
+            _merge_shape(total_shape, value)
+    elif isinstance(item, dict):
+        for key, value in item.items():
+            _merge_shape(total_shape.setdefault(key, {}), value)
+
+
+def _get_file_shape(file: str) -> dict:
+    """Scans an ndjson file for everything that affects its PyArrow schema
+
+    :param file: the ndjson file to scan
+    :returns: a JSON-serializable dict of the shape of the file's rows, and the
+      types of any contained resources in them
+    """
+    shape = {}
+    contained = set()
+    for row in cumulus_fhir_support.read_multiline_json(file):
+        _merge_shape(shape, row)
+        for contained_obj in row.get("contained", []):
+            if contained_type := contained_obj.get("resourceType"):
+                contained.add(contained_type)
+    return {"shape": shape, "contained": sorted(contained)}
+
+
+def _get_file_shapes(files: list[str], shape_cache: dict[str, dict]) -> dict[str, dict]:
+    """Gets the shape of each file, only scanning files that aren't in the cache
+
+    Files are scanned in a process pool, since JSON parsing is CPU-bound.
+
+    :param files: the ndjson files to get shapes for
+    :param shape_cache: a dict of file paths to their shape, size and mtime, from
+      previous runs. Entries for scanned files will be added/replaced.
+    :returns: a dict of file paths to shapes
+    """
+    stats = {file: os.stat(file) for file in files}
+    to_scan = []
+    for file, stat in stats.items():
+        cached = shape_cache.get(file)
+        if not cached or cached["size"] != stat.st_size or cached["mtime"] != stat.st_mtime:
+            to_scan.append(file)
+
+    if len(to_scan) > 1:
+        with futures.ProcessPoolExecutor() as executor:
+            shapes = executor.map(_get_file_shape, to_scan)
+    else:
+        shapes = map(_get_file_shape, to_scan)
+    for file, shape in zip(to_scan, shapes, strict=True):
+        shape_cache[file] = {
+            "size": stats[file].st_size,
+            "mtime": stats[file].st_mtime,
+            **shape,
+        }
+    return {file: shape_cache[file] for file in files}
+
+
+def _rows_from_shapes(shapes: Iterable[dict]) -> Iterable[dict]:
+    """Yields stand-in rows that have the same combined shape as the scanned files"""
+    for shape in shapes:
+        row = dict(shape["shape"])
+        if "contained" in row:
+            # cumulus_fhir_support expects this to be a list of resources
+            row["contained"] = [row["contained"]]
+        yield row
+        for contained_type in shape["contained"]:
+            yield {"contained": [{"resourceType": contained_type}]}
+
+
 def _json_format():
     """Returns a Dataset format object suitable for reading FHIR NDJSON."""
     # FHIR can have very long JSON lines (think DocRefs with inlined notes). And unfortunately,
@@ -108,7 +184,9 @@ def get_ndjson_files(path: str) -> dict[dict[str]]:
 
 
 def read_ndjson_dir(
-    path: str | None, fileset: dict[dict[str]] | None = None
+    path: str | None,
+    fileset: dict[dict[str]] | None = None,
+    shape_cache: dict[str, dict] | None = None,
 ) -> dict[str, pyarrow.dataset.Dataset]:
     """Loads a directory tree of raw ndjson into schema-ful tables.
 
@@ -117,6 +195,9 @@ def read_ndjson_dir(
     :param path: a directory path to ndjson
     :param fileset: A dictionary of ndjson file locations (usually the output of
       get_ndjson_files)
+    :param shape_cache: A dictionary of per-file schema details from a previous run,
+      so that unchanged files don't need to be scanned again. It will be updated
+      with details for any newly scanned files.
     :returns: dictionary of table names (like 'documentreference') to table
       data (with schema)
     """
@@ -131,10 +212,18 @@ def read_ndjson_dir(
     if not fileset:
         fileset = get_ndjson_files(path)
 
+    # Scan every file up front, so they can all be worked on at once
+    shapes = _get_file_shapes(
+        [file for files in fileset["resources"].values() for file in files],
+        {} if shape_cache is None else shape_cache,
+    )
+
     for resource, files in fileset["resources"].items():
         table_name = resource.lower()
         # Make a pyarrow table with full schema from the data
-        schema = cumulus_fhir_support.pyarrow_schema_from_rows(resource, _rows_from_files(files))
+        schema = cumulus_fhir_support.pyarrow_schema_from_rows(
+            resource, _rows_from_shapes(shapes[file] for file in files)
+        )
         # Use a PyArrow Dataset (vs a Table) to avoid loading all the files in memory.
         all_tables[table_name] = pyarrow.dataset.dataset(
             files, schema=schema, format=_json_format()
@@ -161,7 +250,7 @@ def _handle_load_ndjson_dir(args: dict[str, str], backend: base.DatabaseBackend)
     with base_utils.get_progress_bar() as progress:
         progress.add_task("Detecting JSON schemas...", total=None)
         tables = get_ndjson_files(load_ndjson_dir)
-        backend.insert_tables(tables)
+        backend.insert_tables(tables, snapshot=bool(args.get("ndjson_snapshot")))
 
 
 def create_db_backend(
@@ -181,8 +270,15 @@ def create_db_backend(
         schema_name = "main"
         backend = duckdb.DuckDatabaseBackend(
             args["database"],
-            max_concurrent=args.get("max_concurrent"),
             pyarrow_cache_path=pyarrow_cache_path,
+            resource_profile=duckdb.ResourceProfile.detect(
+                args["database"],
+                threads=args.get("duckdb_threads"),
+                memory_limit=args.get("duckdb_memory_limit"),
+                temp_directory=args.get("duckdb_temp_dir"),
+                max_concurrent=args.get("max_concurrent"),
+                processes=args.get("duckdb_processes") or 1,
+            ),
         )
     elif db_config.db_type == "athena":
         if (
@@ -226,7 +322,7 @@ def handle_concurrent_errors(
             # pyathena has a helper class for resolved futures,
             # so we'll check for it's specific failure indicator
             if db_type == "athena":
-                if res.state == "FAILED":
+                if getattr(res, "state", None) == "FAILED":
                     failures.append((f[0], res.error_message))
         except Exception:
             failures.append((f[0], str(f[1].exception())))
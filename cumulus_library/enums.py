@@ -20,6 +20,7 @@ class ProtectedTables(enum.Enum):
     TRANSACTIONS = "lib_transactions"
     BUILD_SOURCE = "lib_build_source"
     REF_SUMMARY = "lib_ref_summary"
+    QUERY_STATS = "lib_query_stats"
 
 
 class ProtectedTableKeywords(enum.Enum):
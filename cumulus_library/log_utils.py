@@ -67,6 +67,42 @@ def log_statistics(
     )
 
 
+def log_query_stats(
+    *,
+    config: base_utils.StudyConfig,
+    manifest: study_manifest.StudyManifest,
+):
+    """Writes out stats for the queries executed since the last call"""
+    dataset = []
+    for stats in config.db.pop_query_stats():
+        parsed = base_utils.parse_query(config, stats.query)
+        _, reads = base_utils.get_query_dependencies(config, stats.query)
+        dataset.append(
+            [
+                manifest.get_study_prefix(),
+                config.stage,
+                parsed.table or None,
+                parsed.expression.key.upper() if parsed.expression else None,
+                stats.wall_time,
+                stats.queue_wait,
+                stats.engine_time,
+                stats.row_count,
+                stats.data_scanned,
+                stats.event_time,
+                ",".join(sorted(reads)) or None,
+            ]
+        )
+    # Studies can run a lot of queries, so we'll split these up to keep each insert
+    # well under query size limits
+    for start in range(0, len(dataset), 500):
+        _log_table(
+            table=sql_utils.QueryStatsTable(),
+            config=config,
+            manifest=manifest,
+            dataset=dataset[start : start + 500],
+        )
+
+
 def _log_table(
     *,
     table: sql_utils.BaseTable,
@@ -84,18 +84,18 @@ class NoteSource:
 
 
 # Get table refs (will make immediate query)
-def get_table_refs(cursor, table: str) -> cfs.RefSet:
+def get_table_refs(db: databases.DatabaseBackend, table: str) -> cfs.RefSet:
     if set(table) - databases.SQL_NAME_CHARS:
         raise ValueError(f"Invalid SQL table name '{table}'")
-    rows = cursor.execute(f'SELECT * FROM "{table}"')  # noqa: S608
-
-    cols = [field[0] for field in rows.description]
-    scanner = cfs.make_note_ref_scanner(cols, is_anon=True)
 
+    # Cohort tables can be big, so stream them rather than pulling them all in at once
     refs = cfs.RefSet()
-    for row in rows.fetchall():
-        if ref := scanner(row):
-            refs.add_ref(ref)
+    scanner = None
+    for batch in db.iter_record_batches(f'SELECT * FROM "{table}"'):  # noqa: S608
+        scanner = scanner or cfs.make_note_ref_scanner(batch.schema.names, is_anon=True)
+        for row in zip(*(col.to_pylist() for col in batch.columns), strict=True):
+            if ref := scanner(row):
+                refs.add_ref(ref)
 
     return refs
 
@@ -24,12 +24,11 @@ class CleanupTmpBuilder(cumulus_library.BaseTableBuilder):
             for key in code_definition.keys():
                 code_source[key] = code_definition[key]
             code_sources.append(code_source)
-        query = cumulus_library.get_template(
-            "show_tables", schema_name=config.schema, prefix="discovery__tmp"
-        )
-        tmp_tables = config.db.cursor().execute(query).fetchall()
-        for table in tmp_tables:
+        tmp_tables = config.db.list_tables(config.schema, prefix="discovery__tmp")
+        for name, view_or_table in tmp_tables:
+            if view_or_table != "TABLE":
+                continue
             query = cumulus_library.get_template(
-                "drop_view_table", view_or_table="table", view_or_table_name=table[0]
+                "drop_view_table", view_or_table="table", view_or_table_name=name
             )
             self.queries.append(query)
@@ -67,6 +67,20 @@ class ManifestAction(msgspec.Struct, forbid_unknown_fields=True, omit_defaults=T
 class ManifestAdvancedOptions(msgspec.Struct, forbid_unknown_fields=True, omit_defaults=True):
     dedicated_schema: str | None = None
     dynamic_study_prefix: str | None = None
+    dependency_scheduling: bool | None = None
+    shard_safe_tables: list[str] | None = None
+
+
+class ManifestTableLayout(msgspec.Struct, forbid_unknown_fields=True, omit_defaults=True):
+    format: str | None = None
+    write_compression: str | None = None
+    bucketed_by: list[str] | None = None
+    bucket_count: int | None = None
+    partitioned_by: list[str] | None = None
+
+
+class ManifestTableLayouts(ManifestTableLayout, forbid_unknown_fields=True, omit_defaults=True):
+    tables: dict[str, ManifestTableLayout] | None = None
 
 
 class ManifestConfig(msgspec.Struct, forbid_unknown_fields=True, omit_defaults=True):
@@ -75,6 +89,7 @@ class ManifestConfig(msgspec.Struct, forbid_unknown_fields=True, omit_defaults=T
     data_dictionary: str | DataDictionary | None = None
     stages: dict[str, list[ManifestAction]] | None = None
     advanced_options: ManifestAdvancedOptions | None = None
+    table_layout: ManifestTableLayouts | None = None
 
 
 class SubmanifestConfig(msgspec.Struct, forbid_unknown_fields=True, omit_defaults=True):
@@ -291,6 +306,19 @@ class StudyManifest:
 
         self._has_stats = self._has_stats_workflows()
         self._load_data_dictionary()
+        self._validate_table_layout(study_path)
+
+    def _validate_table_layout(self, study_path: pathlib.Path) -> None:
+        layout = self._study_config.get("table_layout", {})
+        tables = layout.get("tables", {})
+        for name in [None, *tables]:
+            table_layout = self.get_table_layout(name) if name else layout
+            if bool(table_layout.get("bucketed_by")) != bool(table_layout.get("bucket_count")):
+                raise errors.StudyManifestParsingError(
+                    f"{study_path} sets only one of bucketed_by and bucket_count "
+                    f"in the table layout{f' for {name}' if name else ''}. "
+                    "Bucketing needs both."
+                )
 
     def get_study_prefix(self) -> str | None:
         """Reads the name of a study prefix from the in-memory study config
@@ -313,6 +341,38 @@ class StudyManifest:
         options = self._study_config.get("advanced_options", {})
         return options.get("dedicated_schema")
 
+    def get_dependency_scheduling(self) -> bool:
+        """Returns whether consecutive parallel actions should be scheduled as one graph
+
+        :returns: True if queries should start as soon as the tables they use are built
+        """
+        options = self._study_config.get("advanced_options", {})
+        return bool(options.get("dependency_scheduling", False))
+
+    def get_shard_safe_tables(self) -> set[str]:
+        """Returns the tables that a sharded build may merge together from each shard
+
+        :returns: the lowercased names of the tables, with the study prefix
+        """
+        options = self._study_config.get("advanced_options", {})
+        return {name.lower() for name in options.get("shard_safe_tables", [])}
+
+    def get_table_layout(self, table_name: str) -> dict:
+        """Returns the physical layout options for a table (like compression or bucketing)
+
+        Options set for the table in the manifest's table_layout.tables override the
+        study-wide ones.
+
+        :param table_name: the name of the table, with the study prefix
+        :returns: a dict of layout options, without any unset ones
+        """
+        layout = dict(self._study_config.get("table_layout", {}))
+        tables = layout.pop("tables", {})
+        tables = {name.lower(): options for name, options in tables.items()}
+        layout.update(tables.get(table_name.lower(), {}))
+        # An empty value in a table's options turns off the study-wide one
+        return {key: value for key, value in layout.items() if value}
+
     def get_stages(self) -> list:
         """Returns the names of all stages defined in the manifest"""
         return list(self._study_config.get("stages", {}).keys())
@@ -9,6 +9,15 @@ import pandas
 from cumulus_library import db_config, errors
 from cumulus_library.template_sql import sql_utils
 
+# The Athena table properties we allow studies to set, in the order we write them
+TABLE_LAYOUT_KEYS = (
+    "format",
+    "write_compression",
+    "partitioned_by",
+    "bucketed_by",
+    "bucket_count",
+)
+
 
 class TableView(enum.Enum):
     """Convenience enum for building drop queries"""
@@ -341,7 +350,11 @@ def get_ctas_from_parquet_query(
 
 
 def get_ctas_query(
-    schema_name: str, table_name: str, dataset: list[list[str]], table_cols: list[str]
+    schema_name: str,
+    table_name: str,
+    dataset: list[list[str]],
+    table_cols: list[str],
+    table_layout: dict | None = None,
 ) -> str:
     """Generates a create table as query for inserting static data into athena
 
@@ -354,6 +367,7 @@ def get_ctas_query(
     :param table_name: The name of the athena table to create
     :param dataset: Array of data arrays to insert, i.e. [['1','3'],['2','4']]
     :param table_cols: Comma deleniated column names, i.e. ['first,second']
+    :param table_layout: (athena) physical layout options, see get_table_properties
     """
     return get_template(
         "ctas",
@@ -361,15 +375,19 @@ def get_ctas_query(
         table_name=table_name,
         dataset=dataset,
         table_cols=table_cols,
+        table_properties=get_table_properties(table_layout),
     )
 
 
-def get_ctas_query_from_df(schema_name: str, table_name: str, df: pandas.DataFrame) -> str:
+def get_ctas_query_from_df(
+    schema_name: str, table_name: str, df: pandas.DataFrame, table_layout: dict | None = None
+) -> str:
     """Generates a create table as query from a dataframe
 
     :param schema_name: The athena schema to create the table in
     :param table_name: The name of the athena table to create
     :param df: A pandas dataframe
+    :param table_layout: (athena) physical layout options, see get_table_properties
     """
     split_dict = df.to_dict(orient="split")
     return get_template(
@@ -378,6 +396,7 @@ def get_ctas_query_from_df(schema_name: str, table_name: str, df: pandas.DataFra
         table_name=table_name,
         dataset=split_dict["data"],
         table_cols=split_dict["columns"],
+        table_properties=get_table_properties(table_layout),
     )
 
 
@@ -386,6 +405,7 @@ def get_ctas_empty_query(
     table_name: str,
     table_cols: list[str],
     table_cols_types: list[str] | None = None,
+    table_layout: dict | None = None,
 ) -> str:
     """Generates a create table as query for initializing an empty table
 
@@ -399,6 +419,7 @@ def get_ctas_empty_query(
     :param table_cols: Comma deleniated column names, i.e. ['first,second']
     :param table_cols_types: Allows specifying a data type per column
       (default: all varchar)
+    :param table_layout: (athena) physical layout options, see get_table_properties
     """
     if not table_cols_types:
         table_cols_types = ["varchar"] * len(table_cols)
@@ -408,6 +429,7 @@ def get_ctas_empty_query(
         table_name=table_name,
         table_cols=table_cols,
         table_cols_types=table_cols_types,
+        table_properties=get_table_properties(table_layout),
     )
 
 
@@ -543,3 +565,18 @@ def get_show_views(schema_name: str, prefix: str) -> str:
     :param table_name: The prefix to filter by. Jinja template auto adds '__'.
     """
     return get_template("show_views", schema_name=schema_name, prefix=prefix)
+
+
+def get_table_properties(table_layout: dict | None) -> str:
+    """Generates the WITH clause of a create table as query, setting its physical layout
+
+    This only applies to Athena, where it controls how the table's files are written.
+    Other databases get an empty string.
+
+    :param table_layout: a dict with any of format, write_compression, partitioned_by,
+        bucketed_by & bucket_count (see StudyManifest.get_table_layout)
+    """
+    if db_config.db_type != "athena" or not table_layout:
+        return ""
+    properties = {key: table_layout[key] for key in TABLE_LAYOUT_KEYS if table_layout.get(key)}
+    return get_template("table_properties", properties=properties)
@@ -11,7 +11,7 @@ simply. This includes, but is not limited, to:
 
 from dataclasses import dataclass, field
 
-from cumulus_library import base_utils, databases, enums
+from cumulus_library import base_utils, const, databases, enums
 from cumulus_library.template_sql import base_templates
 
 # *** Some convenience constants for providing to validate_schema() ***
@@ -92,6 +92,23 @@ class StatisticsTable(BaseTable):
     type_casts: dict = field(default_factory=lambda: {"created_on": "timestamp"})
 
 
+@dataclass(kw_only=True)
+class QueryStatsTable(BaseTable):
+    name: str = enums.ProtectedTables.QUERY_STATS.value
+    columns: list = field(default_factory=lambda: list(const.QUERY_STATS_COLS))
+    column_types: list = field(default_factory=lambda: list(const.QUERY_STATS_COLS_TYPES))
+    type_casts: dict = field(
+        default_factory=lambda: {
+            "wall_time": "double",
+            "queue_wait": "double",
+            "engine_time": "double",
+            "row_count": "bigint",
+            "data_scanned": "bigint",
+            "event_time": "timestamp",
+        }
+    )
+
+
 @dataclass(kw_only=True)
 class BaseFHIRResourceConfig:
     """Base class for handling table detection/denormalization"""
@@ -268,13 +285,7 @@ def validate_schema(
 ) -> dict:
     validated_schema = {}
     for table, cols in expected_table_cols.items():
-        query = base_templates.get_column_datatype_query(database.schema_name, table, cols.keys())
-        try:
-            table_schema = database.cursor().execute(query).fetchall()
-        except database.operational_errors():
-            # A database backend might reasonably raise an exception in cases like
-            # the table not existing (Athena does this).
-            table_schema = {}
+        table_schema = database.get_column_types(database.schema_name, table)
         validated_schema[table] = database.parser().validate_table_schema(cols, table_schema)
     return validated_schema
 
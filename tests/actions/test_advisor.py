@@ -0,0 +1,119 @@
+"""tests for suggesting table/view materialization"""
+
+import pytest
+
+from cumulus_library import study_manifest
+from cumulus_library.actions import advisor, builder, cleaner
+from tests import conftest
+
+
+def _write_study(tmp_path, export_single: bool = False):
+    manifest_dict = {
+        "study_prefix": "advice",
+        "stages": {
+            "default": [
+                {"files": ["base.sql"], "type": "build:serial"},
+                {"files": ["readers.sql"], "type": "build:parallel"},
+            ]
+        },
+    }
+    if export_single:
+        manifest_dict["stages"]["default"].append(
+            {"tables": ["advice__single"], "type": "export:counts"}
+        )
+    conftest.write_toml(tmp_path, manifest_dict, "manifest.toml")
+    (tmp_path / "base.sql").write_text(
+        "CREATE VIEW advice__hot AS SELECT 1 AS val;\n"
+        "CREATE VIEW advice__cold AS SELECT 1 AS val;\n"
+        "CREATE TABLE advice__single AS SELECT 2 AS val;\n"
+        "CREATE TABLE advice__shared AS SELECT 3 AS val;\n"
+        "CREATE TABLE advice__appended AS SELECT 4 AS val;\n"
+        "INSERT INTO advice__appended VALUES (5);\n"
+    )
+    (tmp_path / "readers.sql").write_text(
+        "CREATE TABLE advice__r1 AS SELECT * FROM advice__hot;\n"
+        "CREATE TABLE advice__r2 AS SELECT * FROM advice__hot "
+        "UNION ALL SELECT * FROM advice__shared;\n"
+        "CREATE TABLE advice__r3 AS SELECT * FROM advice__hot "
+        "UNION ALL SELECT * FROM advice__shared;\n"
+        "CREATE TABLE advice__r4 AS SELECT * FROM advice__cold "
+        "UNION ALL SELECT * FROM advice__single UNION ALL SELECT * FROM advice__appended;\n"
+    )
+    return study_manifest.StudyManifest(tmp_path)
+
+
+def _get_types(config):
+    return dict(
+        config.db.cursor()
+        .execute(
+            "SELECT table_name, table_type FROM information_schema.tables "
+            "WHERE table_name LIKE 'advice__%' AND table_name NOT LIKE 'advice__lib%'"
+        )
+        .fetchall()
+    )
+
+
+@pytest.mark.parametrize("export_single", [False, True])
+def test_get_advice(mock_db_config, tmp_path, export_single):
+    manifest = _write_study(tmp_path, export_single=export_single)
+    builder.run_protected_table_builder(mock_db_config, manifest)
+    assert advisor.get_advice(mock_db_config, manifest) == []
+    builder.build_study(mock_db_config, manifest)
+
+    advice = advisor.get_advice(mock_db_config, manifest)
+    expected = {"advice__hot": ("VIEW", "TABLE", ["advice__r1", "advice__r2", "advice__r3"])}
+    if not export_single:
+        expected["advice__single"] = ("TABLE", "VIEW", ["advice__r4"])
+    assert {item.name: (item.current, item.suggested, item.readers) for item in advice} == (
+        expected
+    )
+    assert all(item.build_time >= 0 and item.reader_time >= 0 for item in advice)
+
+    # And then apply it to a fresh build
+    cleaner.clean_study(config=mock_db_config, manifest=manifest)
+    builder.build_study(
+        mock_db_config,
+        manifest,
+        materialize={item.name: item.suggested for item in advice},
+    )
+    types = _get_types(mock_db_config)
+    assert types["advice__hot"] == "BASE TABLE"
+    assert types["advice__single"] == ("BASE TABLE" if export_single else "VIEW")
+    assert types["advice__cold"] == "VIEW"
+    assert types["advice__shared"] == "BASE TABLE"
+    assert types["advice__appended"] == "BASE TABLE"
+    rows = mock_db_config.db.cursor().execute("SELECT * FROM advice__r4 ORDER BY val").fetchall()
+    assert rows == [(1,), (2,), (4,), (5,)]
+
+
+def test_get_advice_normalizes_names(mock_db_config, tmp_path):
+    manifest = _write_study(tmp_path)
+    builder.run_protected_table_builder(mock_db_config, manifest)
+    builder.build_study(mock_db_config, manifest)
+    expected = advisor.get_advice(mock_db_config, manifest)
+    assert expected
+
+    # Stats can hold names as they were written in the query, quoted or with a schema
+    mock_db_config.db.cursor().execute(
+        "UPDATE advice__lib_query_stats SET "
+        "table_name = '\"main\".\"' || upper(table_name) || '\"', "
+        "reads = replace(reads, 'advice__', 'main.ADVICE__')"
+    )
+    assert advisor.get_advice(mock_db_config, manifest) == expected
+
+
+@pytest.mark.parametrize(
+    "query,materialize,expected",
+    [
+        ("CREATE VIEW a AS SELECT 1", {"a": "TABLE"}, "CREATE TABLE a AS SELECT 1"),
+        ("CREATE OR REPLACE VIEW a AS SELECT 1", {"a": "TABLE"}, "CREATE TABLE a AS SELECT 1"),
+        ('CREATE TABLE "s"."A"\nAS SELECT 1', {"a": "VIEW"}, 'CREATE VIEW "s"."A"\nAS SELECT 1'),
+        ("CREATE TABLE a AS SELECT 1", {"a": "TABLE"}, "CREATE TABLE a AS SELECT 1"),
+        ("CREATE TABLE IF NOT EXISTS a AS SELECT 1", {"a": "VIEW"}, None),
+        ("CREATE TABLE a WITH (format = 'ORC') AS SELECT 1", {"a": "VIEW"}, None),
+        ("CREATE TABLE b AS SELECT * FROM a", {"a": "VIEW"}, None),
+        ("INSERT INTO a VALUES (1)", {"a": "VIEW"}, None),
+    ],
+)
+def test_apply_advice(query, materialize, expected):
+    assert advisor.apply_advice(query, materialize) == (expected or query)
@@ -2,13 +2,22 @@ import contextlib
 import datetime
 import io
 import pathlib
+import threading
 from contextlib import nullcontext as does_not_raise
 from unittest import mock
 
 import pytest
 import time_machine
 
-from cumulus_library import base_utils, enums, errors, log_utils, study_manifest
+from cumulus_library import (
+    BaseTableBuilder,
+    base_utils,
+    db_config,
+    enums,
+    errors,
+    log_utils,
+    study_manifest,
+)
 from cumulus_library.actions import builder, cleaner
 from cumulus_library.template_sql import base_templates, sql_utils
 from tests import conftest, testbed_utils
@@ -336,3 +345,220 @@ def test_ref_summary(tmp_path):
     )
     assert len(res) == 4
     assert res[0] == ("core__patient", "subject_ref", 7, 0.0, datetime.datetime(2024, 1, 4, 0, 0))
+
+
+@pytest.mark.parametrize("action_type", ["build:serial", "build:parallel"])
+def test_incremental_build(mock_db_config, tmp_path, action_type):
+    manifest_dict = {
+        "study_prefix": "incremental",
+        "stages": {
+            "default": [
+                {"files": ["a.sql", "c.sql"], "type": action_type},
+                {"files": ["b.sql"], "type": action_type},
+            ]
+        },
+    }
+    conftest.write_toml(tmp_path, manifest_dict, "manifest.toml")
+    (tmp_path / "a.sql").write_text("CREATE TABLE incremental__a AS SELECT 1 AS val;")
+    (tmp_path / "b.sql").write_text("CREATE TABLE incremental__b AS SELECT * FROM incremental__a;")
+    (tmp_path / "c.sql").write_text("CREATE TABLE incremental__c AS SELECT 3 AS val;")
+    manifest = study_manifest.StudyManifest(tmp_path)
+    cursor = mock_db_config.db.cursor()
+    builder.run_protected_table_builder(mock_db_config, manifest)
+    builder.build_study(mock_db_config, manifest)
+    fingerprints = cursor.execute(
+        "SELECT name, fingerprint FROM incremental__lib_build_source ORDER BY name"
+    ).fetchall()
+    assert [row[0] for row in fingerprints] == [
+        "incremental__a",
+        "incremental__b",
+        "incremental__c",
+    ]
+    assert all(row[1] for row in fingerprints)
+
+    # Mark the existing tables, so we can tell which ones are rebuilt
+    for table in ("a", "b", "c"):
+        cursor.execute(f"INSERT INTO incremental__{table} VALUES (0)")
+    # A formatting-only change shouldn't cause a rebuild, but a new value should,
+    # along with any tables downstream of it
+    (tmp_path / "a.sql").write_text(
+        "-- new comment\nCREATE TABLE incremental__a AS SELECT 2 AS val;"
+    )
+    (tmp_path / "c.sql").write_text("CREATE TABLE incremental__c\nAS SELECT 3 AS val;")
+    builder.build_study(mock_db_config, manifest, incremental=True)
+
+    def get_vals(table):
+        return cursor.execute(f"SELECT val FROM incremental__{table} ORDER BY val").fetchall()
+
+    assert get_vals("a") == [(2,)]
+    assert get_vals("b") == [(2,)]
+    assert get_vals("c") == [(0,), (3,)]
+    new_fingerprints = cursor.execute(
+        "SELECT name, fingerprint FROM incremental__lib_build_source ORDER BY name"
+    ).fetchall()
+    assert len(new_fingerprints) == 3
+    assert new_fingerprints[0][1] != fingerprints[0][1]
+    assert new_fingerprints[1][1] != fingerprints[1][1]
+    assert new_fingerprints[2] == fingerprints[2]
+
+
+def test_migrate_protected_tables(mock_db_config):
+    manifest = study_manifest.StudyManifest(pathlib.Path("./tests/test_data/study_valid/"))
+    cursor = mock_db_config.db.cursor()
+    cursor.execute(
+        "CREATE TABLE study_valid__lib_build_source (stage varchar, name varchar, type varchar)"
+    )
+    builder.run_protected_table_builder(mock_db_config, manifest)
+    cols = cursor.execute(
+        "SELECT column_name FROM information_schema.columns "
+        "WHERE table_name = 'study_valid__lib_build_source'"
+    ).fetchall()
+    assert ("fingerprint",) in cols
+
+
+def test_prepare_builders_concurrently(mock_db_config, tmp_path):
+    conftest.write_toml(
+        tmp_path,
+        {
+            "study_prefix": "concurrent",
+            "stages": {"default": [{"files": ["a.py", "b.py"], "type": "build:parallel"}]},
+        },
+        "manifest.toml",
+    )
+    manifest = study_manifest.StudyManifest(tmp_path)
+    # Both builders have to be preparing at the same time to get past this
+    barrier = threading.Barrier(2, timeout=5)
+
+    class ProbingBuilder(BaseTableBuilder):
+        def __init__(self, table):
+            super().__init__()
+            self.table = table
+
+        def prepare_queries(self, config, *args, **kwargs):
+            barrier.wait()
+            cols = config.db.cursor().execute("SELECT * FROM patient LIMIT 0").description
+            self.queries.append(
+                f"CREATE TABLE concurrent__{self.table} AS SELECT {len(cols)} AS val"
+            )
+
+    with mock.patch.object(
+        builder, "_load_builder", side_effect=lambda _, filename: ProbingBuilder(filename[:-3])
+    ):
+        builder.run_protected_table_builder(mock_db_config, manifest)
+        builder.build_study(mock_db_config, manifest)
+    cursor = mock_db_config.db.cursor()
+    for table in ("a", "b"):
+        assert cursor.execute(f"SELECT val > 0 FROM concurrent__{table}").fetchone() == (True,)
+
+
+def test_resume_build(mock_db_config, tmp_path):
+    conftest.write_toml(
+        tmp_path,
+        {
+            "study_prefix": "resume",
+            "stages": {"default": [{"files": ["tables.py"], "type": "build:serial"}]},
+        },
+        "manifest.toml",
+    )
+    (tmp_path / "tables.py").write_text(
+        "import cumulus_library\n\n\n"
+        "class TablesBuilder(cumulus_library.BaseTableBuilder):\n"
+        "    def prepare_queries(self, *args, **kwargs):\n"
+        "        self.queries = [\n"
+        '            "CREATE TABLE resume__a AS SELECT 1 AS val",\n'
+        '            "CREATE TABLE resume__b AS SELECT * FROM resume__source",\n'
+        "        ]\n"
+    )
+    manifest = study_manifest.StudyManifest(tmp_path)
+    cursor = mock_db_config.db.cursor()
+    builder.run_protected_table_builder(mock_db_config, manifest)
+    # The second query fails, since its source table is missing
+    with pytest.raises(SystemExit):
+        builder.build_study(mock_db_config, manifest)
+
+    # Mark the table that was built, so we can tell if it gets rebuilt
+    cursor.execute("INSERT INTO resume__a VALUES (0)")
+    cursor.execute("CREATE TABLE resume__source AS SELECT 2 AS val")
+    builder.build_study(mock_db_config, manifest, resume=True)
+    assert cursor.execute("SELECT val FROM resume__a ORDER BY val").fetchall() == [(0,), (1,)]
+    assert cursor.execute("SELECT val FROM resume__b").fetchall() == [(2,)]
+    names = cursor.execute("SELECT name FROM resume__lib_build_source ORDER BY name").fetchall()
+    assert names == [("resume__a",), ("resume__b",)]
+
+
+def test_stream_builder_queries(mock_db_config, tmp_path):
+    conftest.write_toml(
+        tmp_path,
+        {
+            "study_prefix": "streaming",
+            "stages": {"default": [{"files": ["tables.py"], "type": "build:parallel"}]},
+            "advanced_options": {"dependency_scheduling": True},
+        },
+        "manifest.toml",
+    )
+    manifest = study_manifest.StudyManifest(tmp_path)
+    # The first table has to be built before the builder is done yielding queries
+    first_built = threading.Event()
+
+    class StreamingBuilder(BaseTableBuilder):
+        def iter_queries(self, config, *args, **kwargs):
+            yield "CREATE TABLE streaming__a AS SELECT 1 AS val"
+            assert first_built.wait(timeout=5)
+            yield "CREATE TABLE streaming__b AS SELECT * FROM streaming__a"
+
+        def prepare_queries(self, *args, **kwargs):
+            self.queries = list(self.iter_queries(*args, **kwargs))
+
+    def execute_with_stats(cursor, query, **kwargs):
+        result = cursor.execute(query)
+        if "streaming__a AS" in query:
+            first_built.set()
+        return result
+
+    builder.run_protected_table_builder(mock_db_config, manifest)
+    with (
+        mock.patch.object(builder, "_load_builder", return_value=StreamingBuilder()),
+        mock.patch.object(mock_db_config.db, "execute_with_stats", wraps=execute_with_stats),
+    ):
+        builder.build_study(mock_db_config, manifest)
+    cursor = mock_db_config.db.cursor()
+    assert cursor.execute("SELECT val FROM streaming__b").fetchall() == [(1,)]
+    names = cursor.execute("SELECT name FROM streaming__lib_build_source ORDER BY name").fetchall()
+    assert names == [("streaming__a",), ("streaming__b",)]
+
+
+@pytest.mark.parametrize(
+    "db_type,query,expected",
+    [
+        (
+            "athena",
+            "CREATE TABLE core__condition AS (SELECT 1)",
+            "CREATE TABLE core__condition WITH (\n"
+            "    bucketed_by = ARRAY['subject_ref'],\n"
+            "    bucket_count = 16\n"
+            ") AS (SELECT 1)",
+        ),
+        (
+            "athena",
+            'CREATE TABLE IF NOT EXISTS "main"."core__patient"\nAS SELECT 1',
+            'CREATE TABLE IF NOT EXISTS "main"."core__patient" WITH (\n'
+            "    bucketed_by = ARRAY['subject_ref'],\n"
+            "    bucket_count = 16\n"
+            ")\nAS SELECT 1",
+        ),
+        (
+            "athena",
+            "CREATE TABLE core__condition WITH (format = 'ORC') AS (SELECT 1)",
+            "CREATE TABLE core__condition WITH (format = 'ORC') AS (SELECT 1)",
+        ),
+        ("athena", "CREATE TABLE core__meta_date AS SELECT 1", None),
+        ("athena", "CREATE VIEW core__condition AS SELECT 1", None),
+        ("duckdb", "CREATE TABLE core__condition AS (SELECT 1)", None),
+    ],
+)
+def test_apply_table_layout(db_type, query, expected):
+    manifest = study_manifest.StudyManifest(
+        pathlib.Path(__file__).parents[2] / "cumulus_library/studies/core"
+    )
+    with mock.patch.object(db_config, "db_type", db_type):
+        assert builder._apply_table_layout(manifest, query) == (expected or query)
@@ -0,0 +1,105 @@
+"""tests for the slow query linter"""
+
+import os
+from unittest import mock
+
+import pytest
+
+from cumulus_library import cli
+from cumulus_library.actions import linter
+from tests import conftest
+
+
+@pytest.mark.parametrize(
+    "query,expected",
+    [
+        ("CREATE TABLE s__a AS SELECT * FROM condition", ["select-star"]),
+        ("CREATE TABLE s__a AS SELECT c.* FROM condition AS c", ["select-star"]),
+        ("CREATE TABLE s__a AS SELECT * FROM core__condition", []),
+        ("CREATE TABLE s__a AS WITH c AS (SELECT id FROM condition) SELECT * FROM c", []),
+        ("CREATE TABLE s__a AS SELECT count(*) AS cnt FROM condition", []),
+        ("CREATE TABLE s__a AS SELECT a.x FROM s__b AS a CROSS JOIN s__c AS b", ["cross-join"]),
+        ("CREATE TABLE s__a AS SELECT a.x FROM s__b AS a, s__c AS b", ["cross-join"]),
+        ("CREATE TABLE s__a AS SELECT a.x FROM s__b AS a, s__c AS b WHERE a.x = b.x", []),
+        ("CREATE TABLE s__a AS SELECT a.x FROM s__b AS a JOIN s__c AS b ON a.x = b.x", []),
+        ("CREATE TABLE s__a AS SELECT t.y FROM s__b AS a CROSS JOIN UNNEST(a.x) AS t (y)", []),
+        (
+            "CREATE TABLE s__a AS SELECT t.y FROM s__b AS a CROSS JOIN UNNEST(ARRAY[1]) AS t (y)",
+            ["unconstrained-unnest"],
+        ),
+        (
+            "CREATE TABLE s__a AS SELECT x FROM s__b WHERE x NOT IN (SELECT x FROM s__c)",
+            ["not-in-subquery"],
+        ),
+        ("CREATE TABLE s__a AS SELECT x FROM s__b WHERE x NOT IN ('a', 'b')", []),
+        (
+            "CREATE TABLE s__a AS SELECT x FROM s__b WHERE "
+            + " OR ".join(f"x ILIKE '%word{i}%'" for i in range(linter.MAX_WILDCARD_MATCHES + 1)),
+            ["leading-wildcard"],
+        ),
+        (
+            "CREATE TABLE s__a AS SELECT x FROM s__b WHERE "
+            + " OR ".join(
+                f"REGEXP_LIKE(x, '^(?i:.*word{i}.*)$')"
+                for i in range(linter.MAX_WILDCARD_MATCHES + 1)
+            ),
+            ["leading-wildcard"],
+        ),
+        (
+            "CREATE TABLE s__a AS SELECT x FROM s__b WHERE "
+            + " OR ".join(f"x LIKE 'word{i}%'" for i in range(linter.MAX_WILDCARD_MATCHES + 1)),
+            [],
+        ),
+        (
+            "CREATE TABLE s__a AS WITH one AS (SELECT id FROM condition), "
+            "two AS (SELECT id FROM condition) SELECT id FROM one UNION SELECT id FROM two",
+            ["repeated-scan"],
+        ),
+        (
+            "CREATE TABLE s__a AS WITH one AS (SELECT id FROM condition), "
+            "two AS (SELECT id FROM one) SELECT id FROM two",
+            [],
+        ),
+        (
+            "CREATE TABLE s__a AS SELECT count(*) AS cnt FROM s__b GROUP BY cube("
+            + ", ".join(f"c{i}" for i in range(linter.MAX_CUBE_COLUMNS + 1))
+            + ")",
+            ["wide-cube"],
+        ),
+        (
+            "CREATE TABLE s__a AS SELECT count(*) AS cnt FROM s__b GROUP BY cube("
+            + ", ".join(f"c{i}" for i in range(linter.MAX_CUBE_COLUMNS))
+            + ")",
+            [],
+        ),
+        ("this is not sql", []),
+    ],
+)
+def test_lint_query(mock_db_config, query, expected):
+    warnings = linter.lint_query(mock_db_config, query, "file.sql")
+    assert [warning.rule for warning in warnings] == expected
+    assert all(warning.filename == "file.sql" for warning in warnings)
+
+
+@mock.patch.dict(os.environ, clear=True)
+@pytest.mark.parametrize("action", [["lint"], ["build", "--lint"]])
+def test_lint_cli(tmp_path, capsys, action):
+    study_dir = tmp_path / "study"
+    study_dir.mkdir()
+    conftest.write_toml(
+        study_dir,
+        {
+            "study_prefix": "lint",
+            "stages": {"default": [{"files": ["lint.sql"], "type": "build:serial"}]},
+        },
+        "manifest.toml",
+    )
+    (study_dir / "lint.sql").write_text(
+        "CREATE TABLE lint__slow AS SELECT * FROM patient;\n"
+        "CREATE TABLE lint__fine AS SELECT id FROM patient;\n"
+    )
+    cli.main(cli_args=conftest.duckdb_args([*action, "-t", "lint", "-s", str(tmp_path)], tmp_path))
+    out = capsys.readouterr().out
+    assert "lint__slow" in out
+    assert "select-star" in out
+    assert "lint__fine" not in out
@@ -0,0 +1,130 @@
+"""tests for splitting duckdb builds across patient shards"""
+
+import os
+from unittest import mock
+
+import duckdb
+import pytest
+
+from cumulus_library import base_utils, cli, databases
+from cumulus_library.actions import sharder
+from tests.conftest import duckdb_args
+
+
+@pytest.mark.parametrize(
+    "resource,expected",
+    [
+        ({"resourceType": "Patient", "id": "a"}, "a"),
+        ({"resourceType": "Condition", "subject": {"reference": "Patient/b"}}, "b"),
+        ({"resourceType": "Coverage", "beneficiary": {"reference": "Patient/c"}}, "c"),
+        ({"resourceType": "Condition", "subject": {"reference": "Group/d"}}, None),
+        ({"resourceType": "Location", "id": "e"}, None),
+    ],
+)
+def test_get_patient_id(resource, expected):
+    assert sharder.get_patient_id(resource) == expected
+
+
+def test_get_shard():
+    shards = [sharder.get_shard(f"patient-{index}", 3) for index in range(100)]
+    assert set(shards) == {0, 1, 2}
+    assert shards == [sharder.get_shard(f"patient-{index}", 3) for index in range(100)]
+
+
+def test_partition_ndjson(tmp_path):
+    source = tmp_path / "source"
+    (source / "patient").mkdir(parents=True)
+    (source / "location").mkdir()
+    (source / "patient" / "patients.ndjson").write_text(
+        "\n".join(f'{{"resourceType": "Patient", "id": "{index}"}}' for index in range(20))
+    )
+    (source / "location" / "locations.ndjson").write_text(
+        '{"resourceType": "Location", "id": "here"}'
+    )
+    shard_dirs = sharder.partition_ndjson(source, tmp_path / "shards", 2)
+    patients = [
+        (shard_dir / "patient/patients.ndjson").read_text().splitlines() for shard_dir in shard_dirs
+    ]
+    assert len(patients[0]) + len(patients[1]) == 20
+    assert not set(patients[0]) & set(patients[1])
+    for shard_dir in shard_dirs:
+        assert (shard_dir / "location/locations.ndjson").read_text().splitlines() == [
+            '{"resourceType": "Location", "id": "here"}'
+        ]
+
+
+def test_merge_shards_only_shard_safe_tables(tmp_path):
+    shard_dbs = [tmp_path / "shard_0.db", tmp_path / "shard_1.db"]
+    for index, shard_db in enumerate(shard_dbs):
+        shard = duckdb.connect(str(shard_db))
+        for table in ("study__safe", "study__ranked"):
+            shard.execute(f"CREATE TABLE {table} AS SELECT 'patient-{index}' AS id, 1 AS rank")
+        shard.execute("CREATE TABLE study__shared AS SELECT 'here' AS id")
+        shard.close()
+    db = databases.DuckDatabaseBackend(str(tmp_path / "main.db"))
+    db.connect()
+    config = base_utils.StudyConfig(db=db, schema="main")
+    manifest = mock.MagicMock()
+    manifest.get_dedicated_schema.return_value = None
+    manifest.get_shard_safe_tables.return_value = {"study__safe", "study__shared"}
+
+    merged = sharder.merge_shards(config, manifest, shard_dbs)
+
+    assert merged == {"study__safe", "study__shared"}
+    cursor = db.cursor()
+    assert sorted(cursor.execute("SELECT id FROM study__safe").fetchall()) == [
+        ("patient-0",),
+        ("patient-1",),
+    ]
+    assert cursor.execute("SELECT id FROM study__shared").fetchall() == [("here",)]
+    assert "study__ranked" not in {name for (name,) in cursor.execute("SHOW TABLES").fetchall()}
+
+    manifest.get_shard_safe_tables.return_value = set()
+    assert sharder.merge_shards(config, manifest, shard_dbs) == set()
+
+
+@mock.patch.dict(os.environ, clear=True)
+def test_sharded_build_matches_monolith(tmp_path):
+    (tmp_path / "monolith").mkdir()
+    (tmp_path / "sharded").mkdir()
+    cli.main(cli_args=duckdb_args(["build", "-t", "core"], tmp_path / "monolith"))
+    cli.main(cli_args=duckdb_args(["build", "-t", "core", "--shards", "2"], tmp_path / "sharded"))
+    assert not (tmp_path / "sharded/duck.db.shards").exists()
+
+    db = duckdb.connect(str(tmp_path / "monolith/duck.db"), read_only=True)
+    db.execute(f"ATTACH '{tmp_path}/sharded/duck.db' AS sharded (READ_ONLY)")
+    tables = db.execute(
+        "SELECT table_name FROM information_schema.tables "
+        "WHERE table_catalog = 'duck' AND table_name LIKE 'core\\_\\_%' ESCAPE '\\' "
+        "AND table_name NOT LIKE 'core\\_\\_lib\\_%' ESCAPE '\\'"
+    ).fetchall()
+    assert tables
+    for (table,) in tables:
+        monolith = f'duck.main."{table}"'
+        sharded = f'sharded.main."{table}"'
+        assert (
+            db.execute(f"DESCRIBE {monolith}").fetchall()
+            == db.execute(f"DESCRIBE {sharded}").fetchall()
+        ), table
+        for left, right in ((monolith, sharded), (sharded, monolith)):
+            diff = db.execute(f"SELECT * FROM {left} EXCEPT ALL SELECT * FROM {right}").fetchall()
+            assert diff == [], table
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        ["--shards", "2"],
+        ["--shards", "0", "--db-type", "duckdb", "--load-ndjson-dir", "x", "--database", "x.db"],
+        ["--shards", "2", "--db-type", "athena", "--load-ndjson-dir", "x", "--database", "x"],
+        ["--shards", "2", "--db-type", "duckdb", "--load-ndjson-dir", "x"],
+        [
+            *("--shards", "2", "--db-type", "duckdb", "--load-ndjson-dir", "x"),
+            *("--database", "x.db", "--incremental"),
+        ],
+    ],
+)
+@mock.patch.dict(os.environ, clear=True)
+def test_sharded_build_bad_args(args):
+    with pytest.raises(SystemExit):
+        cli.main(cli_args=["build", "-t", "core", *args])
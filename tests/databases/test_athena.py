@@ -2,17 +2,20 @@
 
 import base64
 import hashlib
-import io
 import json
 import os
 import pathlib
+import threading
 import time
 from concurrent import futures
 from unittest import mock
 
-import awswrangler
+import boto3
 import botocore
-import pandas
+import botocore.stub
+import pyarrow
+import pyarrow.fs
+import pyarrow.parquet
 import pyathena
 import pytest
 import responses
@@ -73,11 +76,7 @@ def test_upload_parquet_response_handling(mock_session):
         client.get_work_group.return_value = json.load(f)
     db.connection._client = client
     s3_client = mock.MagicMock()
-    with open(path / "test_data/aws/boto3.client.s3.list_objects_v2.json") as f:
-        s3_client.list_objects_v2.return_value = json.load(f)
-
-    with open(path / "test_data/upload/upload__count_synthea_patient.cube.parquet", "rb") as f:
-        s3_client.get_object.return_value = {"Body": io.BytesIO(f.read())}
+    s3_client.head_object.return_value = {}
 
     mock_session.return_value.create_client.return_value = s3_client
     resp = db.upload_file(
@@ -120,43 +119,38 @@ def test_upload_file_does_not_exist(mock_session):
 @pytest.mark.parametrize(
     (
         "force_upload",
-        "list_objects_result",
         "remote_bytes",
         "local_bytes",
         "expected_head_object_call_count",
-        "expected_put_object_call_count",
+        "expected_upload_call_count",
     ),
     [
         pytest.param(
             False,
-            {"KeyCount": 1},
             b"same-content",
             b"same-content",
             1,
             0,
-            id="checksums-match-does-not-call-put-object",
+            id="checksums-match-does-not-upload",
         ),
         pytest.param(
             False,
-            {"KeyCount": 1},
             b"new-content",
             b"old-content",
             1,
             1,
-            id="checksums-do-not-match-calls-put-object",
+            id="checksums-do-not-match-uploads",
         ),
         pytest.param(
             False,
-            {"KeyCount": 1},
             "",
             b"new-content",
             1,
             1,
-            id="remote-checksum-missing-calls-put-object",
+            id="remote-checksum-missing-uploads",
         ),
         pytest.param(
             True,
-            {"KeyCount": 1},
             b"same-content",
             b"same-content",
             0,
@@ -170,11 +164,10 @@ def test_upload_file_behavior(
     mock_session,
     tmp_path,
     force_upload,
-    list_objects_result,
     remote_bytes,
     local_bytes,
     expected_head_object_call_count,
-    expected_put_object_call_count,
+    expected_upload_call_count,
 ):
     path = pathlib.Path(__file__).resolve().parents[1]
     local_file = tmp_path / "upload_file_behavior.csv"
@@ -194,7 +187,6 @@ def test_upload_file_behavior(
     db.connection._client = client
 
     s3_client = mock.MagicMock()
-    s3_client.list_objects_v2.return_value = list_objects_result
 
     if remote_bytes:
         s3_client.head_object.return_value = {
@@ -220,8 +212,74 @@ def test_upload_file_behavior(
         "cumulus_user_uploads/db_schema/test_study/upload_file_behavior"
     )
 
-    s3_client.head_object.call_count = expected_head_object_call_count
-    s3_client.put_object.call_count = expected_put_object_call_count
+    assert s3_client.head_object.call_count == expected_head_object_call_count
+    assert s3_client.upload_file.call_count == expected_upload_call_count
+
+
+def test_upload_file_stubbed_s3(tmp_path, monkeypatch):
+    # A real S3 client, answering from a local stub rather than AWS
+    s3_client = boto3.Session(
+        aws_access_key_id="id", aws_secret_access_key="secret", region_name="us-east-1"
+    ).client("s3")
+    db = databases.AthenaDatabaseBackend(
+        region="us-east-1",
+        work_group="work_group",
+        profile="profile",
+        schema_name="db_schema",
+    )
+    db._clients["s3"] = s3_client
+    db._result_config = {
+        "OutputLocation": "s3://bucket/results/",
+        "EncryptionConfiguration": {"EncryptionOption": "SSE_KMS", "KmsKey": "arn"},
+    }
+    small_file = tmp_path / "small.parquet"
+    small_file.write_bytes(b"small")
+    small_hash = base64.b64encode(hashlib.sha256(b"small").digest()).decode("utf-8")
+    key = "results/cumulus_user_uploads/db_schema/study/topic"
+
+    with botocore.stub.Stubber(s3_client) as stub:
+        # New files go up in one piece, with our hash alongside
+        stub.add_client_error("head_object", service_error_code="404", http_status_code=404)
+        stub.add_response(
+            "put_object",
+            {},
+            {
+                "Bucket": "bucket",
+                "Key": f"{key}/small.parquet",
+                "Body": botocore.stub.ANY,
+                "ServerSideEncryption": "aws:kms",
+                "SSEKMSKeyId": "arn",
+                "ChecksumAlgorithm": "SHA256",
+                "Metadata": {"sha256": small_hash},
+            },
+        )
+        assert db.upload_file(file=small_file, study="study", topic="topic") == (
+            f"s3://bucket/{key}"
+        )
+        # Files we've already sent are skipped
+        stub.add_response("head_object", {"Metadata": {"sha256": small_hash}})
+        assert db.upload_file(file=small_file, study="study", topic="topic") == (
+            f"s3://bucket/{key}"
+        )
+        stub.assert_no_pending_responses()
+
+    # Big files are sent in parts
+    monkeypatch.setattr(athena, "UPLOAD_PART_SIZE", 5 * 1024 * 1024)
+    big_file = tmp_path / "big.parquet"
+    big_file.write_bytes(b"x" * (11 * 1024 * 1024))
+    with botocore.stub.Stubber(s3_client) as stub:
+        stub.add_client_error("head_object", service_error_code="404", http_status_code=404)
+        stub.add_response("create_multipart_upload", {"UploadId": "upload"})
+        for _ in range(3):
+            stub.add_response("upload_part", {"ETag": "etag"})
+        stub.add_response("complete_multipart_upload", {})
+        db.upload_file(file=big_file, study="study", topic="topic", force_upload=False)
+        stub.assert_no_pending_responses()
+
+    # And many files can be sent at once
+    with mock.patch.object(db, "upload_file", side_effect=lambda **kw: kw["topic"]):
+        uploads = [{"file": small_file, "study": "study", "topic": str(i)} for i in range(10)]
+        assert db.upload_files(uploads) == [str(i) for i in range(10)]
 
 
 @mock.patch("botocore.client")
@@ -245,6 +303,231 @@ def test_create_schema(mock_client):
     assert mock_clientobj.create_database.called
 
 
+@pytest.mark.parametrize(
+    "glue_type,expected",
+    [
+        ("string", "varchar"),
+        ("int", "integer"),
+        ("decimal(10,2)", "decimal(10,2)"),
+        ("array<string>", "array(varchar)"),
+        (
+            "struct<code:string,Coding:array<struct<system:string,display:varchar(10)>>>",
+            "row(code varchar, coding array(row(system varchar, display varchar)))",
+        ),
+        ("map<string,struct<a:bigint>>", "map(varchar, row(a bigint))"),
+    ],
+)
+def test_glue_type_to_athena(glue_type, expected):
+    assert athena._glue_type_to_athena(glue_type) == expected
+
+
+def test_glue_catalog():
+    db = databases.AthenaDatabaseBackend(
+        region="test", work_group="test", profile="test", schema_name="test"
+    )
+    db._clients["glue"] = mock.MagicMock()
+    db.glue_client().get_paginator.return_value.paginate.return_value = [
+        {
+            "TableList": [
+                {
+                    "Name": "study__table",
+                    "TableType": "EXTERNAL_TABLE",
+                    "StorageDescriptor": {
+                        "Columns": [{"Name": "id", "Type": "string"}],
+                    },
+                    "PartitionKeys": [{"Name": "site", "Type": "string"}],
+                },
+            ]
+        },
+        {
+            "TableList": [
+                {"Name": "study__view", "TableType": "VIRTUAL_VIEW"},
+                {"Name": "other", "TableType": "EXTERNAL_TABLE"},
+            ]
+        },
+    ]
+    assert db.list_tables("test", "study__") == [
+        ("study__table", "TABLE"),
+        ("study__view", "VIEW"),
+    ]
+    assert db.get_column_types("test", "study__table") == [
+        ("id", "varchar"),
+        ("site", "varchar"),
+    ]
+    assert db.get_column_types("test", "missing") == []
+    # The schema was listed once, and then served from memory
+    assert db.glue_client().get_paginator.return_value.paginate.call_count == 1
+    assert not db.glue_client().get_table.called
+
+    # Queries that don't change the catalog keep the snapshot as is
+    db.execute_with_stats(mock.MagicMock(), "SELECT * FROM study__table")
+    db.list_tables("test")
+    assert db.glue_client().get_paginator.return_value.paginate.call_count == 1
+
+    # Tables a query changes are looked up again (once), the next time they're needed
+    db.glue_client().get_table.return_value = {
+        "Table": {
+            "Name": "study__new",
+            "StorageDescriptor": {"Columns": [{"Name": "Code", "Type": "array<int>"}]},
+        }
+    }
+    db.execute_with_stats(mock.MagicMock(), "CREATE TABLE study__new AS SELECT 1")
+    assert db.get_column_types("test", "study__table") == [("id", "varchar"), ("site", "varchar")]
+    assert not db.glue_client().get_table.called
+    assert db.get_column_types("test", "Study__New") == [("code", "array(integer)")]
+    assert ("study__new", "TABLE") in db.list_tables("test", "study__")
+    db.glue_client().get_table.assert_called_once_with(DatabaseName="test", Name="study__new")
+    db.glue_client().get_table.side_effect = botocore.exceptions.ClientError(
+        {"Error": {"Code": "EntityNotFoundException"}}, "GetTable"
+    )
+    db.execute_with_stats(mock.MagicMock(), 'DROP TABLE IF EXISTS "test"."study__new"')
+    assert db.list_tables("test", "study__") == [
+        ("study__table", "TABLE"),
+        ("study__view", "VIEW"),
+    ]
+    assert db.glue_client().get_table.call_count == 2
+    assert db.glue_client().get_paginator.return_value.paginate.call_count == 1
+    db.glue_client().get_table.side_effect = None
+
+    # Queries we can't make sense of forget everything
+    db.execute_with_stats(mock.MagicMock(), "CREATE SCHEMA other")
+    db.list_tables("test")
+    assert db.glue_client().get_paginator.return_value.paginate.call_count == 2
+
+    # Tables without a schema in Glue fall back to information_schema
+    db.glue_client().get_paginator.return_value.paginate.return_value = [
+        {"TableList": [{"Name": "table", "Parameters": {"table_type": "DELTA"}}]}
+    ]
+    with mock.patch.object(db, "cursor") as mock_cursor:
+        mock_cursor.return_value.execute.return_value.fetchall.return_value = [("id", "varchar")]
+        assert db.get_column_types("delta", "table") == [("id", "varchar")]
+    assert "information_schema.columns" in mock_cursor.return_value.execute.call_args[0][0]
+
+    # Missing schemas have no tables, but other errors are raised
+    db.glue_client().get_paginator.return_value.paginate.side_effect = (
+        botocore.exceptions.ClientError({"Error": {"Code": "EntityNotFoundException"}}, "GetTables")
+    )
+    assert db.list_tables("missing") == []
+    db.glue_client().get_paginator.return_value.paginate.side_effect = (
+        botocore.exceptions.ClientError({"Error": {"Code": "AccessDeniedException"}}, "GetTables")
+    )
+    with pytest.raises(botocore.exceptions.ClientError):
+        db.list_tables("forbidden")
+
+
+def test_glue_catalog_threads():
+    db = databases.AthenaDatabaseBackend(
+        region="test", work_group="test", profile="test", schema_name="test"
+    )
+    db._clients["glue"] = mock.MagicMock()
+    columns = {"StorageDescriptor": {"Columns": [{"Name": "id", "Type": "string"}]}}
+    db.glue_client().get_paginator.return_value.paginate.return_value = [
+        {"TableList": [{"Name": f"study__{i}", **columns} for i in range(50)]}
+    ]
+    db.glue_client().get_table.side_effect = lambda DatabaseName, Name: {
+        "Table": {"Name": Name, **columns}
+    }
+    db.list_tables("test")
+    done = threading.Event()
+
+    def forget_tables():
+        # Like scheduler workers, forgetting the tables their queries changed
+        while not done.is_set():
+            db.forget_catalog({("test", f"study__{i}") for i in range(50)})
+
+    with futures.ThreadPoolExecutor(max_workers=4) as executor:
+        workers = [executor.submit(forget_tables) for _ in range(4)]
+        try:
+            for _ in range(200):
+                assert len(db.list_tables("test", "study__")) == 50
+                assert db.get_column_types("test", "study__1") == [("id", "varchar")]
+        finally:
+            done.set()
+        for worker in workers:
+            worker.result()
+
+
+@mock.patch("boto3.Session")
+def test_drop_tables(mock_session):
+    db = databases.AthenaDatabaseBackend(
+        region="test", work_group="test", profile="test", schema_name="test"
+    )
+    db._clients["glue"] = mock.MagicMock()
+    db.glue_client().get_paginator.return_value.paginate.return_value = [
+        {
+            "TableList": [
+                {"Name": f"t{i}", "StorageDescriptor": {"Location": f"s3://bucket/tables/t{i}"}}
+                for i in range(150)
+            ]
+            + [{"Name": "root", "StorageDescriptor": {"Location": "s3://bucket/"}}]
+        }
+    ]
+    db.glue_client().batch_delete_table.return_value = {
+        "Errors": [
+            {"TableName": "t5", "ErrorDetail": {"ErrorCode": "EntityNotFoundException"}},
+        ]
+    }
+    tables = [(f"t{i}", "TABLE") for i in range(150)]
+    progress_bar = mock.MagicMock()
+    db.list_tables("test")
+    db.drop_tables(tables, progress_bar=progress_bar, task="task")
+    calls = db.glue_client().batch_delete_table.call_args_list
+    assert [len(c[1]["TablesToDelete"]) for c in calls] == [100, 50]
+    assert calls[0][1]["DatabaseName"] == "test"
+    assert progress_bar.advance.call_args_list == [mock.call("task", 100), mock.call("task", 50)]
+    assert not mock_session.called
+    # Dropped tables are removed from the catalog snapshot, without looking them up
+    assert db.list_tables("test") == [("root", "TABLE")]
+    assert db.glue_client().get_paginator.return_value.paginate.call_count == 1
+    assert not db.glue_client().get_table.called
+
+    # Data is only deleted when asked, under each table's own prefix
+    s3_client = mock_session.return_value.client.return_value
+    s3_client.get_paginator.return_value.paginate.return_value = [
+        {"Contents": [{"Key": "tables/t1/a.parquet"}, {"Key": "tables/t1/b.parquet"}]}
+    ]
+    db.drop_tables(
+        [("t1", "TABLE"), ("root", "TABLE")],
+        schema_name="dedicated",
+        progress_bar=progress_bar,
+        task="task",
+        delete_data=True,
+    )
+    assert db.glue_client().batch_delete_table.call_args[1]["DatabaseName"] == "dedicated"
+    s3_client.get_paginator.return_value.paginate.assert_called_once_with(
+        Bucket="bucket", Prefix="tables/t1/"
+    )
+    s3_client.delete_objects.assert_called_once_with(
+        Bucket="bucket",
+        Delete={
+            "Objects": [{"Key": "tables/t1/a.parquet"}, {"Key": "tables/t1/b.parquet"}],
+            "Quiet": True,
+        },
+    )
+
+    # Other errors are raised, after trying to drop everything
+    db.glue_client().batch_delete_table.return_value = {
+        "Errors": [
+            {
+                "TableName": "t7",
+                "ErrorDetail": {"ErrorCode": "AccessDeniedException", "ErrorMessage": "Nope"},
+            },
+        ]
+    }
+    with pytest.raises(errors.AWSError, match="t7: Nope"):
+        db.drop_tables(tables, progress_bar=progress_bar, task="task")
+
+
+def test_create_schema_is_remembered():
+    db = databases.AthenaDatabaseBackend(
+        region="test", work_group="test", profile="test", schema_name="test"
+    )
+    db._clients["glue"] = mock.MagicMock()
+    db.create_schema("dedicated")
+    db.create_schema("dedicated")
+    assert db.glue_client().get_database.call_count == 1
+
+
 def test_dedicated_schema_namespacing(tmp_path):
     manifest_dict = {
         "study_prefix": "foo",
@@ -269,9 +552,13 @@ def test_dedicated_schema_namespacing(tmp_path):
     assert result == "CREATE EXTERNAL TABLE foo.bar"
 
 
-@mock.patch("botocore.client")
-@mock.patch("awswrangler.s3")
-def test_export_table(mock_wrangler, mock_client, tmp_path):
+def _fake_s3(tmp_path: pathlib.Path) -> pyarrow.fs.SubTreeFileSystem:
+    """A local stand-in for S3, where bucket/key is a path under tmp_path/s3"""
+    (tmp_path / "s3").mkdir(exist_ok=True)
+    return pyarrow.fs.SubTreeFileSystem(str(tmp_path / "s3"), pyarrow.fs.LocalFileSystem())
+
+
+def test_export_table(tmp_path):
     db = databases.AthenaDatabaseBackend(
         region="test",
         work_group="test",
@@ -284,8 +571,8 @@ def test_export_table(mock_wrangler, mock_client, tmp_path):
             "Configuration": {"ResultConfiguration": {"OutputLocation": "s3://testbucket/athena"}}
         }
     }
-    db.connection._client.get_work_group.side_effect = [bucket_info, bucket_info]
-    mock_clientobj = mock_client.ClientCreator.return_value.create_client.return_value
+    db.connection._client.get_work_group.return_value = bucket_info
+    mock_clientobj = db.connection.session.client.return_value
     mock_clientobj.list_objects_v2.side_effect = [
         # first pass: delete found file and then cleanup
         {"Contents": [{"Key": "export/file_to_delete"}]},
@@ -293,18 +580,65 @@ def test_export_table(mock_wrangler, mock_client, tmp_path):
         # second pass: skip deletion
         {},
     ]
-    # file found
-    mock_wrangler.read_parquet.return_value = pandas.DataFrame({"A": [1, 2], "B": ["x", "y"]})
-    res = db.export_table_as_parquet("table", "flat", tmp_path)
+    # UNLOAD wrote a couple of files, which are copied into one
+    unload_dir = tmp_path / "s3/testbucket/export/table.flat.parquet"
+    unload_dir.mkdir(parents=True)
+    pyarrow.parquet.write_table(pyarrow.table({"A": [1], "B": ["x"]}), unload_dir / "1")
+    pyarrow.parquet.write_table(pyarrow.table({"A": [2], "B": ["y"]}), unload_dir / "2")
+    with mock.patch.object(db, "_s3_filesystem", return_value=_fake_s3(tmp_path)):
+        res = db.export_table_as_parquet("table", "table.flat.parquet", tmp_path)
     assert res is True
     assert mock_clientobj.delete_object.call_args[1]["Key"] == "export/table.flat.parquet"
+    exported = pyarrow.parquet.read_table(tmp_path / "table.flat.parquet")
+    assert sorted(exported.to_pylist(), key=lambda row: row["A"]) == [
+        {"A": 1, "B": "x"},
+        {"A": 2, "B": "y"},
+    ]
 
     # file not found
-    mock_wrangler.read_parquet.side_effect = awswrangler.exceptions.NoFilesFound
-    res = db.export_table_as_parquet("table", "flat", tmp_path)
+    with mock.patch.object(db, "_s3_filesystem", return_value=_fake_s3(tmp_path)):
+        res = db.export_table_as_parquet("table", "empty.flat.parquet", tmp_path)
     assert res is False
 
 
+def test_iter_record_batches(tmp_path):
+    db = databases.AthenaDatabaseBackend(
+        region="test", work_group="test", profile="test", schema_name="test"
+    )
+    db.connection = mock.MagicMock()
+    cursor = db.connection.cursor.return_value
+    cursor.description = [("id", "integer"), ("code", "varchar"), ("nested", "row")]
+    cursor.output_location = "s3://testbucket/athena/query.csv"
+    results = tmp_path / "s3/testbucket/athena/query.csv"
+    results.parent.mkdir(parents=True)
+    results.write_text(
+        '"id","code","nested"\n'
+        + "".join(f'"{i}","code{i}","{{a={i}}}"\n' for i in range(5))
+        + ',"",\n'
+    )
+    with mock.patch.object(db, "_s3_filesystem", return_value=_fake_s3(tmp_path)):
+        batches = list(db.iter_record_batches("SELECT * FROM foo", batch_size=2))
+    assert [batch.num_rows for batch in batches] == [2, 2, 2]
+    table = pyarrow.Table.from_batches(batches)
+    assert table.schema == pyarrow.schema(
+        [("id", pyarrow.int32()), ("code", pyarrow.string()), ("nested", pyarrow.string())]
+    )
+    assert table.column("id").to_pylist() == [0, 1, 2, 3, 4, None]
+    assert table.column("code").to_pylist()[4:] == ["code4", ""]
+
+    # Results with no rows still come back as a batch, so callers can see the columns
+    results.write_text('"id","code","nested"\n')
+    with mock.patch.object(db, "_s3_filesystem", return_value=_fake_s3(tmp_path)):
+        batches = list(db.iter_record_batches("SELECT * FROM foo"))
+    assert [batch.num_rows for batch in batches] == [0]
+    assert batches[0].schema.names == ["id", "code", "nested"]
+
+    # As do statements that don't write any results
+    cursor.description = []
+    cursor.output_location = "s3://testbucket/athena/query.txt"
+    assert [batch.num_rows for batch in db.iter_record_batches("DROP TABLE foo")] == [0]
+
+
 @mock.patch("cumulus_library.databases.base.ParallelResult")
 @mock.patch("cumulus_library.databases.athena.AthenaDatabaseBackend.async_cursor")
 def test_parallel_execute(mock_cursor_getter, mock_result):
@@ -343,6 +677,224 @@ def test_parallel_execute(mock_cursor_getter, mock_result):
     assert mock_cursor.execute.call_args_list[2][0][0] == "select 2 from foo"
 
 
+def test_concurrency_controller():
+    controller = athena.ConcurrencyController(start=4, ceiling=5, max_backoff=3)
+    # A round of quick queries raises the limit by one, up to the ceiling
+    for _ in range(2):
+        for _ in range(4):
+            controller.acquire()
+        for _ in range(4):
+            controller.release(queue_time=0.1)
+    assert controller.limit == 5
+    for _ in range(5):
+        controller.acquire()
+    for _ in range(5):
+        controller.release(queue_time=0.1)
+    assert controller.limit == 5
+    # A round of queued queries halves it, once
+    for _ in range(5):
+        controller.acquire()
+    for _ in range(5):
+        controller.release(queue_time=10)
+    assert controller.limit == 2
+    # Throttling halves it too, and backs off exponentially until a query gets in
+    assert [controller.throttled() for _ in range(4)] == [1, 2, 3, 3]
+    assert controller.limit == 1
+    controller.started()
+    assert controller.throttled() == 1
+
+    # Failed queries hand back their slot without raising the limit
+    controller = athena.ConcurrencyController(start=2, ceiling=5)
+    for _ in range(4):
+        controller.acquire()
+        controller.release(failed=True)
+    assert controller.limit == 2
+    assert controller.in_flight == 0
+    # Unless they failed from throttling, which lowers it
+    controller.acquire()
+    controller.release(failed=True, throttled=True)
+    assert controller.limit == 1
+
+
+def test_query_slots():
+    db = databases.AthenaDatabaseBackend(
+        region="test", work_group="test", profile="test", schema_name="test", max_concurrent=4
+    )
+    assert db.max_query_slots() == 4
+    for _ in range(4):
+        db.acquire_query_slot()
+    assert db.concurrency.in_flight == 4
+    for _ in range(4):
+        db.release_query_slot(mock.MagicMock(query_queue_time_in_millis=10000))
+    assert db.concurrency.limit == 2
+    db.acquire_query_slot()
+    db.release_query_slot(error=pyathena.OperationalError("TooManyRequestsException"))
+    assert db.concurrency.limit == 1
+    assert db.concurrency.in_flight == 0
+
+
+@mock.patch("cumulus_library.databases.athena.time.sleep")
+@mock.patch("cumulus_library.databases.athena.AthenaDatabaseBackend.async_cursor")
+def test_parallel_execute_throttled(mock_cursor_getter, mock_sleep):
+    db = databases.AthenaDatabaseBackend(
+        region="test", work_group="test", profile="test", schema_name="test"
+    )
+    result_set = mock.MagicMock(query_queue_time_in_millis=100, description=[("x",)])
+    result_set.fetchall.return_value = [(1,)]
+    done = futures.Future()
+    done.set_result(result_set)
+    throttled = pyathena.DatabaseError("An error occurred (TooManyRequestsException)")
+    mock_cursor_getter.return_value.execute.side_effect = [
+        throttled,
+        throttled,
+        ("id", done),
+        pyathena.DatabaseError("An error occurred (InvalidRequestException)"),
+    ]
+    results = db.parallel_execute(
+        ["select 1"],
+        False,
+        mock.MagicMock(),
+        mock.MagicMock(),
+        result_policy=databases.ResultPolicy.FETCH,
+    )
+    assert results[0].rows == [(1,)]
+    assert mock_sleep.call_args_list == [mock.call(1.0), mock.call(2.0)]
+    assert db.concurrency.limit == 5
+    assert db.concurrency.in_flight == 0
+    # Other errors are not retried, and get reported like any other failed query
+    with pytest.raises(SystemExit, match="InvalidRequestException"):
+        db.parallel_execute(["select 2"], False, mock.MagicMock(), mock.MagicMock())
+    assert db.concurrency.in_flight == 0
+
+
+def _query_execution(query_id, state):
+    return {"QueryExecutionId": query_id, "Query": "select 1", "Status": {"State": state}}
+
+
+def test_query_poller():
+    client = mock.MagicMock()
+    checks = []
+
+    def batch_get_query_execution(QueryExecutionIds):
+        checks.append(QueryExecutionIds)
+        # Everything runs for one check, then q1 fails, and everything else succeeds
+        # (except q2, which Athena fails to look up the first time it finishes)
+        state = "RUNNING" if len(checks) <= 2 else "SUCCEEDED"
+        ids = [x for x in QueryExecutionIds if not (x == "q2" and len(checks) == 3)]
+        return {
+            "QueryExecutions": [
+                _query_execution(x, "FAILED" if x == "q1" and state != "RUNNING" else state)
+                for x in ids
+            ],
+            "UnprocessedQueryExecutionIds": [{"QueryExecutionId": "q2"}] if len(ids) < 50 else [],
+        }
+
+    client.batch_get_query_execution.side_effect = batch_get_query_execution
+    poller = athena.QueryPoller(client, poll_interval=0.01)
+    watched = {f"q{i}": poller.watch(f"q{i}") for i in range(60)}
+    futures.wait(watched.values(), timeout=5)
+    assert watched["q1"].result().state == "FAILED"
+    assert watched["q2"].result().state == "SUCCEEDED"
+    assert all(f.result().state == "SUCCEEDED" for k, f in watched.items() if k != "q1")
+    # Status checks go out at most 50 IDs at a time, and stop once everything's done
+    assert [len(x) for x in checks] == [50, 10, 50, 10, 1]
+    time.sleep(0.05)
+    assert poller._thread is None
+
+    # Errors checking on queries are passed along to their futures
+    client.batch_get_query_execution.side_effect = botocore.exceptions.ClientError(
+        {"Error": {"Code": "InternalServerException"}}, "BatchGetQueryExecution"
+    )
+    with pytest.raises(pyathena.OperationalError):
+        poller.watch("q61").result(timeout=5)
+
+    # Queries Athena never manages to look up eventually fail, rather than keeping
+    # the poller around forever
+    client.batch_get_query_execution.side_effect = None
+    client.batch_get_query_execution.return_value = {
+        "QueryExecutions": [],
+        "UnprocessedQueryExecutionIds": [{"QueryExecutionId": "q62", "ErrorMessage": "Lost it"}],
+    }
+    client.batch_get_query_execution.reset_mock()
+    with pytest.raises(pyathena.OperationalError, match="Lost it"):
+        poller.watch("q62").result(timeout=5)
+    assert client.batch_get_query_execution.call_count == athena.QueryPoller.MAX_UNPROCESSED_CHECKS
+    time.sleep(0.05)
+    assert poller._thread is None
+
+
+def test_batch_polled_cursor():
+    poller = mock.MagicMock()
+    polled = futures.Future()
+    polled.set_result(mock.MagicMock(state="SUCCEEDED"))
+    poller.watch.return_value = polled
+    on_execute = mock.MagicMock()
+    cursor = athena.BatchPolledCursor(
+        connection=mock.MagicMock(),
+        converter=mock.MagicMock(),
+        formatter=mock.MagicMock(),
+        retry_config=pyathena.util.RetryConfig(),
+        poller=poller,
+        on_execute=on_execute,
+    )
+    cursor._result_set_class = mock.MagicMock()
+    with mock.patch.object(cursor, "_execute", return_value="q1"):
+        cursor.execute("select 1")
+    # The cursor waited on the poller, instead of calling GetQueryExecution itself
+    poller.watch.assert_called_once_with("q1")
+    assert cursor.result_set == cursor._result_set_class.return_value
+    assert not cursor._connection.client.get_query_execution.called
+    on_execute.assert_called_once_with("select 1")
+    # Failed queries are passed along too, since they might have changed something
+    with mock.patch.object(cursor, "_execute", side_effect=pyathena.OperationalError("oops")):
+        with pytest.raises(pyathena.OperationalError):
+            cursor.execute("drop table foo")
+    on_execute.assert_called_with("drop table foo")
+
+    db = databases.AthenaDatabaseBackend(
+        region="test", work_group="test", profile="test", schema_name="test"
+    )
+    db.connection = mock.MagicMock()
+    db.parallel_cursor()
+    db.async_cursor()
+    # Scheduler and parallel_execute() cursors share one poller
+    cursor_kwargs = [call.kwargs for call in db.connection.cursor.call_args_list]
+    assert cursor_kwargs[0]["cursor"] == athena.BatchPolledCursor
+    assert cursor_kwargs[0]["poller"] is cursor_kwargs[1]["poller"] is db.poller
+
+    # Queries run through our cursors keep the catalog snapshot up to date
+    db._catalog = {"test": {}, "other": {}}
+    cursor_kwargs[0]["on_execute"]("ALTER TABLE study__stats ADD COLUMNS (reads string)")
+    cursor_kwargs[0]["on_execute"]('CREATE TABLE "other"."study__new" AS SELECT 1')
+    assert db._stale_tables == {"test": {"study__stats"}, "other": {"study__new"}}
+    cursor_kwargs[0]["on_execute"]("MSCK REPAIR TABLE study__stats")
+    assert db._catalog == {}
+
+
+def test_batch_polled_async_cursor():
+    poller = mock.MagicMock()
+    polled = futures.Future()
+    poller.watch.return_value = polled
+    cursor = athena.BatchPolledAsyncCursor(
+        connection=mock.MagicMock(),
+        converter=mock.MagicMock(),
+        formatter=mock.MagicMock(),
+        retry_config=pyathena.util.RetryConfig(),
+        poller=poller,
+    )
+    cursor._result_set_class = mock.MagicMock()
+    with mock.patch.object(cursor, "_execute", return_value="q1") as mock_execute:
+        query_id, future = cursor.execute("select 1")
+    assert query_id == "q1"
+    assert mock_execute.call_args[0][0] == "select 1"
+    poller.watch.assert_called_once_with("q1")
+    assert not future.done()
+    query_execution = mock.MagicMock()
+    polled.set_result(query_execution)
+    assert future.result(timeout=5) == cursor._result_set_class.return_value
+    assert cursor._result_set_class.call_args[1]["query_execution"] == query_execution
+
+
 @mock.patch("botocore.client")
 def test_get_async_cursor(mock_client):
     db = databases.AthenaDatabaseBackend(
@@ -443,3 +995,37 @@ def test_iid_lookup(mock_session, status, expected):
     )
     db.connect()
     assert db.region == expected
+
+
+@mock.patch("boto3.Session")
+def test_shared_aws_clients(mock_session):
+    db = databases.AthenaDatabaseBackend(
+        region="test",
+        work_group="test",
+        profile="test",
+        schema_name="test",
+        max_concurrent=50,
+    )
+    # Before connecting, clients come from a session of our own
+    assert db.aws_client("s3") is db.aws_client("s3")
+    assert db.glue_client() is db.aws_client("glue")
+    assert mock_session.call_count == 1
+    assert mock_session.return_value.client.call_count == 2
+    config = mock_session.return_value.client.call_args[1]["config"]
+    assert config.max_pool_connections == 50
+
+    # Once connected, we share the connection's session and Athena client
+    db.connection = mock.MagicMock()
+    db._session = None
+    db._clients = {}
+    assert db.session() is db.connection.session
+    assert db.aws_client("athena") is db.connection.client
+    assert db.aws_client("s3") is db.connection.session.client.return_value
+
+    # And only look up the workgroup once
+    db.connection._client.get_work_group.return_value = {
+        "WorkGroup": {"Configuration": {"ResultConfiguration": {"OutputLocation": "s3://b/"}}}
+    }
+    assert db._get_result_config() == {"OutputLocation": "s3://b/"}
+    assert db._get_result_config() == {"OutputLocation": "s3://b/"}
+    assert db.connection._client.get_work_group.call_count == 1
@@ -3,16 +3,15 @@
 This is intended to exercise edge cases not covered via more integrated testing"""
 
 import datetime
-import io
 import os
 import pathlib
 from contextlib import nullcontext as does_not_raise
 from unittest import mock
 
+import botocore
 import duckdb
 import pandas
 import pyarrow
-import pyathena
 import pytest
 
 from cumulus_library import databases, errors
@@ -237,21 +236,24 @@ def test_upload_file_athena(mock_botocore, args, sse, keycount, expected, raises
     }
     mock_clientobj = mock_botocore.ClientCreator.return_value.create_client.return_value
     mock_clientobj.get_work_group.return_value = mock_data
-    mock_clientobj.list_objects_v2.return_value = {"KeyCount": keycount}
     if keycount > 0:
-        mock_clientobj.get_object.return_value = {"Body": io.BytesIO(args["file"].read_bytes())}
+        mock_clientobj.head_object.return_value = {}
+    else:
+        mock_clientobj.head_object.side_effect = botocore.exceptions.ClientError(
+            {"Error": {"Code": "404"}}, "HeadObject"
+        )
     db = databases.AthenaDatabaseBackend(**ATHENA_KWARGS)
     db.connect()
     with raises:
         location = db.upload_file(**args)
         assert location == expected
         if keycount == 0 or args["force_upload"]:
-            assert mock_clientobj.put_object.called
-            kwargs = mock_clientobj.put_object.call_args_list[0][1]
+            assert mock_clientobj.upload_file.called
+            key = mock_clientobj.upload_file.call_args[0][2]
             if args["remote_filename"]:
-                assert kwargs["Key"].endswith(args["remote_filename"])
+                assert key.endswith(args["remote_filename"])
             else:
-                assert kwargs["Key"].endswith(args["file"].name)
+                assert key.endswith(args["file"].name)
 
 
 @mock.patch("pyathena.connect")
@@ -291,6 +293,17 @@ def test_athena_pandas_cursor(mock_pyathena):
     )
 
 
+@mock.patch("pyathena.connect")
+def test_athena_arrow(mock_pyathena):
+    table = pyarrow.table({"A": [1, 3, 5], "B": [2, 4, 6]})
+    mock_pyathena.return_value.cursor.return_value.execute.return_value.as_arrow.return_value = (
+        table
+    )
+    db = databases.AthenaDatabaseBackend(**ATHENA_KWARGS)
+    db.connect()
+    assert db.execute_as_arrow("ignored query") == table
+
+
 @mock.patch("pyathena.connect")
 def test_athena_parser(mock_pyathena):
     db = databases.AthenaDatabaseBackend(**ATHENA_KWARGS)
@@ -336,6 +349,24 @@ def test_duckdb_pandas(mock_db):
     assert all_cols == chunk_cols
 
 
+def test_duckdb_arrow(mock_db):
+    query = "SELECT * FROM condition"
+    assert mock_db.execute_as_arrow(query).num_rows == 20
+
+    batches = mock_db.iter_record_batches(query, batch_size=7)
+    first = next(batches)
+    # Queries on the main cursor shouldn't break the stream
+    assert mock_db.cursor().execute("SELECT 1").fetchall() == [(1,)]
+    rest = list(batches)
+    assert first.num_rows + sum(batch.num_rows for batch in rest) == 20
+    assert max(batch.num_rows for batch in [first, *rest]) <= 7
+
+    # Empty results still come with a schema
+    (empty,) = mock_db.iter_record_batches(f"{query} WHERE false")
+    assert empty.num_rows == 0
+    assert "id" in empty.schema.names
+
+
 ### duckdb user defined functions
 
 
@@ -416,18 +447,22 @@ def test_duckdb_operational_errors(mock_cursor, mock_db, error, raises):
         sql_utils.validate_schema(mock_db, {"table": {"foo": "bar"}})
 
 
-@mock.patch("cumulus_library.databases.athena.AthenaDatabaseBackend.cursor")
-@mock.patch("botocore.client")
 @pytest.mark.parametrize(
     "error,raises",
     [
-        (pyathena.OperationalError, pytest.raises(ValueError)),
+        (
+            botocore.exceptions.ClientError(
+                {"Error": {"Code": "EntityNotFoundException"}}, "GetTables"
+            ),
+            pytest.raises(ValueError),
+        ),
         (errors.CumulusLibraryError, pytest.raises(errors.CumulusLibraryError)),
     ],
 )
-def test_athena_operational_errors(mock_botocore, mock_cursor, error, raises):
+def test_athena_operational_errors(error, raises):
     db = databases.AthenaDatabaseBackend(**ATHENA_KWARGS)
-    mock_cursor.return_value.execute.return_value.fetchall.side_effect = error
+    db._clients["glue"] = mock.MagicMock()
+    db.glue_client().get_paginator.return_value.paginate.side_effect = error
     with raises:
         sql_utils.validate_schema(db, {"table": {"foo": "bar"}})
 
@@ -463,3 +498,25 @@ def test_parallel_errors_athena(mock_result_set, mock_botocore, mock_cursor):
             progress_bar=mock.MagicMock(),
             task=mock.MagicMock(),
         )
+
+
+@pytest.mark.parametrize(
+    "queries,expected",
+    [
+        (["SELECT * FROM foo", "INSERT INTO foo VALUES (1)"], set()),
+        (["CREATE TABLE foo AS SELECT 1"], {("main", "foo")}),
+        (
+            ['-- comment\n/* block */ CREATE OR REPLACE VIEW "other"."Foo" AS SELECT 1'],
+            {("other", "foo")},
+        ),
+        (["CREATE TABLE IF NOT EXISTS `foo` (id varchar)"], {("main", "foo")}),
+        (
+            ["DROP TABLE IF EXISTS main.foo", "ALTER TABLE bar ADD COLUMNS (x string)"],
+            {("main", "foo"), ("main", "bar")},
+        ),
+        (["CREATE TABLE foo AS SELECT 1", "ALTER TABLE foo RENAME TO bar"], None),
+        (["CREATE SCHEMA foo"], None),
+    ],
+)
+def test_get_catalog_changes(queries, expected):
+    assert databases.get_catalog_changes(queries, "main") == expected
@@ -3,13 +3,17 @@
 import glob
 import json
 import os
+import re
 import tempfile
-from datetime import datetime
+from datetime import UTC, datetime
 from pathlib import Path
+from unittest import mock
 
+import cumulus_fhir_support
 import pytest
 
 from cumulus_library import cli, databases, errors
+from cumulus_library.databases import duckdb
 from cumulus_library.template_sql import base_templates
 
 
@@ -64,6 +68,180 @@ def test_duckdb_from_iso8601_timestamp(timestamp, expected):
     assert parsed == expected
 
 
+# These are the python UDFs we used to register for Athena compatibility, kept
+# around as a reference for the SQL macros that replaced them.
+
+
+def _python_array_join(value, delimiter):
+    if delimiter is None or delimiter == "None":
+        delimiter = ""
+    return delimiter.join(v for v in value if v is not None)
+
+
+def _python_regexp_like(string, pattern):
+    return re.search(pattern, string) is not None
+
+
+def _python_from_iso8601_timestamp(value):
+    if len(value) < 10:
+        pieces = value.split("-")
+        if len(pieces) == 1:
+            return datetime(int(pieces[0]), 1, 1)
+        return datetime(int(pieces[0]), int(pieces[1]), 1)
+    dt = datetime.fromisoformat(value)
+    if not dt.tzinfo:
+        return dt
+    return dt.astimezone(UTC).replace(tzinfo=None)
+
+
+@pytest.mark.parametrize("timezone", ["UTC", "America/New_York", "Asia/Kolkata"])
+def test_duckdb_compat_macros_match_python(timezone):
+    db = databases.DuckDatabaseBackend(":memory:")
+    db.connect()
+    cursor = db.cursor()
+    # Values with no offset should be read as UTC, whatever the local timezone is
+    cursor.execute(f"SET TimeZone = '{timezone}'")
+
+    timestamps = [
+        "1970",
+        "1980-12",
+        "2023-01-16",
+        "2023-01-16T07:55",
+        "2023-01-16T07:55:25",
+        "2023-01-16 07:55:25",
+        "2023-01-16T07:55:25Z",
+        "2023-01-16T07:55:25.123456Z",
+        "2023-01-16T07:55:25-05:00",
+        "2023-01-16T23:55:25-05:00",
+        "2023-01-16T07:55:25.123+05:30",
+        "2023-01-16T07:55:25+0530",
+        "2023-01-16T07:55:25-05",
+        "2020-02-29T23:59:59.999-12:00",
+    ]
+    cursor.execute("CREATE TABLE timestamps AS SELECT unnest(?::VARCHAR[]) AS value", [timestamps])
+    parsed = dict(
+        cursor.execute("SELECT value, from_iso8601_timestamp(value) FROM timestamps").fetchall()
+    )
+    assert parsed == {value: _python_from_iso8601_timestamp(value) for value in timestamps}
+
+    for value, delimiter in [
+        (["foo", "bar"], ","),
+        (["foo", None, "bar"], ", "),
+        (["foo", "bar"], "None"),
+        (["foo", "bar"], None),
+        ([], ","),
+        ([None], ","),
+    ]:
+        joined = cursor.execute("SELECT array_join(?::VARCHAR[], ?)", [value, delimiter])
+        assert joined.fetchone()[0] == _python_array_join(value, delimiter)
+
+    for string, pattern in [
+        ("foo", "foo"),
+        ("foo", "bar"),
+        ("foobar", "o+b"),
+        ("foobar", "^bar"),
+        ("http://loinc.org", "loinc"),
+        ("4548-4", r"^\d{4}-\d$"),
+    ]:
+        matched = cursor.execute("SELECT regexp_like(?, ?)", [string, pattern])
+        assert matched.fetchone()[0] == _python_regexp_like(string, pattern)
+
+    for func in ("array_join(NULL, ',')", "regexp_like(NULL, 'a')", "from_iso8601_timestamp(NULL)"):
+        assert cursor.execute(f"SELECT {func}").fetchone()[0] is None
+
+
+def test_duckdb_compat_macros_on_parallel_cursor(tmp_path):
+    db, _ = databases.create_db_backend(
+        {
+            "db_type": "duckdb",
+            "database": ":memory:",
+            "load_ndjson_dir": tmp_path,
+        }
+    )
+    cursor = db.parallel_cursor()
+    assert cursor.execute(
+        "SELECT from_iso8601_timestamp('2019-10'), array_join(['a', 'b'], '-'), "
+        "regexp_like('foo', 'o'), to_utf8('foo')"
+    ).fetchone() == (datetime(2019, 10, 1), "a-b", True, "foo")
+
+
+def test_duckdb_parallel_execute_reuses_cursors(tmp_path):
+    db, _ = databases.create_db_backend(
+        {
+            "db_type": "duckdb",
+            "database": ":memory:",
+            "load_ndjson_dir": tmp_path,
+        }
+    )
+    db.max_concurrent = 2
+    with (
+        mock.patch.object(db, "get_cached_datasets", wraps=db.get_cached_datasets) as mock_cache,
+        mock.patch.object(db, "parallel_cursor", wraps=db.parallel_cursor) as mock_cursor,
+    ):
+        for batch in range(3):
+            results = db.parallel_execute(
+                [f"SELECT {batch}{i} AS x" for i in range(4)]
+                + [f"CREATE TABLE batch_{batch} AS SELECT {batch} AS x"],
+                verbose=False,
+                progress_bar=mock.MagicMock(),
+                task=mock.MagicMock(),
+                result_policy=databases.ResultPolicy.FETCH,
+            )
+            assert [r.rows for r in results[:4]] == [[(int(f"{batch}{i}"),)] for i in range(4)]
+    # The datasets were loaded by insert_tables, and each worker's cursor is kept
+    assert mock_cache.call_count == 0
+    assert mock_cursor.call_count <= 2
+    # Tables made by pooled cursors are visible from the main connection
+    assert db.cursor().execute("SELECT x FROM batch_2").fetchall() == [(2,)]
+
+    # Inserting tables again closes the pooled cursors, rather than leaking them
+    pooled = []
+    while not db._cursor_pool.empty():
+        pooled.append(db._cursor_pool.get_nowait())
+    assert pooled
+    for cursor in pooled:
+        db._cursor_pool.put(cursor)
+    db.insert_tables({})
+    assert db._cursor_pool.empty()
+    for cursor in pooled:
+        with pytest.raises(duckdb.duckdb.ConnectionException):
+            cursor.execute("SELECT 1")
+
+
+def test_duckdb_parallel_execute_result_policies(tmp_path):
+    db, _ = databases.create_db_backend(
+        {
+            "db_type": "duckdb",
+            "database": ":memory:",
+            "load_ndjson_dir": tmp_path,
+        }
+    )
+    db.max_concurrent = 2
+    queries = ["SELECT range AS x FROM range(5000)", "SELECT 1 AS y"]
+    kwargs = {"verbose": False, "progress_bar": mock.MagicMock(), "task": mock.MagicMock()}
+
+    # Rows aren't fetched unless asked for
+    results = db.parallel_execute(queries, **kwargs)
+    assert [(r.columns, r.rows) for r in results] == [(["x"], []), (["y"], [])]
+    results = db.parallel_write(queries, **kwargs)
+    assert [r.rows for r in results] == [[], []]
+
+    results = db.parallel_execute(
+        queries, result_policy=databases.ResultPolicy.FETCH, max_rows=3, **kwargs
+    )
+    assert [r.rows for r in results] == [[(0,), (1,), (2,)], [(1,)]]
+
+    with mock.patch.object(db, "parallel_cursor", wraps=db.parallel_cursor) as mock_cursor:
+        results = db.parallel_execute(
+            queries, result_policy=databases.ResultPolicy.STREAM, **kwargs
+        )
+        assert [x for (x,) in results[0].rows] == list(range(5000))
+        assert list(results[1].rows) == [(1,)]
+        # Both streams have been read to the end, so their cursors are back in the pool
+        db.parallel_execute(queries, result_policy=databases.ResultPolicy.DISCARD, **kwargs)
+    assert mock_cursor.call_count == 0
+
+
 def test_duckdb_load_ndjson_dir(tmp_path):
     filenames = {
         "blarg.ndjson": True,
@@ -101,6 +279,87 @@ def test_duckdb_load_ndjson_dir(tmp_path):
     assert len(tables) == 19
 
 
+def test_duckdb_ndjson_snapshot(tmp_path):
+    ndjson_dir = tmp_path / "ndjson"
+    for resource in ("Patient", "Condition"):
+        (ndjson_dir / resource.lower()).mkdir(parents=True)
+        with open(ndjson_dir / f"{resource.lower()}/1.ndjson", "w", encoding="utf8") as f:
+            f.write(f'{{"id":"{resource}1", "resourceType": "{resource}"}}\n')
+    args = {
+        "db_type": "duckdb",
+        "database": f"{tmp_path}/duck.db",
+        "load_ndjson_dir": ndjson_dir,
+        "ndjson_snapshot": True,
+    }
+
+    db, _ = databases.create_db_backend(args)
+    tables = dict(
+        db.cursor()
+        .execute(
+            "SELECT table_name, table_type FROM information_schema.tables "
+            "WHERE table_name IN ('patient', 'condition')"
+        )
+        .fetchall()
+    )
+    assert tables == {"patient": "BASE TABLE", "condition": "BASE TABLE"}
+    # Mark the condition snapshot, so we can see whether it gets rebuilt
+    db.cursor().execute("INSERT INTO condition (id) VALUES ('marker')")
+    db.close()
+
+    # Only tables whose files changed should be copied again
+    with open(ndjson_dir / "patient/2.ndjson", "w", encoding="utf8") as f:
+        f.write('{"id":"Patient2", "resourceType": "Patient"}\n')
+    db, _ = databases.create_db_backend(args)
+    cursor = db.parallel_cursor()
+    assert cursor.execute("SELECT id FROM patient ORDER BY id").fetchall() == [
+        ("Patient1",),
+        ("Patient2",),
+    ]
+    assert cursor.execute("SELECT id FROM condition ORDER BY id").fetchall() == [
+        ("Condition1",),
+        ("marker",),
+    ]
+    db.close()
+
+
+def test_read_ndjson_dir_shape_cache(tmp_path):
+    rows = [
+        {"resourceType": "Condition", "id": "1", "code": {"coding": [{"code": "a"}]}},
+        {
+            "resourceType": "Condition",
+            "id": "2",
+            "contained": [{"resourceType": "Medication", "id": "m", "status": "active"}],
+        },
+        {"resourceType": "Condition", "id": "3", "onsetPeriod": {"start": "2020"}},
+        {"resourceType": "Condition", "id": "4", "note": [{"text": "hi"}]},
+    ]
+    os.mkdir(tmp_path / "condition")
+    for row in rows[:3]:
+        with open(tmp_path / f"condition/{row['id']}.ndjson", "w", encoding="utf8") as f:
+            f.write(json.dumps(row) + "\n")
+
+    # Per-file scans (done in a process pool here) should give the same schema
+    # as scanning every row together
+    shape_cache = {}
+    tables = databases.read_ndjson_dir(tmp_path, shape_cache=shape_cache)
+    assert tables["condition"].schema == cumulus_fhir_support.pyarrow_schema_from_rows(
+        "Condition", rows[:3]
+    )
+    assert len(shape_cache) == 3
+
+    # Adding a file should only scan that file
+    with open(tmp_path / "condition/4.ndjson", "w", encoding="utf8") as f:
+        f.write(json.dumps(rows[3]) + "\n")
+    with mock.patch(
+        "cumulus_library.databases.utils._get_file_shape", wraps=databases.utils._get_file_shape
+    ) as mock_scan:
+        tables = databases.read_ndjson_dir(tmp_path, shape_cache=shape_cache)
+    assert mock_scan.call_args_list == [mock.call(str(tmp_path / "condition/4.ndjson"))]
+    assert tables["condition"].schema == cumulus_fhir_support.pyarrow_schema_from_rows(
+        "Condition", rows
+    )
+
+
 def test_duckdb_load_empty_dir(tmp_path):
     db, _ = databases.create_db_backend(
         {
@@ -114,6 +373,62 @@ def test_duckdb_load_empty_dir(tmp_path):
     assert len(found_ids) == 0
 
 
+@mock.patch("cumulus_library.databases.duckdb._available_cores", new=lambda: 16)
+@mock.patch("cumulus_library.databases.duckdb._available_memory", new=lambda: 8 * 2**30)
+def test_duckdb_resource_profile(tmp_path):
+    profile = duckdb.ResourceProfile.detect(f"{tmp_path}/duck.db")
+    assert profile == duckdb.ResourceProfile(
+        threads=16,
+        max_concurrent=20,
+        memory_limit="6144MB",
+        temp_directory=f"{tmp_path}/duck.db.tmp",
+    )
+    assert duckdb.ResourceProfile.detect(":memory:").temp_directory.endswith("duckdb_spill")
+
+    # User settings win (and the threads we're given don't change queries in flight)
+    profile = duckdb.ResourceProfile.detect(
+        f"{tmp_path}/duck.db", threads="4", memory_limit="1GB", temp_directory=str(tmp_path)
+    )
+    assert (profile.threads, profile.max_concurrent) == (4, 20)
+    assert (profile.memory_limit, profile.temp_directory) == ("1GB", str(tmp_path))
+    assert duckdb.ResourceProfile.detect(":memory:", max_concurrent="3").max_concurrent == 3
+
+    # And the settings make it into the database
+    db, _ = databases.create_db_backend(
+        {
+            "db_type": "duckdb",
+            "database": f"{tmp_path}/duck.db",
+            "duckdb_threads": 3,
+            "duckdb_memory_limit": "1GB",
+            "duckdb_temp_dir": str(tmp_path / "spill"),
+        }
+    )
+    assert db.max_concurrent == 20
+    settings = dict(
+        db.cursor()
+        .execute(
+            "SELECT name, value FROM duckdb_settings() WHERE name IN "
+            "('threads', 'temp_directory', 'preserve_insertion_order')"
+        )
+        .fetchall()
+    )
+    assert settings == {
+        "threads": "3",
+        "temp_directory": str(tmp_path / "spill"),
+        "preserve_insertion_order": "false",
+    }
+
+
+@mock.patch("pathlib.Path.read_text")
+def test_duckdb_cgroup_limits(mock_read):
+    mock_read.side_effect = lambda: "200000 100000"
+    assert duckdb._available_cores() <= 2
+    mock_read.side_effect = lambda: "max 100000"
+    assert duckdb._read_cgroup_limit("cpu.max") is None
+    mock_read.side_effect = lambda: "1073741824"
+    assert duckdb._available_memory() == 2**30
+
+
 def test_duckdb_table_schema():
     """Verify we can detect schemas correctly, even for nested camel case fields"""
     db = databases.DuckDatabaseBackend(":memory:")
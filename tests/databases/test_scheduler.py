@@ -0,0 +1,141 @@
+"""tests for dependency-aware query scheduling"""
+
+import threading
+from unittest import mock
+
+import pytest
+
+from cumulus_library import base_utils
+from cumulus_library.databases import base, scheduler
+
+
+def test_scheduler_runs_dependencies_in_order(mock_db):
+    progress_bar = base_utils.get_progress_bar()
+    query_scheduler = scheduler.QueryScheduler(
+        mock_db, progress_bar=progress_bar, result_policy=base.ResultPolicy.FETCH
+    )
+    task = progress_bar.add_task("test")
+    query_scheduler.submit("CREATE TABLE a AS SELECT 1 AS id", writes={"a"}, task=task)
+    query_scheduler.submit("CREATE TABLE b AS SELECT 2 AS id", writes={"b"}, task=task)
+    query_scheduler.submit(
+        "CREATE TABLE c AS SELECT * FROM a UNION ALL SELECT * FROM b",
+        writes={"c"},
+        reads={"a", "b"},
+        task=task,
+    )
+    query_scheduler.submit("SELECT id FROM c ORDER BY id", writes=set(), reads={"c"}, task=task)
+    results = query_scheduler.wait()
+    assert len(results) == 4
+    assert results[0].query == "CREATE TABLE a AS SELECT 1 AS id"
+    assert results[3].columns == ["id"]
+    assert results[3].rows == [(1,), (2,)]
+
+
+def test_scheduler_result_policy(mock_db):
+    progress_bar = base_utils.get_progress_bar()
+    task = progress_bar.add_task("test")
+    query_scheduler = scheduler.QueryScheduler(mock_db, progress_bar=progress_bar)
+    query_scheduler.submit("SELECT 1 AS id", writes=set(), task=task)
+    assert query_scheduler.wait()[0].rows == []
+
+    query_scheduler = scheduler.QueryScheduler(
+        mock_db, progress_bar=progress_bar, result_policy=base.ResultPolicy.FETCH, max_rows=2
+    )
+    query_scheduler.submit("SELECT range AS id FROM range(5)", writes=set(), task=task)
+    assert query_scheduler.wait()[0].rows == [(0,), (1,)]
+
+    with pytest.raises(ValueError):
+        scheduler.QueryScheduler(
+            mock_db, progress_bar=progress_bar, result_policy=base.ResultPolicy.STREAM
+        )
+
+
+def test_scheduler_overlaps_independent_queries():
+    # b should not have to wait for a, since they share no tables
+    started = threading.Event()
+    release = threading.Event()
+    order = []
+
+    class FakeCursor:
+        description = None
+
+        def execute(self, query):
+            if query == "a":
+                started.set()
+                assert release.wait(timeout=5)
+            elif query == "b":
+                assert started.wait(timeout=5)
+                release.set()
+            order.append(query)
+
+    db = mock.MagicMock(max_concurrent=2, db_type="duckdb")
+    db.max_query_slots.return_value = 2
+    db.parallel_cursor.side_effect = FakeCursor
+    db.execute_with_stats.side_effect = lambda cursor, query, **kwargs: cursor.execute(query)
+    progress_bar = base_utils.get_progress_bar()
+    query_scheduler = scheduler.QueryScheduler(db, progress_bar=progress_bar)
+    task = progress_bar.add_task("test")
+    query_scheduler.submit("a", writes={"a"}, task=task)
+    query_scheduler.submit("b", writes={"b"}, task=task)
+    query_scheduler.submit("c", writes={"c"}, reads={"a"}, task=task)
+    query_scheduler.wait()
+    assert order == ["b", "a", "c"]
+
+
+def test_scheduler_barrier():
+    order = []
+
+    class FakeCursor:
+        description = None
+
+        def execute(self, query):
+            order.append(query)
+
+    db = mock.MagicMock(max_concurrent=1, db_type="duckdb")
+    db.max_query_slots.return_value = 1
+    db.parallel_cursor.side_effect = FakeCursor
+    db.execute_with_stats.side_effect = lambda cursor, query, **kwargs: cursor.execute(query)
+    progress_bar = base_utils.get_progress_bar()
+    query_scheduler = scheduler.QueryScheduler(db, progress_bar=progress_bar)
+    task = progress_bar.add_task("test")
+    query_scheduler.submit("a", writes={"a"}, task=task)
+    query_scheduler.submit("barrier", writes=None, task=task)
+    query_scheduler.submit("b", writes={"b"}, task=task)
+    query_scheduler.wait()
+    assert order == ["a", "barrier", "b"]
+
+
+def test_scheduler_skips_dependents_of_failures(mock_db):
+    progress_bar = base_utils.get_progress_bar()
+    query_scheduler = scheduler.QueryScheduler(mock_db, progress_bar=progress_bar)
+    task = progress_bar.add_task("test")
+    query_scheduler.submit("CREATE TABLE a AS SELECT * FROM missing_table", writes={"a"}, task=task)
+    query_scheduler.submit(
+        "CREATE TABLE b AS SELECT * FROM a", writes={"b"}, reads={"a"}, task=task
+    )
+    query_scheduler.submit("CREATE TABLE c AS SELECT 1 AS id", writes={"c"}, task=task)
+    with pytest.raises(SystemExit):
+        query_scheduler.wait()
+    tables = mock_db.cursor().execute("SELECT table_name FROM information_schema.tables").fetchall()
+    assert ("c",) in tables
+    assert ("b",) not in tables
+
+
+def test_scheduler_takes_query_slots(mock_db):
+    progress_bar = base_utils.get_progress_bar()
+    task = progress_bar.add_task("test")
+    with (
+        mock.patch.object(mock_db, "acquire_query_slot") as mock_acquire,
+        mock.patch.object(mock_db, "release_query_slot") as mock_release,
+    ):
+        query_scheduler = scheduler.QueryScheduler(mock_db, progress_bar=progress_bar)
+        query_scheduler.submit("CREATE TABLE a AS SELECT 1 AS id", writes={"a"}, task=task)
+        query_scheduler.submit("CREATE TABLE b AS SELECT * FROM missing", writes={"b"}, task=task)
+        with pytest.raises(SystemExit):
+            query_scheduler.wait()
+    # Each query holds a slot while it runs, and hands back how it went
+    assert mock_acquire.call_count == 2
+    releases = sorted(mock_release.call_args_list, key=lambda call: "error" in call.kwargs)
+    assert len(releases) == 2
+    assert len(releases[0].args) == 1
+    assert "missing" in str(releases[1].kwargs["error"])
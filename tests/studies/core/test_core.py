@@ -264,7 +264,7 @@ def test_core_build_source(tmp_path):
     testbed = testbed_utils.LocalTestbed(tmp_path)
     # Just add bare resources, with minimal data
     db = testbed.build()
-    log = db.connection.sql("SELECT * FROM core__lib_build_source").fetchall()
+    log = db.connection.sql("SELECT stage, name, type FROM core__lib_build_source").fetchall()
     expected = [
         ("default", "core__meta_version", "TABLE"),
         ("default", "core__fhir_act_encounter_code_v3", "TABLE"),
@@ -360,3 +360,5 @@ def test_core_build_source(tmp_path):
         assert row in log
     for row in log:
         assert row in expected
+    fingerprints = db.connection.sql("SELECT fingerprint FROM core__lib_build_source").fetchall()
+    assert all(row[0] for row in fingerprints)
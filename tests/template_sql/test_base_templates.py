@@ -606,6 +606,57 @@ def test_ctas_from_parquet(expected, db_type, schema, table, cols, remote_types)
     assert query == expected
 
 
+@pytest.mark.parametrize(
+    "db_type,table_layout,expected",
+    [
+        ("duckdb", {"bucketed_by": ["subject_ref"], "bucket_count": 16}, ""),
+        ("athena", None, ""),
+        ("athena", {}, ""),
+        (
+            "athena",
+            {
+                "bucket_count": 16,
+                "bucketed_by": ["subject_ref"],
+                "partitioned_by": ["year", "month"],
+                "write_compression": "ZSTD",
+                "format": "PARQUET",
+            },
+            """WITH (
+    format = 'PARQUET',
+    write_compression = 'ZSTD',
+    partitioned_by = ARRAY['year', 'month'],
+    bucketed_by = ARRAY['subject_ref'],
+    bucket_count = 16
+)""",
+        ),
+    ],
+)
+def test_table_properties(db_type, table_layout, expected):
+    db_config.db_type = db_type
+    assert base_templates.get_table_properties(table_layout) == expected
+
+
+def test_ctas_query_with_table_layout():
+    db_config.db_type = "athena"
+    expected = """CREATE TABLE "test_schema"."test_table" WITH (
+    write_compression = 'ZSTD'
+) AS (
+    SELECT * FROM (
+        VALUES
+        (cast('foo' AS varchar))
+    )
+        AS t ("a")
+);"""
+    query = base_templates.get_ctas_query(
+        schema_name="test_schema",
+        table_name="test_table",
+        dataset=[["foo"]],
+        table_cols=["a"],
+        table_layout={"write_compression": "ZSTD"},
+    )
+    assert query == expected
+
+
 def test_ctas_query_creation():
     expected = """CREATE TABLE "test_schema"."test_table" AS (
     SELECT * FROM (
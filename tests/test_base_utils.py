@@ -1,9 +1,11 @@
 import zipfile
+from unittest import mock
 
 import numpy
 import pandas
 import pyarrow
 import pytest
+import sqlglot
 import time_machine
 
 from cumulus_library import base_utils, errors
@@ -127,3 +129,44 @@ def test_zip_dir(tmp_path, subdirs, csv, archive_path, expected):
     base_utils.zip_dir(data_path, tmp_path, "data")
     with zipfile.ZipFile(tmp_path / "data/data.zip") as z:
         assert z.namelist() == ["a.parquet", "subdir/b.parquet"]
+
+
+@pytest.mark.parametrize(
+    "query,writes,reads",
+    [
+        (
+            "CREATE TABLE core__a AS WITH b AS (SELECT * FROM core__b) "
+            "SELECT * FROM b JOIN main.condition AS c ON b.id = c.id",
+            {"core__a"},
+            {"core__b", "condition"},
+        ),
+        ("CREATE VIEW core__a AS SELECT * FROM other.foo", {"core__a"}, {"other.foo"}),
+        ("INSERT INTO core__a (id) VALUES ('1')", {"core__a"}, set()),
+        ("DROP TABLE IF EXISTS core__a", {"core__a"}, set()),
+        ("SELECT * FROM core__a", set(), {"core__a"}),
+        ("CREATE SCHEMA foo", None, set()),
+        ("this is not ) sql", None, set()),
+    ],
+)
+def test_get_query_dependencies(mock_db_config, query, writes, reads):
+    assert base_utils.get_query_dependencies(mock_db_config, query) == (writes, reads)
+
+
+def test_parse_query(mock_db_config):
+    base_utils.clear_parsed_queries()
+    with mock.patch("sqlglot.parse_one", wraps=sqlglot.parse_one) as mock_parse:
+        parsed = base_utils.parse_query(mock_db_config, "CREATE VIEW core__a AS SELECT 1")
+        assert parsed.table == "core__a"
+        assert parsed.kind == "VIEW"
+        assert base_utils.parse_query(mock_db_config, "CREATE VIEW core__a AS SELECT 1") is parsed
+        assert mock_parse.call_count == 1
+
+        invalid = base_utils.parse_query(mock_db_config, "this is not ) sql")
+        assert invalid.expression is None
+        assert invalid.kind is None
+        base_utils.parse_query(mock_db_config, "this is not ) sql")
+        assert mock_parse.call_count == 2
+
+        base_utils.clear_parsed_queries()
+        base_utils.parse_query(mock_db_config, "CREATE VIEW core__a AS SELECT 1")
+        assert mock_parse.call_count == 3
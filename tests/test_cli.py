@@ -32,7 +32,7 @@ from tests import conftest, nlp_utils
 from tests.conftest import create_protected_tables, duckdb_args
 from tests.nlp_utils import add_dxr
 
-FHIR_RESOURCE_TABLE_COUNT = 22
+FHIR_RESOURCE_TABLE_COUNT = 23
 
 
 @contextmanager
@@ -331,7 +331,7 @@ def test_clean(tmp_path, args, expected, raises):
         (
             ["build", "-t", "core"],
             ["export", "-t", "core"],
-            92,
+            93,
             does_not_raise(),
             [],
         ),
@@ -346,7 +346,7 @@ def test_clean(tmp_path, args, expected, raises):
                 "tests/test_data/",
             ],
             ["export", "-t", "study_valid", "-s", "tests/test_data/"],
-            5,
+            6,
             does_not_raise(),
             [
                 "study_valid__table",
@@ -364,7 +364,7 @@ def test_clean(tmp_path, args, expected, raises):
                 "tests/test_data/",
             ],
             ["export", "-t", "study_valid", "-s", "tests/test_data/"],
-            5,
+            6,
             does_not_raise(),
             [
                 "study_valid__table",
@@ -383,7 +383,7 @@ def test_clean(tmp_path, args, expected, raises):
                 "--statistics",
             ],
             ["export", "-t", "study_valid", "-s", "tests/test_data/study_valid/"],
-            5,
+            6,
             does_not_raise(),
             [
                 "study_valid__table",
@@ -400,7 +400,7 @@ def test_clean(tmp_path, args, expected, raises):
                 "--statistics",
             ],
             ["export", "-t", "study_valid", "-s", "tests/test_data/study_valid/"],
-            5,
+            6,
             does_not_raise(),
             [
                 "study_valid__table",
@@ -434,7 +434,7 @@ def test_clean(tmp_path, args, expected, raises):
                 "test2",
             ],
             ["export", "-t", "study_valid_parallel", "-s", "tests/test_data/study_valid_parallel/"],
-            6,
+            7,
             does_not_raise(),
             [
                 "study_valid_parallel__table",
@@ -502,7 +502,7 @@ def test_clean(tmp_path, args, expected, raises):
                 "-s",
                 "tests/test_data/study_dedicated_schema/",
             ],
-            6,
+            7,
             does_not_raise(),
             ["study_dedicated_schema__table_raw_sql"],
         ),
@@ -521,7 +521,7 @@ def test_clean(tmp_path, args, expected, raises):
                 "-s",
                 "tests/test_data/study_valid_all_exports/",
             ],
-            6,
+            7,
             does_not_raise(),
             [
                 "study_valid_all_exports__tablecount",
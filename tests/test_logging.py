@@ -17,6 +17,7 @@ from cumulus_library import (
     log_utils,
     study_manifest,
 )
+from cumulus_library.actions import builder
 from cumulus_library.template_sql import base_templates, sql_utils
 
 
@@ -245,3 +246,42 @@ def test_statistics(mock_db, schema, study, table_type, table_name, view_type, r
         )
         log = cursor.execute(f"select * from {schema}.{table_name}").fetchone()
         assert log == expects
+
+
+def test_query_stats(mock_db_config):
+    manifest = study_manifest.StudyManifest("./tests/test_data/study_valid/")
+    builder.run_protected_table_builder(mock_db_config, manifest)
+    mock_db_config.db.pop_query_stats()
+    cursor = mock_db_config.db.cursor()
+    mock_db_config.db.execute_with_stats(
+        cursor, "CREATE TABLE study_valid__stats AS SELECT * FROM range(5)"
+    )
+    mock_db_config.db.execute_with_stats(cursor, "SELECT * FROM study_valid__stats")
+    log_utils.log_query_stats(config=mock_db_config, manifest=manifest)
+    assert mock_db_config.db.query_stats == []
+    rows = cursor.execute(
+        "SELECT study_name, table_name, statement, row_count, wall_time >= 0, engine_time, "
+        "reads FROM study_valid__lib_query_stats ORDER BY statement"
+    ).fetchall()
+    assert rows == [
+        ("study_valid", "study_valid__stats", "CREATE", 5, True, None, None),
+        ("study_valid", "study_valid__stats", "SELECT", None, True, None, "study_valid__stats"),
+    ]
+
+
+def test_query_stats_athena():
+    db = databases.AthenaDatabaseBackend(
+        region="us-east-1", work_group="wg", profile="test", schema_name="db"
+    )
+    cursor = mock.MagicMock()
+    cursor.engine_execution_time_in_millis = 1500
+    cursor.query_queue_time_in_millis = 250
+    cursor.data_scanned_in_bytes = 1024
+    cursor.rowcount = -1
+    db.execute_with_stats(cursor, "SELECT * FROM study_valid__stats")
+    stats = db.pop_query_stats()
+    assert len(stats) == 1
+    assert stats[0].engine_time == 1.5
+    assert stats[0].queue_wait == 0.25
+    assert stats[0].data_scanned == 1024
+    assert stats[0].row_count is None
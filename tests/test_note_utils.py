@@ -3,6 +3,7 @@ import json
 import os
 from unittest import mock
 
+import pyarrow
 import pytest
 
 from cumulus_library import (
@@ -56,11 +57,13 @@ def test_note_source_phi_dir(tmp_path):
 
 
 def test_get_table_refs():
-    cursor = mock.MagicMock()
-    cursor.execute.return_value.description = [["documentreference_id"]]
-    cursor.execute.return_value.fetchall.return_value = [("a",), ("b",)]
+    db = mock.MagicMock()
+    db.iter_record_batches.return_value = [
+        pyarrow.RecordBatch.from_pydict({"documentreference_id": ["a"]}),
+        pyarrow.RecordBatch.from_pydict({"documentreference_id": ["b", None]}),
+    ]
 
-    refs = note_utils.get_table_refs(cursor, "my_table")
+    refs = note_utils.get_table_refs(db, "my_table")
     assert list(refs) == ["DocumentReference/a", "DocumentReference/b"]
 
 
@@ -263,6 +263,54 @@ def test_formatted_study_prefix(tmp_path):
     assert manifest.get_formatted_study_prefix() == "bar."
 
 
+@pytest.mark.parametrize(
+    "table_layout,table,expected,raises",
+    [
+        (None, "foo__a", {}, does_not_raise()),
+        (
+            {
+                "write_compression": "ZSTD",
+                "tables": {"foo__a": {"bucketed_by": ["id"], "bucket_count": 4}},
+            },
+            "foo__a",
+            {"write_compression": "ZSTD", "bucketed_by": ["id"], "bucket_count": 4},
+            does_not_raise(),
+        ),
+        (
+            {"write_compression": "ZSTD", "tables": {"foo__a": {"write_compression": "SNAPPY"}}},
+            "FOO__A",
+            {"write_compression": "SNAPPY"},
+            does_not_raise(),
+        ),
+        (
+            {"bucketed_by": ["id"], "bucket_count": 4, "tables": {"foo__a": {"bucketed_by": []}}},
+            "foo__a",
+            {"bucket_count": 4},
+            pytest.raises(errors.StudyManifestParsingError),
+        ),
+        (
+            {"partitioned_by": ["year"], "tables": {"foo__a": {"partitioned_by": []}}},
+            "foo__b",
+            {"partitioned_by": ["year"]},
+            does_not_raise(),
+        ),
+        ({"bucketed_by": ["id"]}, "foo__a", {}, pytest.raises(errors.StudyManifestParsingError)),
+        ({"compression": "ZSTD"}, "foo__a", {}, pytest.raises(errors.StudyManifestParsingError)),
+    ],
+)
+def test_table_layout(tmp_path, table_layout, table, expected, raises):
+    config = {
+        "study_prefix": "foo",
+        "stages": {"stage_1": [{"type": "build:serial", "files": ["foo"]}]},
+    }
+    if table_layout:
+        config["table_layout"] = table_layout
+    conftest.write_toml(tmp_path, config)
+    with raises:
+        manifest = study_manifest.StudyManifest(tmp_path)
+        assert manifest.get_table_layout(table) == expected
+
+
 @pytest.mark.parametrize(
     "action,raises",
     [